@@ -0,0 +1,31 @@
+# %%
+# Applies the reviewer CSVs to the split metadata written by hu_dataset.py.
+# The corrections are kept as a versioned overlay next to the dataset, see
+# burstextractor.corrections. No image is moved, the result is a new labeled index.
+import glob
+
+import pandas as pd
+
+from burstextractor.corrections import LabelOverlay
+
+DATASET = "/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october"
+CORRECTIONS = sorted(
+    glob.glob("*_test_only_disagreement_*.csv")
+    + glob.glob("data_test_images_all_*.csv")
+)
+HOW = "latest"  # or "majority"
+
+# %%
+overlay = LabelOverlay(DATASET)
+version = overlay.add(CORRECTIONS)
+print(f"New overlay version: {version}, versions: {overlay.versions()}")
+
+# %%
+# The reviewers label burst / no burst, so the corrections go into a binary column
+for split in ["train", "val", "test"]:
+    df = pd.read_csv(f"{DATASET}/{split}_metadata.csv", parse_dates=["datetime"])
+    df["burst"] = df["label"].astype(str) != "0"
+    labeled = overlay.materialize(
+        df, f"{DATASET}/{split}_labeled.parquet", how=HOW, label_column="burst"
+    )
+    print(f"{split}: {labeled['corrected'].sum()} of {len(labeled)} labels corrected")
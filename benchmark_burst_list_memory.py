@@ -0,0 +1,75 @@
+# %%
+"""
+Compares the memory of the exploded burst list DataFrame with the array-backed
+BurstList on all files in ecallisto_files/, and the time of a typical filter.
+"""
+import glob
+import timeit
+
+import pandas as pd
+
+from burstextractor.burstarrays import BurstList
+from burstextractor.burstlist import process_burst_lists
+from burstextractor.burstparser import parse_burst_lists
+from burstextractor.data_utils import explode_instruments_long_clean_instruments
+from burstextractor.timeutils import fix_typos_in_time, parse_time
+
+FILES = sorted(glob.glob("ecallisto_files/e-CALLISTO_*.txt"))
+REPEAT = 5
+INSTRUMENT = "GLASGOW"
+TYPES = ["II", "III"]
+START, END = "2023-01-01", "2024-01-01"
+
+
+def exploded_burst_list(filenames):
+    """
+    The burst list as build.process_month makes it, before the names are matched.
+    """
+    data = parse_time(fix_typos_in_time(process_burst_lists(filenames)))
+    data = data[data["time_valid"]].drop(columns="time_valid")
+    return explode_instruments_long_clean_instruments(data)
+
+
+def filter_dataframe(data):
+    return data[
+        (data["instruments"] == INSTRUMENT)
+        & data["type"].isin(TYPES)
+        & (data["datetime_end"] >= START)
+        & (data["datetime_start"] < END)
+    ]
+
+
+def best_of(function):
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+if __name__ == "__main__":
+    data = exploded_burst_list(FILES)
+    bursts = BurstList.from_parsed(parse_burst_lists(FILES))
+    # The used columns only, as the rest of the code would keep them
+    used = data[["instruments", "type", "datetime_start", "datetime_end"]]
+    categorical = used.astype({"instruments": "category", "type": "category"})
+
+    sizes = {
+        "DataFrame, all columns": data.memory_usage(deep=True).sum(),
+        "DataFrame, used columns": used.memory_usage(deep=True).sum(),
+        "DataFrame, used columns, categorical": categorical.memory_usage(
+            deep=True
+        ).sum(),
+        "BurstList": bursts.nbytes,
+    }
+    print(f"{len(FILES)} files, {len(data)} rows, {len(bursts)} events")
+    baseline = sizes["DataFrame, all columns"]
+    for name, size in sizes.items():
+        print(f"{name:40s} {size / 2**20:8.2f} MiB  {baseline / size:6.1f}x")
+
+    timings = {
+        "DataFrame filter": best_of(lambda: filter_dataframe(data)),
+        "BurstList.select": best_of(
+            lambda: bursts.select(INSTRUMENT, TYPES, START, END)
+        ),
+        "BurstList.to_pandas": best_of(bursts.to_pandas),
+        "BurstList.from_pandas": best_of(lambda: BurstList.from_pandas(used)),
+    }
+    for name, seconds in timings.items():
+        print(f"{name:40s} {seconds * 1000:8.1f} ms")
@@ -0,0 +1,123 @@
+# %%
+"""
+Compares the old two-pass burst list reader (skiprows + python engine) with the
+single-pass process_burst_list and the typed parser on all files in ecallisto_files/.
+"""
+import glob
+import timeit
+
+import pandas as pd
+
+from burstextractor.burstlist import ENCODING, process_burst_list, process_burst_lists
+from burstextractor.burstparser import parse_burst_lists
+from burstextractor.data_utils import explode_instruments_long_clean_instruments
+from burstextractor.timeutils import (
+    create_datetime,
+    extract_time,
+    fix_24_hour_time,
+    fix_typos_in_time,
+    parse_time,
+)
+
+FILES = sorted(glob.glob("ecallisto_files/e-CALLISTO_*.txt"))
+REPEAT = 5
+
+
+def process_burst_list_two_pass(filename):
+    """
+    The previous implementation of process_burst_list, kept as reference.
+    """
+    col_names = ["date", "time", "type", "instruments"]
+    skip_row_idxs = []
+    with open(filename, "r", encoding=ENCODING) as f:
+        for row_idx, line in enumerate(f):
+            if (
+                (not line.startswith("20"))
+                or len(line) < 12
+                or "##:##-##:##" in line
+                or "??" in line
+            ):
+                skip_row_idxs.append(row_idx)
+
+    return pd.read_csv(
+        filename,
+        sep="\t",
+        index_col=False,
+        encoding=ENCODING,
+        names=col_names,
+        engine="python",
+        skiprows=skip_row_idxs,
+        dtype=str,
+    )
+
+
+def typed_columns_two_pass(filenames):
+    """
+    The old way to get typed start/end times and one row per instrument.
+    """
+    data = pd.concat(map(process_burst_list_two_pass, filenames))
+    data = data.reset_index(drop=True)
+    data = fix_typos_in_time(data)
+    data = extract_time(data)
+    data = fix_24_hour_time(data)
+    data = create_datetime(data)
+    return explode_instruments_long_clean_instruments(data)
+
+
+def time_columns_regex(data):
+    data = fix_typos_in_time(data.copy())
+    data = extract_time(data)
+    data = fix_24_hour_time(data)
+    return create_datetime(data)
+
+
+def time_columns_vectorized(data):
+    return parse_time(fix_typos_in_time(data.copy()))
+
+
+def best_of(function):
+    return min(timeit.repeat(function, number=1, repeat=REPEAT))
+
+
+if __name__ == "__main__":
+    import warnings
+
+    # The reference implementation warns about the lines with a trailing tab
+    warnings.simplefilter("ignore", pd.errors.ParserWarning)
+
+    # Both readers must return the same events
+    for filename in FILES:
+        pd.testing.assert_frame_equal(
+            process_burst_list_two_pass(filename), process_burst_list(filename)
+        )
+    pd.testing.assert_frame_equal(
+        pd.concat(map(process_burst_list_two_pass, FILES)).reset_index(drop=True),
+        process_burst_lists(FILES),
+    )
+
+    events = process_burst_lists(FILES)
+    timings = {
+        "two-pass read_csv (old)": best_of(
+            lambda: [process_burst_list_two_pass(f) for f in FILES]
+        ),
+        "single-pass process_burst_list": best_of(
+            lambda: [process_burst_list(f) for f in FILES]
+        ),
+        "single-pass process_burst_lists": best_of(lambda: process_burst_lists(FILES)),
+        "two-pass read_csv + timeutils + explode (old)": best_of(
+            lambda: typed_columns_two_pass(FILES)
+        ),
+        "extract_time + fix_24_hour_time + create_datetime": best_of(
+            lambda: time_columns_regex(events)
+        ),
+        "parse_time": best_of(lambda: time_columns_vectorized(events)),
+        "typed parse_burst_lists": best_of(lambda: parse_burst_lists(FILES)),
+        "typed parse_burst_lists (4 processes)": best_of(
+            lambda: parse_burst_lists(FILES, max_workers=4)
+        ),
+    }
+    n_events = len(parse_burst_lists(FILES)["date"])
+    print(f"{len(FILES)} files, {n_events} events, best of {REPEAT}")
+    baseline = timings["two-pass read_csv (old)"]
+    for name, seconds in timings.items():
+        print(f"{name:50s} {seconds * 1000:8.1f} ms  {baseline / seconds:5.1f}x")
@@ -0,0 +1,195 @@
+"""
+Incremental build of the burst list.
+Every monthly file is processed on its own and the result is cached as a Parquet
+partition keyed on the content hash of the file. A rebuild only processes the
+months whose file changed (usually just the current month) and concatenates the
+cached partitions.
+
+Usage:
+    python -m burstextractor.build --years 2021 2022 2023 2024 --output burst_list.parquet
+"""
+import argparse
+import datetime
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from burstextractor import mirror
+from burstextractor.burstlist import process_burst_list
+from burstextractor.burstparser import TYPE_CODES
+from burstextractor.data_utils import (
+    explode_instruments_long_clean_instruments,
+    keep_only_type_I_to_VI,
+)
+from burstextractor.names import resolve_instruments
+from burstextractor.storage import save_burst_list
+from burstextractor.timeutils import fix_typos_in_time, parse_time
+
+# Change this whenever process_month changes, so old partitions are not reused
+PIPELINE_VERSION = "4"
+CACHE_FOLDER = ".burst_list_cache"
+INDEX = "index.json"
+
+
+def process_month(filename):
+    """
+    The steps of burst_list_creation.ipynb for a single monthly file, with
+    timeutils.parse_time in place of extract_time, fix_24_hour_time and
+    create_datetime. The types get the codes 1 to 6 of the notebook.
+    Returns: A Pandas Dataframe with one row per burst and instrument
+    """
+    data = process_burst_list(filename)
+    data = fix_typos_in_time(data)
+    data = parse_time(data)
+    # Dates and times that could not be parsed
+    data = data[data["time_valid"]].drop(columns="time_valid")
+    data = explode_instruments_long_clean_instruments(data)
+    data = keep_only_type_I_to_VI(data)
+    data["type"] = data["type"].map(TYPE_CODES).astype("int8")
+    return data.reset_index(drop=True)
+
+
+def source_hash(filename):
+    """
+    The cache key of a monthly file: its content and the pipeline version.
+    """
+    sha256 = hashlib.sha256(PIPELINE_VERSION.encode())
+    with open(filename, "rb") as f:
+        sha256.update(f.read())
+    return sha256.hexdigest()
+
+
+def load_index(cache_folder):
+    path = os.path.join(cache_folder, INDEX)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_index(cache_folder, index):
+    path = os.path.join(cache_folder, INDEX)
+    with open(path + ".part", "w") as f:
+        json.dump(index, f, indent=1, sort_keys=True)
+    os.replace(path + ".part", path)
+
+
+def write_partition(data, path):
+    data.to_parquet(path + ".part", index=False)
+    os.replace(path + ".part", path)
+
+
+def build_burst_list(filenames, cache_folder=CACHE_FOLDER, verbose=False):
+    """
+    Builds the burst list from the monthly files, reusing the cached partitions of
+    the files that did not change.
+    :param filenames: The monthly burst list files, the result keeps this order.
+    :param cache_folder: The folder for the partitions and their index.
+    :param verbose: Print which months are processed.
+    :return: A Pandas Dataframe like the one from burst_list_creation.ipynb before
+             the instrument names are matched.
+    """
+    os.makedirs(cache_folder, exist_ok=True)
+    index = load_index(cache_folder)
+    # Partitions of another pipeline version are never used again
+    for key, entry in list(index.items()):
+        if entry.get("version") != PIPELINE_VERSION:
+            if os.path.exists(entry["path"]):
+                os.remove(entry["path"])
+            del index[key]
+    hashes = {filename: source_hash(filename) for filename in filenames}
+
+    partitions = []
+    for filename in filenames:
+        # Keyed on the whole path, the same month may be in several folders
+        key = os.path.abspath(filename)
+        folder_hash = hashlib.sha256(key.encode()).hexdigest()[:8]
+        name = f"{os.path.basename(filename)}.{folder_hash}.{hashes[filename][:16]}"
+        path = os.path.join(cache_folder, f"{name}.parquet")
+        entry = index.get(key)
+        if (
+            entry is None
+            or entry["hash"] != hashes[filename]
+            or not os.path.exists(path)
+        ):
+            if verbose:
+                print(f"Processing {filename}")
+            write_partition(process_month(filename), path)
+            if (
+                entry is not None
+                and entry["path"] != path
+                and os.path.exists(entry["path"])
+            ):
+                os.remove(entry["path"])
+            index[key] = {
+                "hash": hashes[filename],
+                "version": PIPELINE_VERSION,
+                "path": path,
+                "built": datetime.datetime.now().isoformat(),
+            }
+            save_index(cache_folder, index)
+        partitions.append(path)
+
+    # The concatenation is cached as well, keyed on all partitions
+    combined_key = hashlib.sha256("".join(partitions).encode()).hexdigest()[:16]
+    combined_path = os.path.join(cache_folder, f"combined.{combined_key}.parquet")
+    if os.path.exists(combined_path):
+        return pd.read_parquet(combined_path)
+    data = pd.concat([pd.read_parquet(path) for path in partitions], ignore_index=True)
+    for old in os.listdir(cache_folder):
+        if old.startswith("combined.") and old.endswith(".parquet"):
+            os.remove(os.path.join(cache_folder, old))
+    write_partition(data, combined_path)
+    return data
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Incrementally build the burst list from the monthly files."
+    )
+    parser.add_argument("--years", type=int, nargs="+", required=True)
+    parser.add_argument("--months", type=int, nargs="+", default=list(range(1, 13)))
+    parser.add_argument("--folder", default="ecallisto_files")
+    parser.add_argument("--cache", default=CACHE_FOLDER)
+    parser.add_argument(
+        "--output",
+        default="burst_list_unmatched.parquet",
+        help="Output file, .parquet, .arrow, .csv or .xlsx (see "
+        "burstextractor.storage)",
+    )
+    parser.add_argument(
+        "--aliases",
+        help="Resolve the instrument names with this alias table (CSV, updated "
+        "with new names) and drop the bursts without a canonical name",
+    )
+    parser.add_argument(
+        "--download",
+        action="store_true",
+        help="Update the local mirror from the server first",
+    )
+    args = parser.parse_args(args)
+
+    if args.download:
+        filenames = mirror.mirror_burst_lists(args.years, args.months, args.folder)
+    else:
+        filenames = [
+            os.path.join(args.folder, mirror.burst_list_filename(year, month))
+            for year in args.years
+            for month in args.months
+        ]
+        filenames = [filename for filename in filenames if os.path.exists(filename)]
+
+    data = build_burst_list(filenames, cache_folder=args.cache, verbose=True)
+    if args.aliases:
+        data = resolve_instruments(data, args.aliases)
+    if args.output.endswith(".csv"):
+        data.to_csv(args.output, index=False)
+    else:
+        save_burst_list(data, args.output)
+    print(f"Wrote {len(data)} bursts from {len(filenames)} files to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
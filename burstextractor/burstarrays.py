@@ -0,0 +1,243 @@
+"""
+A compact, array-backed burst list.
+After explode_instruments_long_clean_instruments the burst list is a long object
+DataFrame: one row per burst and instrument, with the instrument and type as
+strings and the leftover date and time strings. BurstList keeps one entry per
+event of the monthly files instead, in plain NumPy arrays:
+
+    start, end:          int64 minutes since 1970-01-01
+    type:                int8 type code (burstparser.TYPE_CODES, 0 for others)
+    instrument_codes:    int16 codes into the shared dictionary instrument_names
+    instrument_offsets:  int64 CSR offsets, the instruments of event i are
+                         instrument_codes[instrument_offsets[i]:instrument_offsets[i + 1]]
+
+Filters by instrument, type and time are boolean masks over these arrays, and
+to_pandas gives the exploded DataFrame the rest of the code uses.
+
+Usage:
+    bursts = BurstList.from_parsed(parse_burst_lists(filenames))
+    glasgow = bursts.select(instrument="GLASGOW", types=["III"], start="2024-05-01")
+    burst_list = glasgow.to_pandas()
+"""
+import numpy as np
+import pandas as pd
+
+from burstextractor.burstparser import TYPE_CODES, TYPE_NAMES, split_instruments
+
+
+def to_minutes(values):
+    """
+    Datetimes (numpy, pandas, python or strings) as int64 minutes since 1970.
+    """
+    values = np.atleast_1d(np.asarray(values))
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = pd.to_datetime(values).to_numpy()
+    return values.astype("datetime64[m]").astype(np.int64)
+
+
+class BurstList:
+    def __init__(self, start, end, types, instrument_offsets, instrument_codes, names):
+        """
+        See the module docstring for the arrays.
+        :param types: The type codes.
+        :param names: The instrument name of every code.
+        """
+        self.start = np.asarray(start, dtype=np.int64)
+        self.end = np.asarray(end, dtype=np.int64)
+        self.type = np.asarray(types, dtype=np.int8)
+        self.instrument_offsets = np.asarray(instrument_offsets, dtype=np.int64)
+        self.instrument_codes = np.asarray(instrument_codes, dtype=np.int16)
+        self.instrument_names = np.asarray(names, dtype=object)
+
+    @classmethod
+    def from_instruments(cls, start, end, types, offsets, instruments):
+        """
+        Builds the dictionary of the flat instrument names. Empty names (e.g. of a
+        trailing comma) are left out of the events.
+        """
+        instruments = np.asarray(instruments, dtype=object)
+        keep = instruments != ""
+        event = np.repeat(np.arange(len(start)), np.diff(offsets))[keep]
+        codes, names = pd.factorize(instruments[keep], sort=True)
+        if len(names) > np.iinfo(np.int16).max:
+            raise ValueError(f"Too many instruments for int16 codes: {len(names)}")
+        offsets = np.zeros(len(start) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(event, minlength=len(start)), out=offsets[1:])
+        return cls(start, end, types, offsets, codes, names)
+
+    @classmethod
+    def from_parsed(cls, columns):
+        """
+        The valid events of burstparser.parse_burst_lists.
+        """
+        valid = columns["valid"]
+        day = columns["date"].astype("datetime64[m]").astype(np.int64)
+        start = day + columns["start"]
+        end = day + columns["end"]
+        offsets = columns["instrument_offsets"]
+        # The instruments of the valid events only
+        counts = np.diff(offsets)
+        flat = np.repeat(valid, counts)
+        kept = np.zeros(valid.sum() + 1, dtype=np.int64)
+        np.cumsum(counts[valid], out=kept[1:])
+        return cls.from_instruments(
+            start[valid],
+            end[valid],
+            columns["type"][valid],
+            kept,
+            columns["instruments"][flat],
+        )
+
+    @classmethod
+    def from_pandas(cls, df):
+        """
+        From a burst list DataFrame with datetime_start, datetime_end, type and
+        instruments. The instruments may be exploded (one name per row) or
+        comma separated; rows without times are dropped. Consecutive rows with
+        the same times and type are one event, like the rows that
+        explode_instruments_long_clean_instruments makes of an event.
+        """
+        start = df["datetime_start"].to_numpy(dtype="datetime64[ns]")
+        end = df["datetime_end"].to_numpy(dtype="datetime64[ns]")
+        valid = ~(np.isnat(start) | np.isnat(end))
+        df = df[valid]
+        types = df["type"].astype(object)
+        # The type codes of the notebook (1 to 6) or their names
+        codes = types.map(TYPE_CODES)
+        numeric = pd.to_numeric(types, errors="coerce")
+        codes = codes.fillna(numeric.where(numeric.isin(TYPE_NAMES.keys()))).fillna(0)
+        codes = codes.to_numpy(dtype=np.int8)
+        start, end = to_minutes(start[valid]), to_minutes(end[valid])
+        offsets, instruments = split_instruments(df["instruments"])
+        new = np.ones(len(start), dtype=bool)
+        new[1:] = (
+            (start[1:] != start[:-1])
+            | (end[1:] != end[:-1])
+            | (codes[1:] != codes[:-1])
+        )
+        first = np.flatnonzero(new)
+        return cls.from_instruments(
+            start[first],
+            end[first],
+            codes[first],
+            offsets[np.append(first, len(start))],
+            instruments,
+        )
+
+    def __len__(self):
+        return len(self.start)
+
+    @property
+    def nbytes(self):
+        """
+        The memory of the arrays, including the instrument names.
+        """
+        arrays = [
+            self.start,
+            self.end,
+            self.type,
+            self.instrument_offsets,
+            self.instrument_codes,
+            self.instrument_names,
+        ]
+        names = sum(len(name) + 49 for name in self.instrument_names)
+        return sum(array.nbytes for array in arrays) + names
+
+    def counts(self):
+        """
+        The number of instruments of every event.
+        """
+        return np.diff(self.instrument_offsets)
+
+    def event_of_instrument(self):
+        """
+        The event of every entry of instrument_codes.
+        """
+        return np.repeat(np.arange(len(self)), self.counts())
+
+    def take(self, events):
+        """
+        The BurstList of the given events (a bool mask or positions).
+        """
+        events = np.asarray(events)
+        if events.dtype == bool:
+            events = np.flatnonzero(events)
+        counts = self.counts()[events]
+        offsets = np.zeros(len(events) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        # Position first, first + 1, ..., of the instruments of every event
+        first = np.repeat(self.instrument_offsets[events] - offsets[:-1], counts)
+        positions = first + np.arange(offsets[-1])
+        return BurstList(
+            self.start[events],
+            self.end[events],
+            self.type[events],
+            offsets,
+            self.instrument_codes[positions],
+            self.instrument_names,
+        )
+
+    def instrument_mask(self, instruments):
+        """
+        The events seen by any of the instruments.
+        """
+        instruments = [instruments] if isinstance(instruments, str) else instruments
+        codes = np.flatnonzero(np.isin(self.instrument_names, list(instruments)))
+        mask = np.zeros(len(self), dtype=bool)
+        mask[self.event_of_instrument()[np.isin(self.instrument_codes, codes)]] = True
+        return mask
+
+    def select(self, instrument=None, types=None, start=None, end=None):
+        """
+        The events that match all given filters.
+        :param instrument: A name or a list of names, any of them has to see the
+                           event.
+        :param types: Type names or codes, e.g. ["II", "III"].
+        :param start: The events that end at or after start.
+        :param end: The events that start before end.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if instrument is not None:
+            mask &= self.instrument_mask(instrument)
+        if types is not None:
+            codes = [TYPE_CODES.get(t, t) for t in np.atleast_1d(types)]
+            mask &= np.isin(self.type, codes)
+        if start is not None:
+            mask &= self.end >= to_minutes(start)[0]
+        if end is not None:
+            mask &= self.start < to_minutes(end)[0]
+        return self.take(mask)
+
+    def to_pandas(self, explode=True):
+        """
+        The burst list as a DataFrame with instruments, type (name, None for
+        other types), datetime_start and datetime_end.
+        :param explode: One row per event and instrument, like after
+                        explode_instruments_long_clean_instruments. Otherwise
+                        one row per event with the instruments joined by ",".
+        """
+        types = pd.Series(self.type).map(TYPE_NAMES).to_numpy(dtype=object)
+        start = self.start.astype("datetime64[m]").astype("datetime64[ns]")
+        end = self.end.astype("datetime64[m]").astype("datetime64[ns]")
+        names = self.instrument_names[self.instrument_codes]
+        if explode:
+            event = self.event_of_instrument()
+            instruments, types, start, end = (
+                names,
+                types[event],
+                start[event],
+                end[event],
+            )
+        else:
+            instruments = (
+                pd.Series(names).groupby(self.event_of_instrument()).agg(",".join)
+            )
+            instruments = instruments.reindex(np.arange(len(self)), fill_value="")
+        return pd.DataFrame(
+            {
+                "instruments": np.asarray(instruments, dtype=object),
+                "type": types,
+                "datetime_start": start,
+                "datetime_end": end,
+            }
+        )
@@ -4,15 +4,13 @@ version 1.3
 author: Andreas Wassmer
 project: Raumschiff
 """
-import datetime
 import os
 
-import pandas as pd
 import requests
 
-from burstextractor import timeutils
+from burstextractor import burstparser, mirror, timeutils
 
-BASE_URL = f"http://soleil.i4ds.ch/solarradio/data/BurstLists/2010-yyyy_Monstein"
+BASE_URL = mirror.BASE_URL
 ENCODING = "iso-8859-1"
 
 
@@ -20,34 +18,20 @@ def process_burst_list(filename):
     """
     Let's discard the entries with missing data.
     These events have a time stamp of "##:##-##:##" with no further data in the row except the date
-    I like to use a conditional for filtering. I think the filter is more readable.
-    Especially if there are several conditions
     Returns: A Pandas Dataframe with valid events
     """
-    col_names = ["date", "time", "type", "instruments"]
-    skip_row_idxs = []
-    with open(filename, "r") as f:
-        for row_idx, line in enumerate(f):
-            if (
-                (not line.startswith("20"))
-                or len(line) < 12
-                or "##:##-##:##" in line
-                or "??" in line
-            ):
-                skip_row_idxs.append(row_idx)
+    return process_burst_lists([filename])
 
-    data = pd.read_csv(
-        filename,
-        sep="\t",
-        index_col=False,
-        encoding=ENCODING,
-        names=col_names,
-        engine="python",
-        skiprows=skip_row_idxs,
-        dtype=str,
-    )
 
-    return data
+def process_burst_lists(filenames):
+    """
+    Same as process_burst_list for many files at once.
+    The lines are filtered while each file is read, so every file is only read once,
+    and all kept lines go through a single call of the C parser.
+    (see burstparser for a parser that also types the columns)
+    Returns: A Pandas Dataframe with the valid events of all files
+    """
+    return burstparser.read_burst_frame(filenames)
 
 
 def download_burst_list(select_year, select_month, folder="ecallisto_files"):
@@ -64,33 +48,27 @@ def download_burst_list(select_year, select_month, folder="ecallisto_files"):
 
     filename = f"e-CALLISTO_{year}_{month}.txt"
     flare_list = requests.get(f"{BASE_URL}/{year}/{filename}")
-    with open(os.path.join(folder, filename), "w") as f:
-        f.write(flare_list.content.decode(ENCODING))
+    # The bytes of the server, read with ENCODING by process_burst_list
+    with open(os.path.join(folder, filename), "wb") as f:
+        f.write(flare_list.content)
     return
 
 
-def download_burst_data(years, months, folder):
+def download_burst_data(years, months, folder, max_workers=8):
     """
     Downloads and processes e-CALLISTO data for a range of years and months.
+    The files are mirrored in folder, months that are over and already on disk are not
+    downloaded again (see mirror.mirror_burst_lists).
     :param years: A list of years (int) to download data for.
     :param months: A list of months (int) to download data for, where 1 = January, 2 = February, etc.
     :param folder: The folder to save the downloaded data to.
+    :param max_workers: Number of concurrent downloads.
     :return: A Pandas dataframe containing the processed data from all downloaded files.
     """
-    burst_list = []
-    for year in years:
-        for month in months:
-            # If the current month is in the future and the year is the current year, skip it.
-            if (
-                month > datetime.datetime.now().month
-                and year == datetime.datetime.now().year
-            ):
-                break
-            # Download the data for this year and month and process it.
-            download_burst_list(year, month, folder=folder)
-            burst_list.append(
-                process_burst_list(f"{folder}/e-CALLISTO_{year}_{month:02}.txt")
-            )
-    # Combine all of the processed dataframes into a single dataframe.
-    burst_list = pd.concat(burst_list).reset_index(drop=True)
+    # Months in the future are skipped by the mirror.
+    filenames = mirror.mirror_burst_lists(
+        years, months, folder=folder, max_workers=max_workers
+    )
+    # Process all of the downloaded files into a single dataframe.
+    burst_list = process_burst_lists(filenames)
     return burst_list
@@ -0,0 +1,195 @@
+"""
+Single-pass parser for the monthly burst lists compiled by C. Monstein.
+Lines are filtered while the files are read, tokenized in one call of the pandas
+C parser and then converted column by column into typed NumPy arrays.
+"""
+import io
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from burstextractor import timeutils
+
+ENCODING = "iso-8859-1"
+COLUMNS = ["date", "time", "type", "instruments"]
+
+# Burst types I to VI get the codes 1 to 6. Every other type (CTM, III/R, ...) is 0.
+TYPE_CODES = {"I": 1, "II": 2, "III": 3, "IV": 4, "V": 5, "VI": 6}
+TYPE_NAMES = {code: name for name, code in TYPE_CODES.items()}
+
+# Same characters as removed in data_utils.explode_instruments_long_clean_instruments
+BRACKETS = ["[", "]", "(", ")"]
+SEPARATOR = re.compile(r"\s*,\s*")
+
+
+def keep_line(line):
+    """
+    A line (without the newline) holds an event if it starts with the date and is
+    not one of the "##:##-##:##" (missing data) or "??" (unknown) entries.
+    """
+    return (
+        line.startswith("20")
+        and len(line) >= 11
+        and "##:##-##:##" not in line
+        and "??" not in line
+    )
+
+
+def read_burst_lines(filename):
+    """
+    Reads the valid event lines of a burst list in one pass. Surplus fields
+    (trailing tabs, comments) are cut off so every line has at most four columns.
+    Returns: A list of the kept lines
+    """
+    with open(filename, "r", encoding=ENCODING) as f:
+        return [
+            line if line.count("\t") < 4 else "\t".join(line.split("\t", 4)[:4])
+            for line in f.read().splitlines()
+            if keep_line(line)
+        ]
+
+
+def read_burst_frame(filenames):
+    """
+    Reads the valid events of many burst lists with a single call of the C parser.
+    Returns: A Pandas Dataframe with the string columns date, time, type and instruments
+    """
+    lines = [line for filename in filenames for line in read_burst_lines(filename)]
+    if not lines:
+        return pd.DataFrame(columns=COLUMNS, dtype=str)
+    return pd.read_csv(
+        io.StringIO("\n".join(lines)),
+        sep="\t",
+        index_col=False,
+        names=COLUMNS,
+        dtype=str,
+    )
+
+
+def parse_time_ranges(times):
+    """
+    Fixes the known typos and parses the time ranges, see
+    timeutils.time_ranges_to_minutes.
+    Returns: start and end (int16, -1 if invalid) and the valid mask
+    """
+    times = pd.Series(times, dtype=object).replace(timeutils.TIME_TYPOS)
+    start, end, valid = timeutils.time_ranges_to_minutes(times)
+    return start.astype(np.int16), end.astype(np.int16), valid
+
+
+def split_instruments(stations):
+    """
+    Splits the stations fields into cleaned instrument names, the same cleaning as
+    data_utils.explode_instruments_long_clean_instruments.
+    Returns: The CSR offsets (int64, one more than stations) and the flat names
+    """
+    stations = pd.Series(stations, dtype=object)
+    present = stations.notna().to_numpy()
+    stations = stations[present].tolist()
+    counts = np.zeros(len(present), dtype=np.int64)
+    counts[present] = [s.count(",") + 1 for s in stations]
+    offsets = np.zeros(len(present) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    # Clean and split the stations of all events at once instead of one by one.
+    # Like in explode_instruments_long_clean_instruments, the names are stripped
+    # before the brackets are removed.
+    joined = SEPARATOR.sub(",", ",".join(stations).strip())
+    for char in BRACKETS:
+        joined = joined.replace(char, "")
+    names = joined.split(",") if stations else []
+    return offsets, np.array(names, dtype=object)
+
+
+def parse_burst_frame(data):
+    """
+    Converts the string columns of read_burst_frame into typed columns.
+    Returns: A dict of NumPy arrays
+        date: datetime64[D] day of the event (NaT if invalid)
+        start, end: int16 minute offsets from the start of the day (-1 if invalid)
+        valid: bool, whether the date and time range could be parsed
+        type: int8 type code (see TYPE_CODES, 0 for other types)
+        type_name: the type as written in the list
+        instrument_offsets: int64, the instruments of event i are
+            instruments[instrument_offsets[i]:instrument_offsets[i + 1]]
+        instruments: the cleaned instrument names
+    """
+    n = len(data)
+    # Preallocated outputs, filled column by column below
+    columns = {
+        "date": np.empty(n, dtype="datetime64[D]"),
+        "start": np.empty(n, dtype=np.int16),
+        "end": np.empty(n, dtype=np.int16),
+        "valid": np.empty(n, dtype=bool),
+        "type": np.empty(n, dtype=np.int8),
+        "type_name": np.empty(n, dtype=object),
+    }
+
+    day = pd.to_numeric(data["date"].str[:8], errors="coerce").fillna(0)
+    date, exists = timeutils.yyyymmdd_to_datetime64(day.to_numpy(dtype=np.int64))
+    start, end, valid = parse_time_ranges(data["time"])
+    valid &= exists
+    start[~valid], end[~valid] = -1, -1
+    date[~exists] = np.datetime64("NaT")
+    columns["date"][:] = date
+    columns["start"][:] = start
+    columns["end"][:] = end
+    columns["valid"][:] = valid
+
+    types = data["type"].astype(object)
+    columns["type"][:] = types.map(TYPE_CODES).fillna(0).to_numpy(dtype=np.int8)
+    columns["type_name"][:] = types.where(types.notna(), None).to_numpy()
+
+    offsets, instruments = split_instruments(data["instruments"])
+    columns["instrument_offsets"] = offsets
+    columns["instruments"] = instruments
+    return columns
+
+
+def parse_burst_list(filename):
+    """
+    Parses a burst list file into typed columns, see parse_burst_frame.
+    """
+    return parse_burst_frame(read_burst_frame([filename]))
+
+
+def concat_parsed(parsed):
+    """
+    Concatenates the results of several parse_burst_frame calls.
+    The instrument offsets are shifted so they index the joined instrument array.
+    """
+    parsed = list(parsed)
+    if not parsed:
+        return parse_burst_frame(pd.DataFrame(columns=COLUMNS, dtype=str))
+    columns = {}
+    for key in ["date", "start", "end", "valid", "type", "type_name", "instruments"]:
+        columns[key] = np.concatenate([p[key] for p in parsed])
+    offsets = [np.zeros(1, dtype=np.int64)]
+    shift = 0
+    for p in parsed:
+        offsets.append(p["instrument_offsets"][1:] + shift)
+        shift += len(p["instruments"])
+    columns["instrument_offsets"] = np.concatenate(offsets)
+    return columns
+
+
+def _parse_chunk(filenames):
+    return parse_burst_frame(read_burst_frame(filenames))
+
+
+def parse_burst_lists(filenames, max_workers=None):
+    """
+    Parses many monthly burst lists at once.
+    :param filenames: The burst list files, the events keep this order.
+    :param max_workers: Number of worker processes. None or 1 parses in this process.
+    :return: The concatenated typed columns, see parse_burst_frame.
+    """
+    filenames = list(filenames)
+    if max_workers is None or max_workers <= 1 or len(filenames) <= 1:
+        return _parse_chunk(filenames)
+    # Contiguous chunks, so concatenating the results keeps the order of the files
+    chunks = [list(chunk) for chunk in np.array_split(filenames, max_workers)]
+    chunks = [chunk for chunk in chunks if chunk]
+    with ProcessPoolExecutor(max_workers=len(chunks)) as executor:
+        return concat_parsed(executor.map(_parse_chunk, chunks))
@@ -0,0 +1,202 @@
+"""
+Checkpoints for long dataset generation runs.
+Every finished unit of work (e.g. an instrument and window) is recorded with the
+files it wrote, their size and checksum. A restarted run loads the records into
+a dict and skips the finished units.
+
+Every process appends to its own log file in <folder>/.manifest/, so workers and
+independent runs (e.g. for different date ranges) never write the same file.
+Loading merges the compacted manifest.jsonl with all logs, later records win.
+compact() folds the logs into manifest.jsonl.
+"""
+import datetime
+import hashlib
+import json
+import os
+import socket
+import time
+
+MANIFEST_FOLDER = ".manifest"
+MANIFEST = "manifest.jsonl"
+LOCK = "compact.lock"
+CHUNK_SIZE = 1024 * 1024
+
+
+def unit_key(*parts):
+    """
+    The key of a unit of work, e.g. unit_key("GLASGOW_01", window_start).
+    """
+    return "/".join(str(part) for part in parts)
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def read_records(path):
+    """
+    The records of a manifest or log file. A last line that was cut off by a
+    crash is ignored.
+    """
+    records = []
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                records.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return records
+
+
+class Checkpoint:
+    """
+    Usage:
+        checkpoint = Checkpoint(folder)
+        key = unit_key(instrument, window_start)
+        if not checkpoint.done(key):
+            ... write path ...
+            checkpoint.record(key, [path])
+    """
+
+    def __init__(self, folder, load=True):
+        """
+        :param folder: The output folder of the run, output paths are stored
+                       relative to it.
+        :param load: Whether to load the records. Workers that only record can
+                     skip it.
+        """
+        self.folder = folder
+        self.manifest_folder = os.path.join(folder, MANIFEST_FOLDER)
+        os.makedirs(self.manifest_folder, exist_ok=True)
+        self.units = self.load() if load else {}
+        # Checksums of files shared by several units, e.g. shards
+        self._checksums = {}
+
+    def log_files(self):
+        return sorted(
+            os.path.join(self.manifest_folder, name)
+            for name in os.listdir(self.manifest_folder)
+            if name.startswith(("log-", "merging-")) and name.endswith(".jsonl")
+        )
+
+    def load(self):
+        """
+        Merges manifest.jsonl and the logs of all runs.
+        Returns: A dict from the unit key to its latest record
+        """
+        paths = self.log_files()
+        manifest = os.path.join(self.manifest_folder, MANIFEST)
+        if os.path.exists(manifest):
+            paths.insert(0, manifest)
+        records = [record for path in paths for record in read_records(path)]
+        records.sort(key=lambda record: record["finished"])
+        return {record["key"]: record for record in records}
+
+    def done(self, key, verify=False):
+        """
+        Whether the unit is finished.
+        :param verify: Also check that its files still exist with the recorded size.
+        """
+        record = self.units.get(key)
+        if record is None:
+            return False
+        if not verify:
+            return True
+        for output in record["outputs"]:
+            path = os.path.join(self.folder, output["path"])
+            if not os.path.exists(path) or os.path.getsize(path) != output["size"]:
+                return False
+        return True
+
+    def outputs(self, key):
+        """
+        The paths (relative to folder) of the files of a finished unit.
+        """
+        return [output["path"] for output in self.units[key]["outputs"]]
+
+    def count(self, prefix, written=False):
+        """
+        The number of finished units whose key starts with prefix.
+        :param written: Only count the units that wrote at least one file.
+        """
+        return sum(
+            key.startswith(prefix) and (bool(record["outputs"]) or not written)
+            for key, record in self.units.items()
+        )
+
+    def checksum(self, path):
+        """
+        The sha256 of a file, cached as long as its size and mtime do not change.
+        """
+        stat = os.stat(path)
+        cache_key = (path, stat.st_size, stat.st_mtime_ns)
+        if cache_key not in self._checksums:
+            self._checksums[cache_key] = file_sha256(path)
+        return self._checksums[cache_key]
+
+    def record(self, key, paths=()):
+        """
+        Records a finished unit and the files it wrote (possibly none).
+        The line is flushed right away, so a crash loses at most this unit.
+        """
+        record = {
+            "key": key,
+            "outputs": [
+                {
+                    "path": os.path.relpath(path, self.folder),
+                    "size": os.path.getsize(path),
+                    "sha256": self.checksum(path),
+                }
+                for path in paths
+            ],
+            "finished": datetime.datetime.now().isoformat(),
+        }
+        log = os.path.join(
+            self.manifest_folder, f"log-{socket.gethostname()}-{os.getpid()}.jsonl"
+        )
+        with open(log, "a") as f:
+            f.write(json.dumps(record) + "\n")
+        self.units[key] = record
+        return record
+
+    def compact(self):
+        """
+        Folds all logs into manifest.jsonl. Does nothing if another process is
+        compacting. The logs are renamed before they are read, so a run that is
+        still going on starts a new log with its next record.
+        Returns: Whether the logs were compacted
+        """
+        lock = os.path.join(self.manifest_folder, LOCK)
+        try:
+            fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        try:
+            logs = []
+            for log in self.log_files():
+                name = os.path.basename(log)
+                if name.startswith("log-"):
+                    # Left over merging- files of an interrupted compact are kept
+                    name = f"merging-{time.time_ns()}-{name[len('log-'):]}"
+                    os.replace(log, os.path.join(self.manifest_folder, name))
+                logs.append(os.path.join(self.manifest_folder, name))
+            manifest = os.path.join(self.manifest_folder, MANIFEST)
+            paths = ([manifest] if os.path.exists(manifest) else []) + logs
+            records = [record for path in paths for record in read_records(path)]
+            records.sort(key=lambda record: record["finished"])
+            units = {record["key"]: record for record in records}
+            with open(manifest + ".part", "w") as f:
+                for record in units.values():
+                    f.write(json.dumps(record) + "\n")
+            os.replace(manifest + ".part", manifest)
+            for log in logs:
+                os.remove(log)
+            self.units.update(units)
+        finally:
+            os.close(fd)
+            os.remove(lock)
+        return True
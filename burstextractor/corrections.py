@@ -0,0 +1,265 @@
+"""
+Label corrections from reviewer CSVs.
+Reviewers export CSVs with the antenna, datetime and their label of every window
+they looked at (e.g. *_test_only_disagreement_*.csv with file_path or
+data_test_images_all_*.csv with PNG names). Every window is keyed by a compact
+sample id, a 64-bit hash of its antenna, start and label (the label folder of
+the dataset), so the corrections apply to a window whatever its file path or
+image format. Burst windows of different types that start at the same time are
+different samples. The PNG exports of the binary dataset only know burst / no
+burst; their reviews apply to the windows with the same start and binary label
+that no typed review covers.
+
+The corrections are kept as a versioned overlay in <root>/.label_overlay/: every
+add() writes one new version file with the rows of the new CSVs, nothing is
+overwritten and no image is moved. A labeled index is the original table with
+the overlay joined onto it, resolved by "latest" (the last review wins) or
+"majority" (the most frequent label wins, ties go to the latest review).
+
+Usage:
+    overlay = LabelOverlay(root)
+    overlay.add(glob.glob("*_test_only_disagreement_*.csv"))
+    df = overlay.apply(df, label_column="burst", how="majority")
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from burstextractor.checkpoint import file_sha256
+
+OVERLAY_FOLDER = ".label_overlay"
+# Reviewer exports end in their creation time, e.g. ..._2024-05-30_19-08-01.csv
+REVIEWED_PATTERN = r"(\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2})\.csv$"
+COLUMNS = [
+    "sample_id",
+    "antenna",
+    "datetime",
+    "window_label",
+    "label",
+    "reviewed",
+    "source",
+    "sha256",
+    "version",
+    "row",
+]
+
+
+def sample_ids(antenna, datetime, label):
+    """
+    The compact id of every window: a 64-bit hash of its antenna, start and
+    label.
+    :param antenna: The antenna of every window, e.g. "GLASGOW_01".
+    :param datetime: The start of every window (datetimes or strings).
+    :param label: The label folder of every window, e.g. "0" or "3" (compared as
+                  strings, so 3 and "3" are the same).
+    :return: A uint64 array
+    """
+    frame = pd.DataFrame(
+        {
+            "antenna": np.asarray(antenna, dtype=object),
+            "datetime": pd.to_datetime(np.asarray(datetime)).astype("datetime64[ns]"),
+            "label": np.asarray(label).astype(str).astype(object),
+        }
+    )
+    return pd.util.hash_pandas_object(frame, index=False).to_numpy()
+
+
+def binary_labels(labels):
+    """
+    The window labels of the binary dataset, "binary-0" for no burst (label "0")
+    and "binary-1" for the bursts of every type.
+    """
+    labels = np.asarray(labels).astype(str)
+    return np.where(labels == "0", "binary-0", "binary-1").astype(object)
+
+
+def window_labels(df):
+    """
+    The dataset label of the windows of a reviewer CSV: the label folder of
+    file_path (.../antenna/label/datetime.parquet), the binary label of the
+    folder of image (.../0 or 1/label_antenna_datetime.png of the binary
+    dataset), else its label column.
+    """
+    if "file_path" in df.columns:
+        return df["file_path"].astype(str).str.split("/").str[-2].to_numpy(dtype=object)
+    if "image" in df.columns:
+        return binary_labels(df["image"].astype(str).str.split("/").str[-2])
+    if "label" in df.columns:
+        return df["label"].astype(str).to_numpy(dtype=object)
+    raise ValueError("No column label, file_path or image for the window labels")
+
+
+def read_corrections(path, label_column="user_label"):
+    """
+    Reads a reviewer CSV.
+    :param path: CSV with the columns antenna, datetime, label_column and the
+                 window label (see window_labels).
+    :param label_column: The label given by the reviewer.
+    :return: A Dataframe with the overlay columns except version
+    """
+    df = pd.read_csv(path, index_col=0)
+    missing = {"antenna", "datetime", label_column} - set(df.columns)
+    if missing:
+        raise ValueError(f"{path} has no column {', '.join(sorted(missing))}")
+    match = re.search(REVIEWED_PATTERN, os.path.basename(path))
+    if match:
+        reviewed = pd.to_datetime(match.group(1), format="%Y-%m-%d_%H-%M-%S")
+    else:
+        reviewed = pd.Timestamp(os.path.getmtime(path), unit="s")
+    datetimes = pd.to_datetime(df["datetime"]).astype("datetime64[ns]")
+    labels = window_labels(df)
+    return pd.DataFrame(
+        {
+            "sample_id": sample_ids(df["antenna"], datetimes, labels),
+            "antenna": df["antenna"].to_numpy(dtype=object),
+            "datetime": datetimes.to_numpy(),
+            "window_label": labels,
+            "label": df[label_column].to_numpy(),
+            "reviewed": reviewed,
+            "source": os.path.basename(path),
+            "sha256": file_sha256(path),
+            "row": np.arange(len(df)),
+        }
+    )
+
+
+def resolve(corrections, how="latest"):
+    """
+    One label per sample id.
+    :param corrections: Overlay rows, see LabelOverlay.load.
+    :param how: "latest": the label of the last review wins.
+                "majority": the label with the most reviews wins, ties go to the
+                label that was reviewed last.
+    :return: A Dataframe indexed by sample_id with the label, its votes and the
+             number of reviews of the sample
+    """
+    if how not in ("latest", "majority"):
+        raise ValueError(f"Unknown how: {how}")
+    corrections = corrections.sort_values(
+        ["reviewed", "version", "row"], kind="stable"
+    ).assign(order=np.arange(len(corrections)))
+    votes = (
+        corrections.groupby(["sample_id", "label"], sort=False)
+        .agg(votes=("order", "size"), order=("order", "max"))
+        .reset_index()
+    )
+    votes["reviews"] = votes.groupby("sample_id")["votes"].transform("sum")
+    key = ["order"] if how == "latest" else ["votes", "order"]
+    resolved = votes.sort_values(key).drop_duplicates("sample_id", keep="last")
+    return resolved.set_index("sample_id")[["label", "votes", "reviews"]]
+
+
+class LabelOverlay:
+    def __init__(self, root):
+        self.folder = os.path.join(root, OVERLAY_FOLDER)
+        os.makedirs(self.folder, exist_ok=True)
+
+    def versions(self):
+        """
+        The existing versions, ascending.
+        """
+        return sorted(
+            int(name[1 : -len(".parquet")])
+            for name in os.listdir(self.folder)
+            if re.fullmatch(r"v\d+\.parquet", name)
+        )
+
+    def version_path(self, version):
+        return os.path.join(self.folder, f"v{version:05d}.parquet")
+
+    def load(self, version=None):
+        """
+        All overlay rows up to version (default: the latest).
+        """
+        versions = [v for v in self.versions() if version is None or v <= version]
+        if not versions:
+            return pd.DataFrame(columns=COLUMNS)
+        return pd.concat(
+            [pd.read_parquet(self.version_path(v)) for v in versions],
+            ignore_index=True,
+        )
+
+    def add(self, paths, label_column="user_label"):
+        """
+        Adds the reviewer CSVs as a new version. CSVs that are already in the
+        overlay (same checksum) are skipped.
+        Returns: The new version, None if there was nothing new
+        """
+        known = set(self.load()["sha256"])
+        frames = []
+        for path in paths:
+            corrections = read_corrections(path, label_column)
+            if not len(corrections) or corrections["sha256"].iloc[0] in known:
+                continue
+            known.add(corrections["sha256"].iloc[0])
+            frames.append(corrections)
+        if not frames:
+            return None
+        versions = self.versions()
+        version = versions[-1] + 1 if versions else 1
+        path = self.version_path(version)
+        pd.concat(frames, ignore_index=True).assign(version=version)[
+            COLUMNS
+        ].to_parquet(path + ".part", index=False)
+        os.replace(path + ".part", path)
+        return version
+
+    def resolve(self, how="latest", version=None):
+        return resolve(self.load(version), how)
+
+    def apply(
+        self,
+        df,
+        how="latest",
+        version=None,
+        label_column="label",
+        antenna_column="antenna",
+        time_column="datetime",
+        window_label_column="label",
+    ):
+        """
+        The labeled index: df with the corrected labels.
+        :param df: One row per sample with antenna, datetime and label.
+        :param label_column: The column the corrections replace. The reviewer
+                             labels must be of the same kind, e.g. bool for the
+                             binary burst label.
+        :param window_label_column: The dataset label of the windows, part of
+                                    the sample id. Windows without a review of
+                                    their label take the review of their binary
+                                    label, if any.
+        :return: A copy of df with the corrected label_column, the original label
+                 in <label_column>_original and "corrected" where it changed
+        """
+        resolved = self.resolve(how, version)
+        labels = df[window_label_column]
+        ids = sample_ids(df[antenna_column], df[time_column], labels)
+        binary_ids = sample_ids(
+            df[antenna_column], df[time_column], binary_labels(labels)
+        )
+        positions = resolved.index.get_indexer(ids)
+        positions = np.where(
+            positions >= 0, positions, resolved.index.get_indexer(binary_ids)
+        )
+        found = positions >= 0
+        df = df.copy()
+        df[f"{label_column}_original"] = df[label_column]
+        labels = df[label_column].to_numpy(dtype=object, copy=True)
+        labels[found] = resolved["label"].to_numpy(dtype=object)[positions[found]]
+        df[label_column] = pd.Series(labels, index=df.index).infer_objects()
+        df["corrected"] = found & (
+            df[label_column].to_numpy() != df[f"{label_column}_original"].to_numpy()
+        )
+        return df
+
+    def materialize(self, df, path, how="latest", version=None, **kwargs):
+        """
+        Writes the labeled index of df (see apply) to the Parquet file path, under
+        a temporary name first.
+        Returns: The labeled index
+        """
+        labeled = self.apply(df, how, version, **kwargs)
+        labeled.to_parquet(path + ".part", index=False)
+        os.replace(path + ".part", path)
+        return labeled
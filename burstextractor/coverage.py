@@ -0,0 +1,260 @@
+"""
+Observation coverage of the local e-CALLISTO archive.
+The archive holds one FITS file per instrument and 15 minutes, named
+NAME_YYYYMMDD_HHMMSS_FC.fit.gz, in one folder per day. The coverage index is
+built from the file names alone: every file covers 15 minutes from its start,
+and the files of an instrument are merged into covered intervals. The index is
+persisted and only the day folders that changed are scanned again.
+
+Usage:
+    coverage = load_coverage(start=datetime(2024, 5, 1), end=datetime(2024, 5, 31))
+    coverage.covered_duration(starts, ends, "GLASGOW_01")
+"""
+import datetime
+import fnmatch
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from burstextractor.intervals import to_int64
+from burstextractor.sampling import merge_ranges
+
+# Same as ecallisto_ng.data_download.downloader.LOCAL_PATH
+LOCAL_PATH = "/mnt/nas05/data01/radio/2002-20yy_Callisto"
+COVERAGE_FOLDER = ".coverage_index"
+FILE_DURATION = pd.Timedelta(minutes=15)
+FILE_PATTERN = (
+    r"^(?P<station>.+)_(?P<date>\d{8})_(?P<time>\d{6})_(?P<focus_code>[^_.]+)\.fit\.gz$"
+)
+COLUMNS = ["station", "focus_code", "day", "start", "end"]
+
+
+def instrument_pattern(instrument_name):
+    """
+    The glob pattern that ecallisto_ng uses for an instrument name, matched
+    against "STATION_FC.fit.gz", e.g. "GLASGOW_01" -> "*GLASGOW*01.fit.gz" and
+    "BIR" -> "*BIR*.fit.gz".
+    """
+    if instrument_name is None:
+        return "*.fit.gz"
+    antenna_number = None
+    if instrument_name[-2:].isdigit():
+        antenna_number = instrument_name[-2:]
+        instrument_name = instrument_name[:-3]
+    return "*" + instrument_name + "*" + (antenna_number or "") + ".fit.gz"
+
+
+def day_folders(base_path, start, end):
+    """
+    The existing day folders YYYY/MM/DD between start and end (inclusive).
+    """
+    days = pd.date_range(pd.Timestamp(start).normalize(), end, freq="D")
+    folders = [day.strftime("%Y/%m/%d") for day in days]
+    return [
+        folder for folder in folders if os.path.isdir(os.path.join(base_path, folder))
+    ]
+
+
+def list_day(base_path, day):
+    """
+    The FITS file names of a day folder and the modification time of the folder.
+    """
+    path = os.path.join(base_path, day)
+    mtime = os.stat(path).st_mtime_ns
+    with os.scandir(path) as entries:
+        names = [entry.name for entry in entries if entry.name.endswith(".fit.gz")]
+    return mtime, names
+
+
+def files_to_intervals(days, names):
+    """
+    Merges the 15 minute files of every instrument and day into covered intervals.
+    :param days: The day folder of every file.
+    :param names: The file names.
+    :return: A Pandas Dataframe with the columns station, focus_code, day, start
+             and end (exclusive)
+    """
+    files = pd.Series(names, dtype=object).str.extract(FILE_PATTERN)
+    files["day"] = days
+    files["start"] = pd.to_datetime(
+        files["date"] + files["time"], format="%Y%m%d%H%M%S", errors="coerce"
+    )
+    files = files.dropna(subset=["start"])
+    files = files.sort_values(["station", "focus_code", "day", "start"])
+    files["end"] = files["start"] + FILE_DURATION
+
+    key = files[["station", "focus_code", "day"]]
+    same_key = (key == key.shift()).all(axis=1).to_numpy()
+    # Files of the same instrument that start before the previous one ends
+    # continue its interval
+    new = ~same_key | (files["start"] > files["end"].shift()).to_numpy()
+    block = np.cumsum(new)
+    intervals = files.groupby(block).agg(
+        station=("station", "first"),
+        focus_code=("focus_code", "first"),
+        day=("day", "first"),
+        start=("start", "first"),
+        end=("end", "max"),
+    )
+    return intervals[COLUMNS].reset_index(drop=True)
+
+
+class CoverageIndex:
+    """
+    The covered time intervals of every instrument (station and focus code).
+    """
+
+    def __init__(self, intervals=None, days=None):
+        """
+        :param intervals: A Dataframe like files_to_intervals returns.
+        :param days: The modification time of every scanned day folder.
+        """
+        if intervals is None:
+            intervals = pd.DataFrame(
+                {column: pd.Series(dtype=object) for column in COLUMNS[:3]}
+            ).assign(
+                start=pd.Series(dtype="datetime64[ns]"),
+                end=pd.Series(dtype="datetime64[ns]"),
+            )
+        self.intervals = intervals
+        self.days = days or {}
+        self._cache = {}
+
+    @classmethod
+    def load(cls, folder=COVERAGE_FOLDER):
+        path = os.path.join(folder, "intervals.parquet")
+        if not os.path.exists(path):
+            return cls()
+        with open(os.path.join(folder, "days.json"), "r") as f:
+            days = json.load(f)
+        return cls(pd.read_parquet(path), days)
+
+    def save(self, folder=COVERAGE_FOLDER):
+        """
+        Writes the index to temporary files first, so an interruption never leaves
+        a truncated index behind.
+        """
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "intervals.parquet")
+        self.intervals.to_parquet(path + ".part", index=False)
+        with open(os.path.join(folder, "days.json.part"), "w") as f:
+            json.dump(self.days, f, indent=1, sort_keys=True)
+        os.replace(path + ".part", path)
+        os.replace(
+            os.path.join(folder, "days.json.part"), os.path.join(folder, "days.json")
+        )
+
+    def update(self, base_path=LOCAL_PATH, start=None, end=None, max_workers=16):
+        """
+        Scans the day folders between start and end that are new or changed since
+        the last scan (their modification time differs).
+        :param base_path: The root of the archive.
+        :param start: The first day to scan (default: today).
+        :param end: The last day to scan (default: today).
+        :param max_workers: Number of folders listed concurrently.
+        :return: The number of scanned day folders.
+        """
+        today = datetime.date.today()
+        folders = day_folders(base_path, start or today, end or today)
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            mtimes = list(
+                executor.map(
+                    lambda day: os.stat(os.path.join(base_path, day)).st_mtime_ns,
+                    folders,
+                )
+            )
+        changed = [
+            day for day, mtime in zip(folders, mtimes) if self.days.get(day) != mtime
+        ]
+        if not changed:
+            return 0
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listings = list(executor.map(lambda day: list_day(base_path, day), changed))
+
+        days = [day for day, (_, names) in zip(changed, listings) for _ in names]
+        names = [name for _, names in listings for name in names]
+        new_intervals = files_to_intervals(days, names)
+        old_intervals = self.intervals[~self.intervals["day"].isin(changed)]
+        self.intervals = pd.concat(
+            [df for df in [old_intervals, new_intervals] if len(df)] or [old_intervals],
+            ignore_index=True,
+        )
+        for day, (mtime, _) in zip(changed, listings):
+            self.days[day] = mtime
+        self._cache = {}
+        return len(changed)
+
+    def instruments(self, instrument_name=None):
+        """
+        The instruments (STATION_FC) that ecallisto_ng would load for
+        instrument_name.
+        """
+        keys = (self.intervals["station"] + "_" + self.intervals["focus_code"]).unique()
+        pattern = instrument_pattern(instrument_name)
+        return sorted(
+            key for key in keys if fnmatch.fnmatchcase(key + ".fit.gz", pattern)
+        )
+
+    def covered(self, instrument_name=None):
+        """
+        The time covered by the files of the matching instruments as sorted,
+        disjoint intervals [start, end) in int64 nanoseconds.
+        """
+        if instrument_name not in self._cache:
+            keys = set(self.instruments(instrument_name))
+            mask = (
+                self.intervals["station"] + "_" + self.intervals["focus_code"]
+            ).isin(keys)
+            starts = to_int64(self.intervals.loc[mask, "start"].to_numpy())
+            ends = to_int64(self.intervals.loc[mask, "end"].to_numpy())
+            # Touching intervals are merged, e.g. across midnight
+            lo, hi = merge_ranges(starts, ends - 1)
+            self._cache[instrument_name] = (lo, hi + 1)
+        return self._cache[instrument_name]
+
+    def available(self, instrument_name=None):
+        """
+        covered as datetime64, for NonBurstSampler(available=...).
+        """
+        starts, ends = self.covered(instrument_name)
+        return starts.astype("datetime64[ns]"), ends.astype("datetime64[ns]")
+
+    def covered_duration(self, t0, t1, instrument_name=None):
+        """
+        How much of every window [t0[i], t1[i]) is covered by data.
+        :return: A TimedeltaIndex
+        """
+        starts, ends = self.covered(instrument_name)
+        cumulative = np.concatenate([[0], np.cumsum(ends - starts)])
+
+        def covered_until(t):
+            k = np.searchsorted(starts, t, side="right")
+            previous = np.maximum(k - 1, 0)
+            inside = np.where(
+                k > 0,
+                np.clip(t - starts[previous], 0, ends[previous] - starts[previous]),
+                0,
+            )
+            return cumulative[previous] * (k > 0) + inside
+
+        duration = covered_until(to_int64(t1)) - covered_until(to_int64(t0))
+        return pd.to_timedelta(duration, unit="ns")
+
+
+def load_coverage(
+    base_path=LOCAL_PATH, start=None, end=None, folder=COVERAGE_FOLDER, verbose=True
+):
+    """
+    Loads the persisted coverage index, brings the days between start and end up
+    to date and saves it again.
+    """
+    coverage = CoverageIndex.load(folder)
+    scanned = coverage.update(base_path, start, end)
+    if scanned:
+        coverage.save(folder)
+    if verbose:
+        print(f"Coverage index: scanned {scanned} day folders")
+    return coverage
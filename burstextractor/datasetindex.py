@@ -0,0 +1,269 @@
+"""
+Index of a generated dataset folder.
+The layouts written by create_labeled_data.py (root/antenna/label/datetime.parquet)
+and create_data.py (root/antenna/datetime.parquet) are parsed relative to root,
+so the index does not depend on where the folder is mounted. Besides the parsed
+path, every file gets its number of rows, frequency bins and time span from the
+Parquet footer, without reading the data.
+
+The index is kept in root/.dataset_index/. A rescan only lists the directories
+whose modification time changed and only reads the footers of new or changed
+files.
+
+Usage:
+    df = load_dataset_index("/mnt/.../hu_dataset_live_mai_october")
+    df[["image", "antenna", "label", "datetime"]]
+"""
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+INDEX_FOLDER = ".dataset_index"
+DATETIME_FORMAT = "%Y-%m-%d_%H-%M-%S"
+COLUMNS = [
+    "path",
+    "directory",
+    "antenna",
+    "label",
+    "datetime",
+    "size",
+    "mtime_ns",
+    "n_rows",
+    "n_frequencies",
+    "time_start",
+    "time_end",
+]
+
+
+def list_directories(root, max_workers=16):
+    """
+    The directories that hold the samples: root/antenna or root/antenna/label.
+    Hidden directories (like the index itself) are skipped.
+    Returns: A dict from the directory (relative to root) to its modification time
+    """
+
+    def list_antenna(entry):
+        directories = {}
+        has_files = False
+        with os.scandir(entry.path) as entries:
+            for sub in entries:
+                if sub.name.startswith("."):
+                    continue
+                if sub.is_dir():
+                    directories[f"{entry.name}/{sub.name}"] = sub.stat().st_mtime_ns
+                elif sub.name.endswith(".parquet"):
+                    has_files = True
+        if has_files:
+            directories[entry.name] = entry.stat().st_mtime_ns
+        return directories
+
+    with os.scandir(root) as entries:
+        antennas = [
+            entry
+            for entry in entries
+            if entry.is_dir() and not entry.name.startswith(".")
+        ]
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(list_antenna, antennas))
+    return {
+        directory: mtime for result in results for directory, mtime in result.items()
+    }
+
+
+def list_files(root, directory):
+    """
+    The Parquet files of a directory with their size and modification time.
+    """
+    files = []
+    with os.scandir(os.path.join(root, directory)) as entries:
+        for entry in entries:
+            if entry.name.endswith(".parquet") and entry.is_file():
+                stat = entry.stat()
+                files.append(
+                    (f"{directory}/{entry.name}", stat.st_size, stat.st_mtime_ns)
+                )
+    return files
+
+
+def parquet_stats(path):
+    """
+    Number of rows, frequency bins and the time span of a window, from the Parquet
+    footer only. The time span comes from the statistics of the index column and is
+    NaT if the file has none.
+    """
+    metadata = pq.read_metadata(path)
+    schema = metadata.schema.to_arrow_schema()
+    index_columns = []
+    if schema.metadata and b"pandas" in schema.metadata:
+        pandas_metadata = json.loads(schema.metadata[b"pandas"])
+        index_columns = [
+            column
+            for column in pandas_metadata["index_columns"]
+            if isinstance(column, str)
+        ]
+    time_start, time_end = pd.NaT, pd.NaT
+    if index_columns:
+        column = schema.get_field_index(index_columns[0])
+        minimums, maximums = [], []
+        for i in range(metadata.num_row_groups):
+            statistics = metadata.row_group(i).column(column).statistics
+            if statistics is not None and statistics.has_min_max:
+                minimums.append(statistics.min)
+                maximums.append(statistics.max)
+        if minimums:
+            time_start, time_end = pd.Timestamp(min(minimums)), pd.Timestamp(
+                max(maximums)
+            )
+    return (
+        metadata.num_rows,
+        metadata.num_columns - len(index_columns),
+        time_start,
+        time_end,
+    )
+
+
+def parse_paths(paths):
+    """
+    Antenna, label and datetime from paths relative to root, parsed in one pass.
+    Files whose name is not a datetime (e.g. shard indexes) get NaT.
+    """
+    parts = pd.Series(paths, dtype=object).str.split("/")
+    depth = parts.str.len()
+    filename = parts.str[-1].str.removesuffix(".parquet")
+    return pd.DataFrame(
+        {
+            "antenna": parts.str[0],
+            "label": parts.str[1].where(depth == 3),
+            "datetime": pd.to_datetime(
+                filename, format=DATETIME_FORMAT, errors="coerce"
+            ),
+        }
+    )
+
+
+class DatasetIndex:
+    def __init__(self, root, files=None, directories=None):
+        self.root = root
+        self.files = files if files is not None else pd.DataFrame(columns=COLUMNS)
+        self.directories = directories or {}
+
+    @classmethod
+    def load(cls, root):
+        folder = os.path.join(root, INDEX_FOLDER)
+        path = os.path.join(folder, "files.parquet")
+        if not os.path.exists(path):
+            return cls(root)
+        with open(os.path.join(folder, "directories.json"), "r") as f:
+            directories = json.load(f)
+        return cls(root, pd.read_parquet(path), directories)
+
+    def save(self):
+        """
+        Writes the index to temporary files first, so an interruption never leaves
+        a truncated index behind.
+        """
+        folder = os.path.join(self.root, INDEX_FOLDER)
+        os.makedirs(folder, exist_ok=True)
+        path = os.path.join(folder, "files.parquet")
+        self.files.to_parquet(path + ".part", index=False)
+        with open(os.path.join(folder, "directories.json.part"), "w") as f:
+            json.dump(self.directories, f, indent=1, sort_keys=True)
+        os.replace(path + ".part", path)
+        os.replace(
+            os.path.join(folder, "directories.json.part"),
+            os.path.join(folder, "directories.json"),
+        )
+
+    def update(self, max_workers=16):
+        """
+        Lists the directories that are new or changed and reads the footers of the
+        new or changed files in them. Removed directories are dropped.
+        :return: The number of listed directories
+        """
+        directories = list_directories(self.root, max_workers)
+        changed = [
+            directory
+            for directory, mtime in directories.items()
+            if self.directories.get(directory) != mtime
+        ]
+        removed = set(self.directories) - set(directories)
+        if not changed and not removed:
+            return 0
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            listings = list(
+                executor.map(
+                    lambda directory: list_files(self.root, directory), changed
+                )
+            )
+        listed = pd.DataFrame(
+            [file for files in listings for file in files],
+            columns=["path", "size", "mtime_ns"],
+        )
+        listed = listed.sort_values("path", ignore_index=True)
+        # Files that did not change keep their footer stats
+        known = self.files.set_index("path")
+        unchanged = listed["path"].isin(known.index)
+        unchanged[unchanged] = (
+            known.loc[listed.loc[unchanged, "path"], ["size", "mtime_ns"]].to_numpy()
+            == listed.loc[unchanged, ["size", "mtime_ns"]].to_numpy()
+        ).all(axis=1)
+        new = listed[~unchanged]
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            stats = list(
+                executor.map(
+                    lambda path: parquet_stats(os.path.join(self.root, path)),
+                    new["path"],
+                )
+            )
+        new = pd.concat(
+            [
+                new.reset_index(drop=True),
+                pd.DataFrame(
+                    stats,
+                    columns=["n_rows", "n_frequencies", "time_start", "time_end"],
+                ),
+                parse_paths(new["path"].tolist()),
+            ],
+            axis=1,
+        )
+        new["directory"] = new["path"].str.rsplit("/", n=1).str[0]
+
+        keep = ~self.files["directory"].isin(set(changed) | removed)
+        kept = pd.concat(
+            [
+                self.files[keep],
+                known.loc[listed.loc[unchanged, "path"]].reset_index(),
+            ]
+        )
+        frames = [frame[COLUMNS] for frame in [kept, new] if len(frame)]
+        self.files = (
+            pd.concat(frames, ignore_index=True)
+            .sort_values("path", ignore_index=True)
+            .astype({"time_start": "datetime64[ns]", "time_end": "datetime64[ns]"})
+            if frames
+            else pd.DataFrame(columns=COLUMNS)
+        )
+        for directory in removed:
+            del self.directories[directory]
+        for directory in changed:
+            self.directories[directory] = directories[directory]
+        return len(changed)
+
+
+def load_dataset_index(root, max_workers=16, save=True):
+    """
+    Loads the index of root, updates it and saves it again.
+    :return: A Pandas Dataframe with one row per sample: image (the full path),
+             antenna, label (None without label directories), datetime and the
+             footer stats
+    """
+    index = DatasetIndex.load(root)
+    if index.update(max_workers) and save:
+        index.save()
+    files = index.files[index.files["datetime"].notna()]
+    files.insert(0, "image", [os.path.join(root, path) for path in files["path"]])
+    return files.reset_index(drop=True)
@@ -0,0 +1,136 @@
+"""
+Coalescing of overlapping burst list entries into events.
+The Monstein lists often have several entries for the same minutes of a station,
+e.g. III and III/R at 10:57-11:01 and 10:58-10:58, or a long II with embedded
+IIIs. A window is generated for every row of the burst list, so such entries
+load and write almost the same window several times.
+
+coalesce_events merges the entries of every station that overlap or follow each
+other within gap into one event, as long as all of its entries start within
+max_span of its start. With the default 4 minutes, a window of 15 minutes that
+starts up to 11 minutes before the event (see labeled.JITTER) still contains
+every start of the event. An event keeps the set of its types; its type is the
+type of its longest entry (the first one on ties), which names its label folder.
+
+Usage:
+    events = coalesce_events(burst_list)
+    events[["instruments", "type", "types", "events", "datetime_start"]]
+"""
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from burstextractor.intervals import NAT, to_int64
+
+GAP = timedelta(minutes=1)
+MAX_SPAN = timedelta(minutes=4)
+TYPE_SEPARATOR = ","
+EVENT_COLUMNS = [
+    "instruments",
+    "type",
+    "types",
+    "events",
+    "datetime_start",
+    "datetime_end",
+]
+
+
+def event_ids(stations, starts, ends, gap=GAP, max_span=MAX_SPAN):
+    """
+    The event of every entry, the entries have to be sorted by station and start.
+    An entry joins the current event if it is of the same station, starts at most
+    gap after the latest end so far and at most max_span after the event start.
+    :param stations: Integer code of the station of every entry.
+    :param starts: The starts as int64 nanoseconds.
+    :param ends: The ends as int64 nanoseconds.
+    :return: The event number of every entry, ascending from 0
+    """
+    n = len(starts)
+    if n == 0:
+        return np.empty(0, dtype=np.int64)
+    gap, max_span = pd.Timedelta(gap).value, pd.Timedelta(max_span).value
+    # Blocks of overlapping or adjacent entries, like Intervals.merged per station
+    new_station = np.ones(n, dtype=bool)
+    new_station[1:] = stations[1:] != stations[:-1]
+    block = np.cumsum(new_station)
+    max_end = pd.Series(ends).groupby(block).cummax().to_numpy()
+    new = new_station.copy()
+    new[1:] |= starts[1:] > max_end[:-1] + gap
+    # Most blocks are short. Only the blocks whose starts span more than max_span
+    # are split again, entry by entry.
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], n) - 1
+    long = starts[last] - starts[first] > max_span
+    for i, j in zip(first[long], last[long]):
+        event_start, event_end = starts[i], ends[i]
+        for k in range(i + 1, j + 1):
+            if starts[k] - event_start > max_span or starts[k] > event_end + gap:
+                new[k] = True
+                event_start, event_end = starts[k], ends[k]
+            else:
+                event_end = max(event_end, ends[k])
+    return np.cumsum(new) - 1
+
+
+def coalesce_events(burst_list, gap=GAP, max_span=MAX_SPAN):
+    """
+    Merges the overlapping or near-adjacent entries of every station into events.
+    :param burst_list: A burst list with instruments (the station), type,
+                       datetime_start and datetime_end, e.g. after
+                       explode_instruments_long_clean_instruments. Rows without
+                       times, station or type are dropped.
+    :param gap: Entries that start at most gap after the end of an event join it.
+    :param max_span: The latest start of an entry after the start of its event.
+    :return: A Dataframe with one row per event, sorted by start: the station,
+             the type of its longest entry, the sorted types joined by ",", the
+             number of entries and its start and end
+    """
+    starts = to_int64(burst_list["datetime_start"].to_numpy())
+    ends = to_int64(burst_list["datetime_end"].to_numpy())
+    known = (
+        (starts != NAT)
+        & (ends != NAT)
+        & burst_list["instruments"].notna().to_numpy()
+        & burst_list["type"].notna().to_numpy()
+    )
+    entries = pd.DataFrame(
+        {
+            "instruments": burst_list["instruments"].to_numpy()[known],
+            "type": burst_list["type"].astype(str).to_numpy()[known],
+            "start": starts[known],
+            "end": np.maximum(ends[known], starts[known]),
+        }
+    )
+    stations = pd.factorize(entries["instruments"])[0]
+    order = np.lexsort((entries["start"].to_numpy(), stations))
+    entries = entries.iloc[order].reset_index(drop=True)
+    entries["event"] = event_ids(
+        stations[order],
+        entries["start"].to_numpy(),
+        entries["end"].to_numpy(),
+        gap,
+        max_span,
+    )
+
+    events = entries.groupby("event", sort=True)
+    duration = entries["end"] - entries["start"]
+    longest = duration.groupby(entries["event"]).idxmax()
+    pairs = entries[["event", "type"]].drop_duplicates().sort_values(["event", "type"])
+    # Joining strings per group is slow, and most events have a single type
+    types = pd.Series(entries["type"].to_numpy()[longest.to_numpy()], dtype=object)
+    several = pairs["event"].duplicated(keep=False)
+    types.update(pairs[several].groupby("event")["type"].agg(TYPE_SEPARATOR.join))
+    result = pd.DataFrame(
+        {
+            "instruments": events["instruments"].first(),
+            "type": entries["type"].to_numpy()[longest.to_numpy()],
+            "types": types.to_numpy(),
+            "events": events.size(),
+            "datetime_start": events["start"].min().astype("datetime64[ns]"),
+            "datetime_end": events["end"].max().astype("datetime64[ns]"),
+        }
+    )
+    return result.sort_values("datetime_start", kind="stable").reset_index(drop=True)[
+        EVENT_COLUMNS
+    ]
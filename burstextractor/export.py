@@ -0,0 +1,262 @@
+"""
+Export of a dataset split to image Parquet shards.
+Every window (a Parquet file) is read, normalized to uint8 and encoded as PNG (or
+kept as raw uint8 bytes) in a process pool, and the encoded images are written
+straight into Parquet shards with the rest of the metadata. The shards use the
+Hugging Face layout (data/<split>-00000-of-00004.parquet) and carry the features
+in their schema metadata, so the folder can be uploaded as it is and
+load_dataset(folder) gives an Image column. There is no second pass that
+decodes and re-encodes the images.
+
+At most max_in_flight chunks are submitted to the pool at once, and the chunks
+are written in their submission order, so the memory use does not grow with the
+size of the split and the output does not depend on the number of workers.
+
+Usage:
+    export_dataset({"train": train_df, "test": test_df}, "hf_export")
+    HfApi().upload_folder(folder_path="hf_export", repo_id=..., repo_type="dataset")
+"""
+import io
+import json
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from PIL import Image as PILImage
+from tqdm import tqdm
+
+from burstextractor.shards import to_fixed_shape
+
+CHUNK_SIZE = 256
+ROWS_PER_SHARD = 16384
+# Arrow types whose Hugging Face dtype has a different name
+HF_DTYPES = {"double": "float64", "float": "float32", "halffloat": "float16"}
+
+
+def to_uint8(df, shape=None):
+    """
+    The window as a (frequencies, times) uint8 image, like df.values.T.
+    :param shape: Resample to this (frequencies, times) shape, see to_fixed_shape.
+    """
+    if shape is not None:
+        return to_fixed_shape(df, shape)
+    values = df.to_numpy().T
+    if values.dtype == np.uint8:
+        return np.ascontiguousarray(values)
+    values = np.nan_to_num(values.astype(np.float32), nan=0.0)
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+def encode_image(image, image_format="png"):
+    """
+    Encodes a uint8 image as PNG or as its raw bytes.
+    """
+    if image_format == "raw":
+        return image.tobytes()
+    if image_format != "png":
+        raise ValueError(f"Unknown image format: {image_format}")
+    buffer = io.BytesIO()
+    PILImage.fromarray(image).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _encode_chunk(paths, shape, image_format):
+    """
+    Reads and encodes the windows of one chunk.
+    Returns: The encoded images (None where the file could not be read) and their
+             heights and widths
+    """
+    images, heights, widths = [], [], []
+    for path in paths:
+        try:
+            image = to_uint8(pd.read_parquet(path), shape)
+        except Exception as e:
+            print(f"{path}: {e}")
+            images.append(None)
+            heights.append(0)
+            widths.append(0)
+            continue
+        images.append(encode_image(image, image_format))
+        heights.append(image.shape[0])
+        widths.append(image.shape[1])
+    return images, heights, widths
+
+
+def hf_features(schema, image_column, image_format):
+    """
+    The Hugging Face features of the shard schema, stored in its metadata.
+    """
+    features = {}
+    for field in schema:
+        if field.name == image_column and image_format == "png":
+            features[field.name] = {"_type": "Image"}
+        else:
+            dtype = str(field.type)
+            features[field.name] = {
+                "dtype": HF_DTYPES.get(dtype, dtype),
+                "_type": "Value",
+            }
+    return {"info": {"features": features}}
+
+
+def chunk_table(
+    metadata, images, heights, widths, image_column, image_format, schema=None
+):
+    """
+    The Arrow table of one chunk: the encoded image and the metadata columns.
+    Rows whose image could not be read are left out.
+    :param schema: The schema of the metadata columns, by default inferred from
+                   the chunk.
+    """
+    ok = np.array([image is not None for image in images], dtype=bool)
+    metadata = metadata[ok].reset_index(drop=True)
+    images = [image for image in images if image is not None]
+    if image_format == "png":
+        column = pa.array(
+            [{"bytes": image, "path": None} for image in images],
+            type=pa.struct([("bytes", pa.binary()), ("path", pa.string())]),
+        )
+    else:
+        column = pa.array(images, type=pa.binary())
+    table = pa.Table.from_pandas(metadata, schema=schema, preserve_index=False)
+    table = table.add_column(0, image_column, column)
+    if image_format == "raw":
+        table = table.append_column(
+            "height", pa.array(np.asarray(heights)[ok], type=pa.int32())
+        )
+        table = table.append_column(
+            "width", pa.array(np.asarray(widths)[ok], type=pa.int32())
+        )
+    return table, ok
+
+
+def export_split(
+    df,
+    folder,
+    split,
+    image_column="image",
+    shape=None,
+    image_format="png",
+    rows_per_shard=ROWS_PER_SHARD,
+    chunk_size=CHUNK_SIZE,
+    max_workers=None,
+    max_in_flight=None,
+):
+    """
+    Encodes the windows of one split and writes them to
+    folder/data/<split>-00000-of-0000n.parquet.
+    :param df: One row per sample. image_column holds the path of the Parquet
+               window, the other columns (e.g. label, antenna, datetime) are
+               stored as they are.
+    :param shape: Resample every image to this (frequencies, times) shape. None
+                  keeps the original resolution.
+    :param image_format: "png" (a Hugging Face Image column) or "raw" (the
+                         uint8 bytes with height and width columns).
+    :param rows_per_shard: Rows per shard file, rounded up to whole chunks.
+    :param chunk_size: Rows per task of the process pool and per row group.
+    :param max_workers: Number of worker processes, None for all CPUs.
+    :param max_in_flight: Chunks submitted to the pool at once, default twice
+                          the number of workers.
+    :return: The paths of the written shards and the paths that failed
+    """
+    df = df.reset_index(drop=True)
+    paths = df[image_column].tolist()
+    metadata = df.drop(columns=image_column)
+    if "datetime" in metadata.columns:
+        metadata["datetime"] = pd.to_datetime(metadata["datetime"])
+    # The types of the whole split, a column that is all null in one chunk gets
+    # the same type as in the others
+    metadata_schema = pa.Schema.from_pandas(metadata, preserve_index=False)
+    chunks_per_shard = max(1, -(-rows_per_shard // chunk_size))
+    # An empty split still gets one (empty) shard
+    starts = list(range(0, len(df), chunk_size)) or [0]
+    n_shards = max(1, -(-len(starts) // chunks_per_shard))
+    max_workers = max_workers or os.cpu_count()
+    max_in_flight = max_in_flight or 2 * max_workers
+
+    data_folder = os.path.join(folder, "data")
+    os.makedirs(data_folder, exist_ok=True)
+    shard_paths = [
+        os.path.join(data_folder, f"{split}-{i:05d}-of-{n_shards:05d}.parquet")
+        for i in range(n_shards)
+    ]
+    failed = []
+    writer = None
+
+    def write(i, result):
+        nonlocal writer
+        start = starts[i]
+        table, ok = chunk_table(
+            metadata.iloc[start : start + chunk_size],
+            *result,
+            image_column,
+            image_format,
+            metadata_schema,
+        )
+        failed.extend(
+            path
+            for path, good in zip(paths[start : start + chunk_size], ok)
+            if not good
+        )
+        if i % chunks_per_shard == 0:
+            if writer is not None:
+                writer.close()
+            schema = table.schema.with_metadata(
+                {
+                    **(table.schema.metadata or {}),
+                    b"huggingface": json.dumps(
+                        hf_features(table.schema, image_column, image_format)
+                    ).encode(),
+                }
+            )
+            writer = pq.ParquetWriter(
+                shard_paths[i // chunks_per_shard] + ".part", schema
+            )
+        writer.write_table(table)
+
+    pbar = tqdm(total=len(df), desc=f"[{split}]")
+    with ProcessPoolExecutor(max_workers=max_workers) as executor:
+        in_flight = deque()
+        for i, start in enumerate(starts):
+            in_flight.append(
+                executor.submit(
+                    _encode_chunk,
+                    paths[start : start + chunk_size],
+                    shape,
+                    image_format,
+                )
+            )
+            if len(in_flight) >= max_in_flight:
+                j = i - len(in_flight) + 1
+                write(j, in_flight.popleft().result())
+                pbar.update(len(paths[starts[j] : starts[j] + chunk_size]))
+        while in_flight:
+            j = len(starts) - len(in_flight)
+            write(j, in_flight.popleft().result())
+            pbar.update(len(paths[starts[j] : starts[j] + chunk_size]))
+    pbar.close()
+    writer.close()
+    for path in shard_paths:
+        os.replace(path + ".part", path)
+    # Shards of an earlier export of this split with another number of shards
+    for name in os.listdir(data_folder):
+        path = os.path.join(data_folder, name)
+        if name.startswith(f"{split}-") and name.endswith(".parquet"):
+            if path not in shard_paths:
+                os.remove(path)
+    return shard_paths, failed
+
+
+def export_dataset(splits, folder, **kwargs):
+    """
+    Exports several splits, e.g. {"train": train_df, "validation": val_df}, see
+    export_split for the arguments.
+    Returns: A dict from the split to its shard paths and failed paths
+    """
+    return {
+        split: export_split(df, folder, split, **kwargs) for split, df in splits.items()
+    }
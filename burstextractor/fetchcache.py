@@ -0,0 +1,356 @@
+"""
+Cache of the decoded archive data of get_ecallisto_data.
+The windows of create_data.py and create_labeled_data.py overlap (consecutive
+windows, the burst windows of close events, the windows of a rerun), and every
+call of get_ecallisto_data decodes the same FITS files again. The cache keeps the
+decoded frame of every raw file, keyed on its path, size and modification time,
+so a changed file is decoded again. A request selects its files like
+ecallisto_ng's get_local_file_paths and combines their frames with ecallisto_ng's
+own concat_dfs_by_instrument and filter_dataframes, so the frames and headers are
+the same as without the cache. Only the files that are not cached are decoded.
+
+The frames of the most recently used files are kept in memory, up to hot_bytes
+per process. The disk tier is bounded by max_bytes and evicts the least recently
+used files (a hit touches the file) down to LOW_WATER of it. Worker processes
+share the folder: each one lists it again after writing RELIST_SHARE of
+max_bytes, so the folder can only grow past max_bytes by that share per process.
+folder=None keeps the frames in memory only. The listings of the day folders
+(only the files of the requested instrument) are kept for the last MAX_LISTINGS
+requests and listed again when the folder changes. The hit and miss counters
+tell how large the cache has to be.
+
+Usage:
+    configure_fetch_cache(".fetch_cache", max_bytes=20 * 2**30)
+    dfs = get_ecallisto_data(start, end, instrument_name="GLASGOW_01")
+    print(fetch_cache_stats())
+"""
+import fnmatch
+import hashlib
+import multiprocessing
+import os
+import pickle
+from collections import OrderedDict
+
+import pandas as pd
+from ecallisto_ng.data_download import downloader
+from ecallisto_ng.data_download.utils import (
+    concat_dfs_by_instrument,
+    extract_datetime_from_filename,
+    filter_dataframes,
+    instrument_name_to_globbing_pattern,
+    to_naive_utc,
+)
+
+from burstextractor.coverage import FILE_DURATION
+
+CACHE_FOLDER = ".fetch_cache"
+MAX_BYTES = 10 * 2**30
+# Evictions stop at this share of max_bytes, so the next write does not evict again
+LOW_WATER = 0.9
+# Each process lists the folder again after writing this share of max_bytes
+RELIST_SHARE = 0.01
+HOT_BYTES = 512 * 2**20
+# Listings of (day folder, instrument) kept per process
+MAX_LISTINGS = 16
+COUNTERS = ["memory_hits", "disk_hits", "misses", "evictions"]
+
+
+def frame_nbytes(df):
+    """
+    The memory of a decoded frame.
+    """
+    return int(df.memory_usage(index=True).sum())
+
+
+class FetchCache:
+    def __init__(
+        self,
+        folder=CACHE_FOLDER,
+        max_bytes=MAX_BYTES,
+        hot_bytes=HOT_BYTES,
+        base_path=None,
+    ):
+        """
+        :param folder: The folder of the disk tier, None for no disk tier.
+        :param max_bytes: The size of the disk tier, shared by all processes
+                          that use the folder. The least recently used files
+                          are removed above it.
+        :param hot_bytes: The memory of the frames kept in this process.
+        :param base_path: The local archive, by default the one of ecallisto_ng.
+        """
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.hot_bytes = hot_bytes
+        self.base_path = downloader.LOCAL_PATH if base_path is None else base_path
+        # Key -> (frame, bytes), least recently used first
+        self.hot = OrderedDict()
+        self.hot_size = 0
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # (day folder, pattern) -> (modification time, [(name, path, key)]),
+        # least recently used first
+        self.listings = OrderedDict()
+        # The size of the folder at the last listing, and what this process
+        # wrote since
+        self.size = 0
+        self.unlisted = 0
+        if folder is not None:
+            os.makedirs(folder, exist_ok=True)
+            self.evict()
+
+    def entries(self):
+        """
+        The frames on disk as (path, size, last use).
+        """
+        entries = []
+        with os.scandir(self.folder) as scan:
+            for entry in scan:
+                if entry.name.endswith(".pkl"):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        # Evicted by another process meanwhile
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime_ns))
+        return entries
+
+    def list_day(self, path, pattern):
+        """
+        The files of a day folder that match pattern, in the order of the
+        folder, with their cache keys. Listed again only when the folder
+        changed.
+        Returns: A list of (name, path, key)
+        """
+        try:
+            mtime = os.stat(path).st_mtime_ns
+        except FileNotFoundError:
+            return []
+        cached = self.listings.get((path, pattern))
+        if cached is not None and cached[0] == mtime:
+            self.listings.move_to_end((path, pattern))
+            return cached[1]
+        files = []
+        with os.scandir(path) as scan:
+            for entry in scan:
+                # Like glob: no hidden files, case sensitive
+                if entry.name.startswith(".") or not fnmatch.fnmatchcase(
+                    entry.name, pattern
+                ):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                key = hashlib.sha1(
+                    f"{entry.path}|{stat.st_size}|{stat.st_mtime_ns}".encode()
+                ).hexdigest()
+                files.append((entry.name, entry.path, key))
+        self.listings[(path, pattern)] = (mtime, files)
+        self.listings.move_to_end((path, pattern))
+        while len(self.listings) > MAX_LISTINGS:
+            self.listings.popitem(last=False)
+        return files
+
+    def local_files(self, start, end, instrument_name=None):
+        """
+        The files of ecallisto_ng's get_local_file_paths: the day folders of
+        pd.date_range(start, end) and the files that start at most
+        FILE_DURATION before start or after end.
+        Returns: A list of (path, key)
+        """
+        if instrument_name:
+            pattern = instrument_name_to_globbing_pattern(instrument_name)
+        else:
+            pattern = "*"
+        files = []
+        for date in pd.date_range(start, end, inclusive="both"):
+            path = os.path.join(
+                self.base_path, f"{date.year}", f"{date.month:02d}", f"{date.day:02d}"
+            )
+            for name, file_path, key in self.list_day(path, pattern):
+                file_start = extract_datetime_from_filename(name)
+                if (
+                    file_start is not None
+                    and start - FILE_DURATION <= file_start <= end + FILE_DURATION
+                ):
+                    files.append((file_path, key))
+        return files
+
+    def path(self, key):
+        return os.path.join(self.folder, key + ".pkl")
+
+    def read(self, key):
+        """
+        The frame of a file from the memory or disk tier, None on a miss.
+        """
+        if key in self.hot:
+            self.hot.move_to_end(key)
+            self.counters["memory_hits"] += 1
+            return self.hot[key][0]
+        if self.folder is None:
+            return None
+        path = self.path(key)
+        try:
+            with open(path, "rb") as f:
+                df = pickle.load(f)
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        self.counters["disk_hits"] += 1
+        self.remember(key, df)
+        return df
+
+    def remember(self, key, df):
+        """
+        Keeps the frame in memory, the least recently used frames are dropped
+        above hot_bytes.
+        """
+        if key in self.hot:
+            self.hot_size -= self.hot.pop(key)[1]
+        nbytes = frame_nbytes(df)
+        if nbytes > self.hot_bytes:
+            return
+        self.hot[key] = (df, nbytes)
+        self.hot_size += nbytes
+        while self.hot_size > self.hot_bytes:
+            self.hot_size -= self.hot.popitem(last=False)[1][1]
+
+    def write(self, key, df):
+        self.remember(key, df)
+        if self.folder is None:
+            return
+        path = self.path(key)
+        part = f"{path}.{os.getpid()}.part"
+        with open(part, "wb") as f:
+            pickle.dump(df, f, protocol=pickle.HIGHEST_PROTOCOL)
+        self.unlisted += os.path.getsize(part)
+        os.replace(part, path)
+        # Other processes write to the folder as well, so it is listed again
+        # after every RELIST_SHARE of max_bytes
+        if (
+            self.size + self.unlisted > self.max_bytes
+            or self.unlisted > RELIST_SHARE * self.max_bytes
+        ):
+            self.evict()
+
+    def evict(self):
+        """
+        Lists the folder, which other processes may share, and removes the least
+        recently used frames down to LOW_WATER of max_bytes if it is larger than
+        max_bytes.
+        """
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        self.size = sum(size for _, size, _ in entries)
+        self.unlisted = 0
+        if self.size <= self.max_bytes:
+            return
+        for path, size, _ in entries:
+            if self.size <= LOW_WATER * self.max_bytes:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            self.size -= size
+            self.counters["evictions"] += 1
+
+    def frame(self, path, key):
+        """
+        The decoded frame of a raw file, None if it cannot be decoded.
+        """
+        df = self.read(key)
+        if df is None:
+            self.counters["misses"] += 1
+            df = downloader.fetch_fits_to_pandas(path, False)
+            if df is not None:
+                self.write(key, df)
+        return df
+
+    def get_ecallisto_data(
+        self, start, end, instrument_name=None, download_from_local=True
+    ):
+        """
+        Same as ecallisto_ng's get_ecallisto_data for the local archive.
+        Returns: A dict of name: pandas.DataFrame with the data in [start, end]
+        """
+        if not download_from_local or not os.path.exists(self.base_path):
+            return downloader.get_ecallisto_data(
+                start,
+                end,
+                instrument_name=instrument_name,
+                download_from_local=download_from_local,
+            )
+        start, end = to_naive_utc(start), to_naive_utc(end)
+        frames = [
+            self.frame(path, key)
+            for path, key in self.local_files(start, end, instrument_name)
+        ]
+        dfs = concat_dfs_by_instrument([df for df in frames if df is not None])
+        return filter_dataframes(dfs, start, end)
+
+    def stats(self):
+        """
+        The hit and miss counters of this process, the hit rate, the size of
+        the disk tier (at its last listing, plus what this process wrote since)
+        and the memory of the frames kept in this process.
+        """
+        requests = sum(self.counters[k] for k in ["memory_hits", "disk_hits", "misses"])
+        hits = self.counters["memory_hits"] + self.counters["disk_hits"]
+        return {
+            **self.counters,
+            "hit_rate": hits / requests if requests else 0.0,
+            "bytes": self.size + self.unlisted,
+            "hot_bytes": self.hot_size,
+        }
+
+
+def init_worker():
+    """
+    Initializer of the worker processes of both scripts. ecallisto_ng decodes
+    the files of every get_ecallisto_data call in a new pool of os.cpu_count()
+    processes unless it runs in a daemon process. The worker is marked as one,
+    so it decodes the files itself instead of starting a pool for every call.
+    """
+    multiprocessing.current_process().daemon = True
+
+
+_cache = None
+
+
+def configure_fetch_cache(folder=CACHE_FOLDER, **kwargs):
+    """
+    Routes get_ecallisto_data of this module through a FetchCache, see
+    FetchCache for the arguments. Processes forked afterwards use it as well.
+    folder=None turns the cache off.
+    Returns: The cache
+    """
+    global _cache
+    _cache = None if folder is None else FetchCache(folder, **kwargs)
+    return _cache
+
+
+def get_fetch_cache():
+    """
+    The cache configured with configure_fetch_cache, None without one.
+    """
+    return _cache
+
+
+def fetch_cache_stats():
+    """
+    The counters of the cache of this process, None without a cache.
+    """
+    return None if _cache is None else _cache.stats()
+
+
+def get_ecallisto_data(start, end, instrument_name=None, download_from_local=True):
+    """
+    ecallisto_ng's get_ecallisto_data, through the cache if one is configured.
+    """
+    if _cache is None:
+        return downloader.get_ecallisto_data(
+            start,
+            end,
+            instrument_name=instrument_name,
+            download_from_local=download_from_local,
+        )
+    return _cache.get_ecallisto_data(start, end, instrument_name, download_from_local)
@@ -0,0 +1,178 @@
+"""
+Interval index over the bursts of the burst list.
+The bursts are kept sorted by their start together with the running maximum of
+their ends, so "does a window overlap any burst?" is a single binary search.
+Bursts are closed intervals [datetime_start, datetime_end], query windows are
+half-open [t0, t1).
+"""
+import numpy as np
+import pandas as pd
+
+NAT = np.iinfo(np.int64).min
+
+
+def to_int64(values):
+    """
+    Datetimes (numpy, pandas or python) as int64 nanoseconds, numbers as int64.
+    Returns: A 1-d int64 array
+    """
+    values = np.atleast_1d(np.asarray(values))
+    if values.dtype == object:
+        values = pd.to_datetime(values).to_numpy()
+    if np.issubdtype(values.dtype, np.datetime64):
+        return values.astype("datetime64[ns]").view(np.int64)
+    return values.astype(np.int64)
+
+
+class Intervals:
+    """
+    Sorted closed intervals [start, end] of a single group of bursts.
+    """
+
+    def __init__(self, starts, ends, rows):
+        order = np.argsort(starts, kind="stable")
+        self.starts = starts[order]
+        self.ends = ends[order]
+        self.rows = rows[order]
+        # max_end[i] is the latest end of the intervals 0..i
+        self.max_end = np.maximum.accumulate(self.ends) if len(order) else self.ends
+        self.max_duration = int((self.ends - self.starts).max()) if len(order) else 0
+
+    def __len__(self):
+        return len(self.starts)
+
+    def merged(self):
+        """
+        The union of the intervals as sorted, disjoint intervals.
+        Returns: starts and ends (int64)
+        """
+        if len(self) == 0:
+            return self.starts, self.ends
+        # A new block starts where an interval begins after all previous ones ended
+        new = np.ones(len(self), dtype=bool)
+        new[1:] = self.starts[1:] > self.max_end[:-1]
+        first = np.flatnonzero(new)
+        last = np.append(first[1:], len(self)) - 1
+        return self.starts[first], self.max_end[last]
+
+    def overlaps(self, t0, t1):
+        """
+        For every window [t0[i], t1[i]), whether it overlaps any interval.
+        An interval overlaps if it starts before t1 and ends at or after t0.
+        """
+        n_before = np.searchsorted(self.starts, t1, side="left")
+        result = np.zeros(len(t0), dtype=bool)
+        has = n_before > 0
+        result[has] = self.max_end[n_before[has] - 1] >= t0[has]
+        return result
+
+    def overlapping(self, t0, t1):
+        """
+        The (window, row) pairs of all overlapping intervals.
+        Only the intervals that start in [t0 - max_duration, t1) can overlap, so
+        the work is O(log N) per window plus the number of candidates.
+        """
+        lo = np.searchsorted(self.starts, t0 - self.max_duration, side="left")
+        hi = np.searchsorted(self.starts, t1, side="left")
+        counts = np.maximum(hi - lo, 0)
+        window = np.repeat(np.arange(len(t0)), counts)
+        # Position lo[w], lo[w] + 1, ..., hi[w] - 1 for every window w
+        first = np.repeat(lo - np.cumsum(counts) + counts, counts)
+        position = first + np.arange(counts.sum())
+        keep = self.ends[position] >= t0[window]
+        return window[keep], self.rows[position[keep]]
+
+
+class BurstIntervals:
+    """
+    Answers overlap queries against the bursts of a burst list, for all bursts or
+    only the bursts seen by one instrument.
+
+    Usage:
+        intervals = BurstIntervals.from_burst_list(burst_list)
+        intervals.overlaps(start, start + timedelta(minutes=15))
+        intervals.overlaps_many(starts, ends, instrument="GLASGOW")
+        rows = intervals.overlapping(start, end)  # positions in burst_list
+    """
+
+    def __init__(self, starts, ends, instruments=None):
+        """
+        :param starts: The burst starts (datetimes or numbers).
+        :param ends: The burst ends, same length and unit as starts.
+        :param instruments: Optional instrument of every burst, for per-instrument
+                            queries.
+        """
+        starts, ends = to_int64(starts), to_int64(ends)
+        rows = np.arange(len(starts))
+        # NaT is the smallest int64
+        known = (starts != NAT) & (ends != NAT)
+        starts, ends, rows = starts[known], ends[known], rows[known]
+        self.all = Intervals(starts, ends, rows)
+        self.by_instrument = {}
+        if instruments is not None:
+            codes, names = pd.factorize(pd.Series(instruments), use_na_sentinel=True)
+            for code, name in enumerate(names):
+                mask = codes[known] == code
+                self.by_instrument[name] = Intervals(
+                    starts[mask], ends[mask], rows[mask]
+                )
+
+    @classmethod
+    def from_burst_list(cls, burst_list, by_instrument=True):
+        """
+        :param burst_list: A burst list with datetime_start, datetime_end and
+                           instruments columns. Rows without times are ignored,
+                           row numbers refer to the positions in burst_list.
+        :param by_instrument: Whether to build the per-instrument indexes.
+        """
+        return cls(
+            burst_list["datetime_start"].to_numpy(),
+            burst_list["datetime_end"].to_numpy(),
+            burst_list["instruments"].to_numpy() if by_instrument else None,
+        )
+
+    def _intervals(self, instrument):
+        if instrument is None:
+            return self.all
+        return self.by_instrument.get(
+            instrument, Intervals(*[np.empty(0, dtype=np.int64)] * 3)
+        )
+
+    def __len__(self):
+        return len(self.all)
+
+    def merged(self, instrument=None):
+        """
+        The time covered by the bursts (of instrument) as sorted, disjoint closed
+        intervals in int64 nanoseconds.
+        """
+        return self._intervals(instrument).merged()
+
+    def overlaps_many(self, t0, t1, instrument=None):
+        """
+        Batched form of overlaps.
+        :param t0: The window starts.
+        :param t1: The window ends (exclusive).
+        :param instrument: Only check the bursts of this instrument.
+        :return: A bool array, True where the window overlaps a burst.
+        """
+        return self._intervals(instrument).overlaps(to_int64(t0), to_int64(t1))
+
+    def overlaps(self, t0, t1, instrument=None):
+        """
+        Whether the window [t0, t1) overlaps any burst (of instrument).
+        """
+        return bool(self.overlaps_many(t0, t1, instrument)[0])
+
+    def overlapping_many(self, t0, t1, instrument=None):
+        """
+        Batched form of overlapping.
+        :return: Two int arrays (window, row): window i overlaps burst_list row.
+        """
+        return self._intervals(instrument).overlapping(to_int64(t0), to_int64(t1))
+
+    def overlapping(self, t0, t1, instrument=None):
+        """
+        The sorted positions of the bursts that overlap the window [t0, t1).
+        """
+        return np.sort(self.overlapping_many(t0, t1, instrument)[1])
@@ -0,0 +1,408 @@
+"""
+Generation of the labeled burst / non-burst dataset as generators.
+For every instrument, a window around every burst of the burst list is loaded
+(jittered by a random offset), followed by ratio times as many windows that
+overlap no burst. Nothing is written: the windows are yielded one unit of work at
+a time, so a caller can write them as Parquet files (create_labeled_data.py),
+append them to shards or feed them to training directly. Only the window being
+yielded is in memory, whatever the date range or number of instruments.
+
+Every instrument draws its jitter and non-burst windows from its own generator,
+seeded by the seed and the instrument name, so the samples of an instrument do
+not depend on which other instruments run before it or in parallel.
+
+Usage:
+    for df, metadata in labeled_samples(burst_list, ["GLASGOW_01"], START_DATE):
+        ...
+    for image, metadata in as_arrays(labeled_samples(...), shape=(256, 256)):
+        ...
+"""
+import os
+import zlib
+from collections import namedtuple
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+from burstextractor.checkpoint import unit_key
+from burstextractor.events import coalesce_events
+from burstextractor.fetchcache import get_ecallisto_data
+from burstextractor.intervals import BurstIntervals
+from burstextractor.sampling import NonBurstSampler
+from burstextractor.shards import SHAPE, to_fixed_shape
+
+WINDOW = timedelta(minutes=15)
+MIN_DURATION = timedelta(minutes=10)
+JITTER = (0, 11)  # Minutes a burst window starts before the burst
+NON_BURST_LABEL = "0"
+
+# A unit of work: its checkpoint key and the (df, metadata) samples it produced,
+# usually one, none if the data was missing or too short.
+Unit = namedtuple("Unit", ["key", "instrument", "samples"])
+
+
+def load_samples(instrument, start, end, metadata, min_duration=MIN_DURATION):
+    """
+    Loads the window [start, end] of instrument.
+    Returns: A list of (df, metadata) for the loaded frames of exactly this
+             instrument that are longer than min_duration
+    """
+    dfs = get_ecallisto_data(
+        start,
+        end,
+        instrument_name=instrument,
+        download_from_local=True,
+    )
+    samples = []
+    for _, df in dfs.items():
+        if df is None or df.empty or df.attrs.get("FULLNAME") != instrument:
+            continue
+        if (df.index.max() - df.index.min()) <= pd.Timedelta(min_duration):
+            continue
+        samples.append((df, {**metadata, "start": start, "end": end}))
+    return samples
+
+
+def instrument_rng(seed, instrument):
+    """
+    The random generator of an instrument, the same for the same seed and name.
+    """
+    return np.random.default_rng([seed, zlib.crc32(instrument.encode())])
+
+
+class BurstIndex:
+    """
+    The burst list prepared once for all instruments: the bursts of every station
+    (in burst list order, or its events) and the interval index of all bursts.
+    """
+
+    def __init__(self, burst_list, start_date=None, max_span=None):
+        """
+        :param burst_list: The burst list of all stations.
+        :param start_date: Only bursts from this date on.
+        :param max_span: Coalesce the overlapping bursts of every station into
+                         events whose starts lie within max_span (see
+                         events.coalesce_events), one window per event. None
+                         keeps one window per burst.
+        """
+        burst_list = burst_list[
+            ["instruments", "type", "datetime_start", "datetime_end"]
+        ]
+        if start_date is not None:
+            burst_list = burst_list[burst_list["datetime_start"] >= start_date]
+        # Bursts without a type have no label, but still count as bursts below
+        events = burst_list[burst_list["type"].notna()]
+        if max_span is not None:
+            events = coalesce_events(events, max_span=max_span)
+        self.stations = {
+            station: bursts.reset_index(drop=True)
+            for station, bursts in events.groupby("instruments", sort=False)
+        }
+        self.empty = burst_list.iloc[:0]
+        # The free time is computed against the bursts of ALL stations, even if
+        # they had weird typos and bursts of other instruments.
+        self.intervals = BurstIntervals.from_burst_list(burst_list, by_instrument=False)
+        self.start = burst_list["datetime_start"].min()
+        self.end = burst_list["datetime_start"].max()
+
+    def bursts(self, instrument):
+        """
+        The bursts of an instrument, matched by its station, e.g. "GLASGOW" for
+        "GLASGOW_01".
+        """
+        return self.stations.get(instrument.split("_")[0], self.empty)
+
+
+def file_names(datetimes):
+    """
+    The file names of the datetimes without extension, like
+    strftime("%Y-%m-%d_%H-%M-%S") but an order of magnitude faster.
+    """
+    names = np.datetime_as_string(datetimes.to_numpy(dtype="datetime64[s]"), unit="s")
+    return pd.Series(names, index=datetimes.index).str.translate(
+        str.maketrans("T:", "_-")
+    )
+
+
+def plan_windows(
+    instrument,
+    labels,
+    datetimes,
+    starts,
+    window=WINDOW,
+    coverage=None,
+    checkpoint=None,
+    folder=None,
+):
+    """
+    The plan of a batch of windows of one instrument, computed column by column.
+    :param labels: The label of every window.
+    :param datetimes: The datetime that names every window (the burst start).
+    :param starts: The start of every window.
+    :param coverage: Optional CoverageIndex, fills the covered column.
+    :param checkpoint: Optional Checkpoint, fills the done column.
+    :param folder: Optional output folder, fills the path column (see sample_path).
+    :return: A Dataframe with key (see unit_key), instrument, label, datetime,
+             start, end, covered (NaT without coverage), done and path
+    """
+    datetimes = pd.Series(pd.to_datetime(datetimes)).astype("datetime64[ns]")
+    starts = pd.Series(pd.to_datetime(starts)).astype("datetime64[ns]")
+    labels = pd.Series(np.asarray(labels, dtype=object)).astype(str)
+    # The same as unit_key, astype(str) would drop the time if all are at midnight
+    times = datetimes.dt.strftime("%Y-%m-%d %H:%M:%S")
+    plan = pd.DataFrame(
+        {
+            "key": instrument + "/" + labels + "/" + times,
+            "instrument": instrument,
+            "label": labels,
+            "datetime": datetimes,
+            "start": starts,
+            "end": starts + pd.Timedelta(window),
+        }
+    )
+    plan["covered"] = pd.Series(pd.NaT, index=plan.index, dtype="timedelta64[ns]")
+    if coverage is not None and len(plan):
+        plan["covered"] = coverage.covered_duration(
+            plan["start"], plan["end"], instrument
+        ).to_numpy(dtype="timedelta64[ns]")
+    plan["done"] = False
+    if checkpoint is not None:
+        plan["done"] = plan["key"].isin(checkpoint.units.keys())
+    plan["path"] = None
+    if folder is not None:
+        plan["path"] = (
+            folder
+            + os.sep
+            + plan["instrument"]
+            + os.sep
+            + plan["label"]
+            + os.sep
+            + file_names(plan["datetime"])
+            + ".parquet"
+        )
+    return plan
+
+
+def plan_bursts(bursts, instrument, rng, jitter=JITTER, **kwargs):
+    """
+    The plan of the burst windows: every window starts a random whole number of
+    minutes in jitter (inclusive) before its burst. The jitter is drawn for all
+    bursts at once, finished ones included, so a restarted run plans the same
+    windows.
+    :param bursts: The bursts of the instrument (datetime_start, type and
+                   optionally the types of an event).
+    :param rng: numpy Generator of the jitter.
+    :param kwargs: See plan_windows.
+    """
+    minutes = rng.integers(jitter[0], jitter[1] + 1, size=len(bursts))
+    datetimes = bursts["datetime_start"].to_numpy(dtype="datetime64[ns]")
+    plan = plan_windows(
+        instrument,
+        bursts["type"].to_numpy(),
+        datetimes,
+        datetimes - minutes.astype("timedelta64[m]"),
+        **kwargs,
+    )
+    plan["jitter"] = minutes
+    if "types" in bursts.columns:
+        plan["types"] = bursts["types"].to_numpy()
+    return plan
+
+
+def plan_units(plan, min_duration=MIN_DURATION):
+    """
+    Loads the windows of a plan that are not done and have more than
+    min_duration of data (if the coverage is known).
+    Yields: Unit(key, instrument, samples), the metadata of every sample has
+            instrument, label, datetime, start, end, path and the types of an
+            event
+    """
+    todo = ~plan["done"] & ~(plan["covered"] <= pd.Timedelta(min_duration))
+    for row in plan[todo].itertuples(index=False):
+        metadata = {
+            "instrument": row.instrument,
+            "label": row.label,
+            "datetime": row.datetime,
+            "path": row.path,
+        }
+        if "types" in plan.columns:
+            metadata["types"] = row.types
+        yield Unit(
+            row.key,
+            row.instrument,
+            load_samples(row.instrument, row.start, row.end, metadata, min_duration),
+        )
+
+
+def non_burst_units(
+    burst_intervals,
+    instrument,
+    start,
+    end,
+    count,
+    rng,
+    window=WINDOW,
+    min_duration=MIN_DURATION,
+    **kwargs,
+):
+    """
+    Units of windows in [start, end] that overlap no burst, until count samples
+    were yielded or no free window is left.
+    :param burst_intervals: BurstIntervals of the bursts to avoid.
+    :param count: The number of samples to yield.
+    :param rng: numpy Generator of the sampling.
+    :param kwargs: coverage (only windows with data are drawn), checkpoint and
+                   folder, see plan_windows.
+    Yields: Unit(key, instrument, samples) with the label NON_BURST_LABEL
+    """
+    coverage = kwargs.get("coverage")
+    sampler = NonBurstSampler(
+        burst_intervals,
+        start,
+        end,
+        window=window,
+        available=None if coverage is None else coverage.available(instrument),
+        rng=rng,
+    )
+    generated = 0
+    # Windows are drawn and planned in batches without overlapping a burst. Only
+    # the windows whose data turns out to be too short are replaced by a new batch.
+    while generated < count and sampler.remaining:
+        starts = sampler.sample(count - generated)
+        plan = plan_windows(
+            instrument,
+            np.full(len(starts), NON_BURST_LABEL),
+            starts,
+            starts,
+            window,
+            **kwargs,
+        )
+        for unit in plan_units(plan, min_duration):
+            generated += len(unit.samples)
+            yield unit
+    if generated < count:
+        print(f"Only {generated} of {count} non burst windows for {instrument}")
+
+
+def instrument_units(
+    index,
+    instrument,
+    ratio=10,
+    coverage=None,
+    checkpoint=None,
+    seed=42,
+    window=WINDOW,
+    min_duration=MIN_DURATION,
+    jitter=JITTER,
+    folder=None,
+):
+    """
+    The burst units and then the non-burst units of one instrument.
+    :param index: The BurstIndex of the burst list.
+    :param ratio: Non-burst samples per burst sample.
+    :param coverage: Optional CoverageIndex, windows with at most min_duration
+                     of data are skipped before loading.
+    :param checkpoint: Optional Checkpoint. Finished units are skipped, their
+                       samples still count towards the ratio. Recording the
+                       units is up to the caller.
+    :param seed: Seed of the jitter and sampling, see instrument_rng.
+    :param folder: Optional output folder, the metadata then has the path.
+    Yields: Unit(key, instrument, samples)
+    """
+    rng = instrument_rng(seed, instrument)
+    plan_kwargs = dict(coverage=coverage, checkpoint=checkpoint, folder=folder)
+    plan = plan_bursts(
+        index.bursts(instrument), instrument, rng, jitter, window=window, **plan_kwargs
+    )
+    burst_generated = 0
+    if checkpoint is not None:
+        burst_generated = sum(
+            len(checkpoint.outputs(key)) for key in plan.loc[plan["done"], "key"]
+        )
+    for unit in plan_units(plan, min_duration):
+        burst_generated += len(unit.samples)
+        yield unit
+
+    non_burst_generated = 0
+    if checkpoint is not None:
+        non_burst_generated = checkpoint.count(
+            unit_key(instrument, NON_BURST_LABEL, ""), written=True
+        )
+    yield from non_burst_units(
+        index.intervals,
+        instrument,
+        index.start,
+        index.end + window,
+        burst_generated * ratio - non_burst_generated,
+        rng,
+        window,
+        min_duration,
+        **plan_kwargs,
+    )
+
+
+def labeled_units(burst_list, instruments, start_date=None, max_span=None, **kwargs):
+    """
+    The units of every instrument, one instrument after the other.
+    :param burst_list: The burst list of all stations.
+    :param instruments: The full instrument names.
+    :param start_date: Only bursts from this date on.
+    :param max_span: One window per event instead of per burst, see BurstIndex.
+    :param kwargs: See instrument_units.
+    Yields: Unit(key, instrument, samples)
+    """
+    index = BurstIndex(burst_list, start_date, max_span)
+    for instrument in instruments:
+        yield from instrument_units(index, instrument, **kwargs)
+
+
+def sample_path(folder, metadata):
+    """
+    The path of a sample: folder / instrument / label / datetime.parquet, the
+    layout read by hu_dataset.py.
+    """
+    return os.path.join(
+        folder,
+        metadata["instrument"],
+        metadata["label"],
+        metadata["datetime"].strftime("%Y-%m-%d_%H-%M-%S") + ".parquet",
+    )
+
+
+def write_unit(unit, folder, checkpoint=None):
+    """
+    Writes the samples of a unit as Parquet files and records the unit. The
+    types of an event (e.g. "II,III") are kept with the header in the Parquet
+    metadata, pd.read_parquet(path).attrs["types"].
+    Returns: The written paths
+    """
+    paths = []
+    for df, metadata in unit.samples:
+        path = metadata.get("path") or sample_path(folder, metadata)
+        if metadata.get("types") is not None:
+            df.attrs = {**df.attrs, "types": metadata["types"]}
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        df.to_parquet(path)
+        paths.append(path)
+    if checkpoint is not None:
+        checkpoint.record(unit.key, paths)
+    return paths
+
+
+def labeled_samples(*args, **kwargs):
+    """
+    The samples of labeled_units (same arguments), one at a time.
+    Yields: (df, metadata)
+    """
+    for unit in labeled_units(*args, **kwargs):
+        yield from unit.samples
+
+
+def as_arrays(samples, shape=SHAPE):
+    """
+    Resamples (df, metadata) samples to fixed-shape uint8 images.
+    Yields: (image, metadata), image is a (frequencies, times) uint8 array
+    """
+    for df, metadata in samples:
+        yield to_fixed_shape(df, shape), metadata
@@ -0,0 +1,205 @@
+"""
+Parallel generation of the labeled dataset, one job per instrument.
+The burst list is split by station once (BurstIndex) and handed to the worker
+processes when they start, together with the coverage index. With the fork start
+method the workers inherit both without copying or pickling them; the jobs only
+send the instrument name. Every worker records its units in its own checkpoint
+log, so the jobs never write the same file.
+
+The jitter and non-burst windows of an instrument come from a generator seeded by
+the seed and the instrument name, so the output is the same as a serial run
+(max_workers=1) with the same seed.
+
+Usage:
+    summary = generate_labeled_data(burst_list, INSTRUMENT_FILTER, FOLDER, START_DATE)
+"""
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import pandas as pd
+from tqdm import tqdm
+
+from burstextractor.checkpoint import Checkpoint
+from burstextractor.fetchcache import fetch_cache_stats, init_worker
+from burstextractor.labeled import (
+    NON_BURST_LABEL,
+    BurstIndex,
+    instrument_units,
+    write_unit,
+)
+
+SUMMARY_COLUMNS = [
+    "instrument",
+    "units",
+    "empty_units",
+    "bursts",
+    "non_bursts",
+    "seconds",
+    "cache_hits",
+    "cache_misses",
+    "error",
+]
+
+# Set once per worker process by _init_worker
+_index = None
+_coverage = None
+_folder = None
+_checkpoint = None
+# Optional queue, gets (instrument, samples) after every unit
+_progress = None
+
+
+def _init_worker(index, coverage, folder, progress=None):
+    global _index, _coverage, _folder, _checkpoint, _progress
+    _index, _coverage, _folder = index, coverage, folder
+    _checkpoint = Checkpoint(folder)
+    _progress = progress
+
+
+def _init_pool_worker(*args):
+    """
+    Initializer of the pool workers, which decode their files themselves (see
+    fetchcache.init_worker).
+    """
+    init_worker()
+    _init_worker(*args)
+
+
+def _run_instrument(instrument, ratio, seed, kwargs):
+    """
+    Generates and writes all units of one instrument. Errors are reported in the
+    summary instead of stopping the other instruments.
+    Returns: A summary dict (see SUMMARY_COLUMNS)
+    """
+    summary = dict.fromkeys(SUMMARY_COLUMNS, 0)
+    summary.update(instrument=instrument, error=None)
+    started = time.time()
+    cache_before = fetch_cache_stats()
+    try:
+        for unit in instrument_units(
+            _index,
+            instrument,
+            ratio=ratio,
+            coverage=_coverage,
+            checkpoint=_checkpoint,
+            seed=seed,
+            folder=_folder,
+            **kwargs,
+        ):
+            paths = write_unit(unit, _folder, _checkpoint)
+            summary["units"] += 1
+            # No data, or too short
+            summary["empty_units"] += not paths
+            label = unit.key.split("/")[1]
+            summary["non_bursts" if label == NON_BURST_LABEL else "bursts"] += len(
+                paths
+            )
+            if _progress is not None:
+                _progress.put((instrument, len(paths)))
+    except Exception as e:
+        summary["error"] = f"{type(e).__name__}: {e}"
+    summary["seconds"] = round(time.time() - started, 1)
+    if cache_before is not None:
+        cache_after = fetch_cache_stats()
+        summary["cache_misses"] = cache_after["misses"] - cache_before["misses"]
+        summary["cache_hits"] = sum(
+            cache_after[k] - cache_before[k] for k in ["memory_hits", "disk_hits"]
+        )
+    return summary
+
+
+def _report(summary):
+    if summary["error"]:
+        tqdm.write(
+            f"{summary['instrument']}: failed after {summary['units']} units: "
+            f"{summary['error']}"
+        )
+    else:
+        tqdm.write(
+            f"{summary['instrument']}: {summary['bursts']} bursts, "
+            f"{summary['non_bursts']} non bursts, {summary['empty_units']} windows "
+            f"without enough data in {summary['seconds']} s"
+        )
+
+
+def generate_labeled_data(
+    burst_list,
+    instruments,
+    folder,
+    start_date=None,
+    ratio=10,
+    coverage=None,
+    seed=42,
+    max_workers=None,
+    max_span=None,
+    **kwargs,
+):
+    """
+    Generates the burst and non-burst windows of all instruments and writes them
+    as folder/instrument/label/datetime.parquet. Finished units of earlier runs
+    are skipped.
+    :param burst_list: The burst list of all stations.
+    :param instruments: The full instrument names, one job each.
+    :param start_date: Only bursts from this date on.
+    :param ratio: Non-burst samples per burst sample of an instrument.
+    :param coverage: Optional CoverageIndex, windows without enough data are
+                     skipped before loading.
+    :param seed: Seed of the jitter and sampling.
+    :param max_workers: Number of worker processes. None or 1 runs the
+                        instruments one after the other in this process.
+    :param max_span: One window per event of overlapping bursts instead of per
+                     burst, see BurstIndex.
+    :param kwargs: Passed to instrument_units, e.g. window.
+    :return: A Dataframe with one row per instrument: units, units without a
+             sample (no data or too short), written bursts and non bursts,
+             seconds, the hits and misses of the fetch cache (see
+             fetchcache.configure_fetch_cache) and the error, if any
+    """
+    index = BurstIndex(burst_list, start_date, max_span)
+    summaries = []
+    if max_workers is None or max_workers <= 1:
+        _init_worker(index, coverage, folder)
+        for instrument in tqdm(instruments, desc="[Instruments]"):
+            summaries.append(_run_instrument(instrument, ratio, seed, kwargs))
+            _report(summaries[-1])
+    else:
+        # Fork where available, so the workers inherit the index instead of
+        # unpickling a copy each
+        context = multiprocessing.get_context()
+        if "fork" in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context("fork")
+        # A plain pipe, no feeder or manager thread runs while the workers fork
+        progress = context.SimpleQueue()
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=context,
+            initializer=_init_pool_worker,
+            initargs=(index, coverage, folder, progress),
+        ) as executor:
+            pending = {
+                executor.submit(_run_instrument, instrument, ratio, seed, kwargs)
+                for instrument in instruments
+            }
+            written = dict.fromkeys(instruments, 0)
+            # Created after the workers are forked, like its monitor thread
+            pbar = tqdm(total=len(instruments), desc="[Instruments]")
+            while pending:
+                done, pending = wait(pending, timeout=1, return_when=FIRST_COMPLETED)
+                while not progress.empty():
+                    instrument, samples = progress.get()
+                    if instrument in written:
+                        written[instrument] += samples
+                for future in done:
+                    summaries.append(future.result())
+                    _report(summaries[-1])
+                    pbar.update(1)
+                    del written[summaries[-1]["instrument"]]
+                # Samples written so far by the running instruments
+                pbar.set_postfix({k: n for k, n in written.items() if n})
+            pbar.close()
+        progress.close()
+    Checkpoint(folder).compact()
+    order = {instrument: i for i, instrument in enumerate(instruments)}
+    summaries.sort(key=lambda summary: order[summary["instrument"]])
+    return pd.DataFrame(summaries, columns=SUMMARY_COLUMNS)
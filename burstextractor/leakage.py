@@ -0,0 +1,245 @@
+"""
+Leakage check between dataset splits.
+Two windows of the same antenna whose time ranges overlap share data, even if
+they are different files (windows of create_overlapping_parquets overlap by a
+minute, burst windows are jittered around the same event). Comparing file names
+does not find them.
+
+The windows are sorted by antenna and start, so the windows that overlap window i
+are the ones after it that start before it ends: a binary search per window.
+All cross-split pairs are found in O(N log N) plus the number of overlapping
+pairs. Windows are half-open [start, end).
+
+Usage:
+    leaks = find_leaks(df)  # df with antenna, datetime and split
+    print(leak_summary(df, leaks))
+    df = resolve_leaks(df, leaks, how="drop")
+"""
+import numpy as np
+import pandas as pd
+
+from burstextractor.intervals import NAT, to_int64
+
+WINDOW = pd.Timedelta(minutes=15)
+PRIORITY = ("test", "validation", "train")
+LEAK_COLUMNS = ["left", "right", "left_split", "right_split", "antenna", "overlap"]
+
+
+def split_ranks(splits, priority=PRIORITY):
+    """
+    The rank of every split name, the splits in priority first and all others
+    after them in sorted order.
+    """
+    others = sorted(set(pd.unique(splits)) - set(priority))
+    return pd.Categorical(splits, categories=[*priority, *others]).codes.astype(
+        np.int64
+    )
+
+
+def sorted_windows(df, group_column, time_column, duration, end_column):
+    """
+    The windows sorted by group and start. Windows without a time are left out.
+    Returns: positions in df, group codes, starts and ends (int64 ns) in sorted
+             order and the group names
+    """
+    starts = to_int64(df[time_column].to_numpy())
+    if end_column is None:
+        ends = starts + pd.Timedelta(duration).value
+    else:
+        ends = to_int64(df[end_column].to_numpy())
+    if group_column is None:
+        groups, names = np.zeros(len(df), dtype=np.int64), np.array([None])
+    else:
+        groups, names = pd.factorize(df[group_column])
+    known = (starts != NAT) & (ends != NAT) & (groups >= 0)
+    positions = np.flatnonzero(known)
+    order = np.lexsort((starts[positions], groups[positions]))
+    positions = positions[order]
+    return positions, groups[positions], starts[positions], ends[positions], names
+
+
+def group_bounds(groups):
+    """
+    The (first, last + 1) positions of every run of equal group codes.
+    """
+    first = np.flatnonzero(np.diff(groups, prepend=-1) != 0)
+    return zip(first, np.append(first[1:], len(groups)))
+
+
+def find_leaks(
+    df,
+    split_column="split",
+    group_column="antenna",
+    time_column="datetime",
+    duration=WINDOW,
+    end_column=None,
+    priority=PRIORITY,
+):
+    """
+    All pairs of windows of the same antenna in different splits whose time
+    ranges overlap.
+    :param df: One row per window.
+    :param split_column: The split of every window.
+    :param group_column: Only windows with the same value are compared. None
+                         compares all windows, e.g. to find one event seen by
+                         several antennas.
+    :param time_column: The start of every window.
+    :param duration: The length of every window, if end_column is not given.
+    :param end_column: The (exclusive) end of every window.
+    :param priority: The order of the splits within a pair, see resolve_leaks.
+    :return: A Dataframe with one row per pair: left and right (index labels of
+             df, left is in the split with the higher priority), their splits,
+             the antenna and the overlap
+    """
+    positions, groups, starts, ends, names = sorted_windows(
+        df, group_column, time_column, duration, end_column
+    )
+    ranks = split_ranks(df[split_column].to_numpy(), priority)[positions]
+    pairs = []
+    # Per antenna, so only the candidates of one antenna are in memory at once
+    for lo, hi in group_bounds(groups):
+        s, e, r = starts[lo:hi], ends[lo:hi], ranks[lo:hi]
+        # The windows after i that start before i ends
+        first = np.arange(1, hi - lo)
+        last = np.searchsorted(s, e[:-1], side="left")
+        counts = np.maximum(last - first, 0)
+        i = np.repeat(np.arange(hi - lo - 1), counts)
+        j = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(
+            counts.sum()
+        )
+        leak = r[i] != r[j]
+        i, j = i[leak], j[leak]
+        pairs.append((lo + i, lo + j))
+    if not pairs:
+        return pd.DataFrame(columns=LEAK_COLUMNS)
+    i = np.concatenate([pair[0] for pair in pairs])
+    j = np.concatenate([pair[1] for pair in pairs])
+    swap = ranks[j] < ranks[i]
+    left, right = np.where(swap, j, i), np.where(swap, i, j)
+    splits = df[split_column].to_numpy()
+    return pd.DataFrame(
+        {
+            "left": df.index[positions[left]],
+            "right": df.index[positions[right]],
+            "left_split": splits[positions[left]],
+            "right_split": splits[positions[right]],
+            "antenna": names[groups[left]],
+            "overlap": pd.to_timedelta(
+                np.minimum(ends[i], ends[j]) - np.maximum(starts[i], starts[j])
+            ),
+        }
+    )
+
+
+def leak_summary(df, leaks, split_column="split"):
+    """
+    Summary of the leaks per pair of splits.
+    Returns: A Dataframe with the number of pairs, the number of affected windows
+             of both splits, their share of the split, the number of antennas
+             and the median overlap
+    """
+    sizes = df[split_column].value_counts()
+    rows = []
+    for (left, right), pairs in leaks.groupby(["left_split", "right_split"]):
+        rows.append(
+            {
+                "left_split": left,
+                "right_split": right,
+                "pairs": len(pairs),
+                "left_windows": pairs["left"].nunique(),
+                "right_windows": pairs["right"].nunique(),
+                "left_share": pairs["left"].nunique() / sizes[left],
+                "right_share": pairs["right"].nunique() / sizes[right],
+                "antennas": pairs["antenna"].nunique(),
+                "median_overlap": pairs["overlap"].median(),
+            }
+        )
+    return pd.DataFrame(
+        rows,
+        columns=[
+            "left_split",
+            "right_split",
+            "pairs",
+            "left_windows",
+            "right_windows",
+            "left_share",
+            "right_share",
+            "antennas",
+            "median_overlap",
+        ],
+    )
+
+
+def resolve_leaks(
+    df,
+    leaks,
+    how="drop",
+    split_column="split",
+    group_column="antenna",
+    time_column="datetime",
+    duration=WINDOW,
+    end_column=None,
+    priority=PRIORITY,
+):
+    """
+    Removes the leaks found by find_leaks.
+    :param how: "drop" removes the window of the lower priority split of every
+                pair (by default train before validation before test).
+                "move" keeps all windows and moves every chain of overlapping
+                windows to the highest priority split in it.
+    :return: df without leaks
+    """
+    if how == "drop":
+        return df.drop(index=pd.unique(leaks["right"]))
+    if how != "move":
+        raise ValueError(f"Unknown how: {how}")
+    positions, groups, starts, ends, _ = sorted_windows(
+        df, group_column, time_column, duration, end_column
+    )
+    ranks = split_ranks(df[split_column].to_numpy(), priority)
+    # A chain starts where a window starts at or after all previous ones ended
+    new = np.ones(len(positions), dtype=bool)
+    for lo, hi in group_bounds(groups):
+        max_end = np.maximum.accumulate(ends[lo:hi])
+        new[lo + 1 : hi] = starts[lo + 1 : hi] >= max_end[:-1]
+    first = np.flatnonzero(new)
+    if not len(first):
+        return df
+    chain_rank = np.minimum.reduceat(ranks[positions], first)
+    chains = np.cumsum(new) - 1
+    ranks[positions] = chain_rank[chains]
+    others = sorted(set(pd.unique(df[split_column])) - set(priority))
+    df = df.copy()
+    df[split_column] = np.array([*priority, *others], dtype=object)[ranks]
+    return df
+
+
+def check_splits(train_df, val_df, test_df, resolve=None, verbose=True, **kwargs):
+    """
+    Finds (and optionally resolves) the leaks between train, validation and test.
+    :param resolve: None only reports, "drop" or "move" resolve, see resolve_leaks.
+    :param kwargs: Passed to find_leaks and resolve_leaks, e.g. duration.
+    :return: train_df, val_df, test_df and the leaks
+    """
+    df = pd.concat(
+        [
+            train_df.assign(split="train"),
+            val_df.assign(split="validation"),
+            test_df.assign(split="test"),
+        ]
+    )
+    if not df.index.is_unique:
+        df = df.reset_index(drop=True)
+    leaks = find_leaks(df, **kwargs)
+    if verbose:
+        if leaks.empty:
+            print("No overlapping windows between the splits.")
+        else:
+            print(leak_summary(df, leaks).to_string(index=False))
+    if resolve is not None and not leaks.empty:
+        df = resolve_leaks(df, leaks, how=resolve, **kwargs)
+    splits = tuple(
+        df[df["split"] == name].drop(columns="split")
+        for name in ["train", "validation", "test"]
+    )
+    return (*splits, leaks)
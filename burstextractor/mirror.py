@@ -0,0 +1,271 @@
+"""
+Local mirror of the monthly burst lists on the server.
+A manifest in the mirror folder records ETag, Last-Modified, size and hash of every
+downloaded file. Months that are over never change again, so they are only
+downloaded once. Open months are revalidated with conditional requests.
+"""
+import datetime
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from burstextractor import timeutils
+from burstextractor.burstparser import ENCODING
+
+BASE_URL = "http://soleil.i4ds.ch/solarradio/data/BurstLists/2010-yyyy_Monstein"
+MANIFEST = "manifest.json"
+PART_SUFFIX = ".part"
+CHUNK_SIZE = 64 * 1024
+
+
+def burst_list_filename(year, month):
+    year, month = timeutils.adjust_year_month(year, month)
+    return f"e-CALLISTO_{year}_{month}.txt"
+
+
+def burst_list_url(year, month, base_url=None):
+    base_url = base_url or BASE_URL
+    return f"{base_url}/{year}/{burst_list_filename(year, month)}"
+
+
+def is_closed_month(year, month, today=None):
+    """
+    A month is closed once it is over. Its burst list does not change anymore.
+    """
+    today = today or datetime.date.today()
+    return (year, month) < (today.year, today.month)
+
+
+def file_sha256(path):
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def load_manifest(folder):
+    path = os.path.join(folder, MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as f:
+        return json.load(f)
+
+
+def save_manifest(folder, manifest):
+    """
+    Writes the manifest to a temporary file first, so an interruption never leaves
+    a truncated manifest behind.
+    """
+    path = os.path.join(folder, MANIFEST)
+    with open(path + PART_SUFFIX, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(path + PART_SUFFIX, path)
+
+
+def is_up_to_date(folder, filename, entry):
+    """
+    Checks that the file on disk is the one recorded in the manifest.
+    """
+    path = os.path.join(folder, filename)
+    return (
+        entry is not None
+        and os.path.exists(path)
+        and os.path.getsize(path) == entry["size"]
+        and file_sha256(path) == entry["sha256"]
+    )
+
+
+def to_server_encoding(path):
+    """
+    download_burst_list used to decode the lists as ENCODING and write them as
+    UTF-8. Writes such a file back as the bytes of the server, like the mirror
+    downloads them. Other files are left as they are.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        raw = data.decode("utf-8").encode(ENCODING)
+    except (UnicodeDecodeError, UnicodeEncodeError):
+        return
+    if raw != data:
+        with open(path + PART_SUFFIX, "wb") as f:
+            f.write(raw)
+        os.replace(path + PART_SUFFIX, path)
+
+
+def adopt_file(path, url):
+    """
+    A manifest entry for a closed month that is on disk but not in the manifest.
+    """
+    to_server_encoding(path)
+    return {
+        "url": url,
+        "etag": None,
+        "last_modified": None,
+        "size": os.path.getsize(path),
+        "sha256": file_sha256(path),
+        "closed": True,
+    }
+
+
+def create_session(max_workers):
+    """
+    A session with one connection per worker, so connections are reused.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_workers, max_retries=3)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def fetch_burst_list(session, url, folder, filename, entry, timeout=30):
+    """
+    Downloads a single burst list into folder.
+    - If the file on disk is the one in the manifest, the request is
+      conditional (If-None-Match / If-Modified-Since) and a 304 keeps it. A
+      changed or damaged file is downloaded again.
+    - The body is written to a .part file that is renamed when complete. If a
+      .part file is left over from an interrupted run, the download resumes with a
+      Range request. If-Range makes the server send the whole file if it changed.
+    Returns: The new manifest entry
+    """
+    path = os.path.join(folder, filename)
+    part_path = path + PART_SUFFIX
+    validator_path = part_path + ".validator"
+    headers = {}
+    if is_up_to_date(folder, filename, entry):
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+    if os.path.exists(part_path) and os.path.exists(validator_path):
+        with open(validator_path, "r") as f:
+            validator = f.read()
+        if validator:
+            headers["Range"] = f"bytes={os.path.getsize(part_path)}-"
+            headers["If-Range"] = validator
+
+    with session.get(url, headers=headers, stream=True, timeout=timeout) as response:
+        if response.status_code == 304:
+            return dict(entry, checked=datetime.datetime.now().isoformat())
+        if response.status_code == 416:
+            # The part file is not a prefix of the file on the server anymore
+            os.remove(part_path)
+            os.remove(validator_path)
+            return fetch_burst_list(session, url, folder, filename, entry, timeout)
+        response.raise_for_status()
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if response.status_code != 206:
+            # Remember what the part file belongs to, in case we get interrupted
+            with open(validator_path, "w") as f:
+                f.write(etag or last_modified or "")
+        mode = "ab" if response.status_code == 206 else "wb"
+        with open(part_path, mode) as f:
+            for chunk in response.iter_content(CHUNK_SIZE):
+                f.write(chunk)
+
+    os.replace(part_path, path)
+    if os.path.exists(validator_path):
+        os.remove(validator_path)
+    now = datetime.datetime.now().isoformat()
+    return {
+        "url": url,
+        "etag": etag,
+        "last_modified": last_modified,
+        "size": os.path.getsize(path),
+        "sha256": file_sha256(path),
+        "downloaded": now,
+        "checked": now,
+    }
+
+
+def mirror_burst_lists(
+    years,
+    months,
+    folder="ecallisto_files",
+    base_url=None,
+    max_workers=8,
+    session=None,
+    today=None,
+):
+    """
+    Brings the local mirror of the burst lists up to date.
+    :param years: A list of years (int) to mirror.
+    :param months: A list of months (int), where 1 = January, 2 = February, etc.
+    :param folder: The mirror folder, it also holds the manifest.
+    :param base_url: The server (default: BASE_URL), can point to a local
+                     stand-in for testing.
+    :param max_workers: Number of concurrent downloads.
+    :param session: A requests.Session to use, one with a pool of max_workers
+                    connections is created if None.
+    :param today: The date that decides which months are closed (default: today).
+    :return: The paths of the mirrored files, ordered by year and month.
+    """
+    today = today or datetime.date.today()
+    os.makedirs(folder, exist_ok=True)
+    manifest = load_manifest(folder)
+    lock = threading.Lock()
+
+    year_months = [
+        (year, month)
+        for year in years
+        for month in months
+        if (year, month) <= (today.year, today.month)
+    ]
+    # Closed months that are already on disk are never requested again
+    to_fetch = []
+    for year, month in year_months:
+        filename = burst_list_filename(year, month)
+        path = os.path.join(folder, filename)
+        if not is_closed_month(year, month, today):
+            to_fetch.append((year, month))
+        elif filename not in manifest and os.path.exists(path):
+            # Files from before the mirror existed are taken over as they are
+            manifest[filename] = adopt_file(path, burst_list_url(year, month, base_url))
+        elif not is_up_to_date(folder, filename, manifest.get(filename)):
+            to_fetch.append((year, month))
+    save_manifest(folder, manifest)
+
+    def fetch(year_month):
+        filename = burst_list_filename(*year_month)
+        with lock:
+            entry = manifest.get(filename)
+        entry = fetch_burst_list(
+            session, burst_list_url(*year_month, base_url), folder, filename, entry
+        )
+        entry["closed"] = is_closed_month(*year_month, today)
+        # Record every finished file right away, so an interrupted run resumes here
+        with lock:
+            manifest[filename] = entry
+            save_manifest(folder, manifest)
+
+    own_session = session is None
+    if own_session:
+        session = create_session(max_workers)
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(fetch, month): month for month in to_fetch}
+    finally:
+        if own_session:
+            session.close()
+    # Failed months do not stop the others, they are fetched again on the next run
+    failed = {
+        burst_list_filename(*futures[future]): future.exception()
+        for future in futures
+        if future.exception() is not None
+    }
+    if failed:
+        raise RuntimeError(f"Could not download {failed}")
+
+    return [
+        os.path.join(folder, burst_list_filename(year, month))
+        for year, month in year_months
+    ]
@@ -0,0 +1,196 @@
+"""
+Resolution of the instrument names of the burst list to canonical station names.
+burst_list_creation.ipynb replaces every rare name (at most MIN_COUNT bursts) by
+the closest frequent name with difflib, row by row. Here every distinct name is
+resolved once and kept in an alias table (alias, canonical, method), a CSV that
+can be fixed by hand. The table is applied to the whole column as one
+categorical map, so a new month only resolves the names that were not seen
+before.
+
+A name is resolved, in this order, by
+    "table":  an earlier entry of the alias table (also manual fixes),
+    "self":   it is frequent (more than min_count bursts), so it is canonical,
+    "clean":  the same as a canonical name apart from brackets, spaces and case,
+    "fuzzy":  the closest canonical name of difflib above the cutoff,
+    "none":   nothing, the canonical name is missing.
+Entries with "none" are resolved again on every resolve, "fuzzy" ones once the
+name is frequent (e.g. a new station that started with a few bursts). Rows fixed
+by hand should get the method "manual", they are never resolved again.
+
+Usage:
+    resolver = NameResolver("instrument_aliases.csv")
+    burst_list["instruments"] = resolver.resolve(burst_list["instruments"])
+    resolver.save()
+"""
+import difflib
+import os
+import re
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+
+ALIASES_FILE = "instrument_aliases.csv"
+# Methods of entries that are resolved again, see the module docstring
+RETRY_ALWAYS = ["none"]
+RETRY_FREQUENT = ["fuzzy"]
+MIN_COUNT = 5  # MIN_BURST_PER_INSTRUMENT of burst_list_creation.ipynb
+CUTOFF = 0.8
+COLUMNS = ["alias", "canonical", "method"]
+# Same characters as removed in data_utils.explode_instruments_long_clean_instruments
+NOT_IN_KEY = re.compile(r"[\[\]()\s]")
+
+
+def clean_keys(names):
+    """
+    The names without brackets and spaces, in lower case. Names with the same key
+    are the same station.
+    """
+    return (
+        pd.Series(names, dtype=object)
+        .str.replace(NOT_IN_KEY, "", regex=True)
+        .str.lower()
+    )
+
+
+@lru_cache(maxsize=None)
+def closest_name(name, candidates, cutoff=CUTOFF):
+    """
+    The closest of the candidates (a tuple) by difflib, None if none is above the
+    cutoff. Memoized, the candidates are the same for a whole resolve.
+    """
+    matches = difflib.get_close_matches(name, candidates, n=1, cutoff=cutoff)
+    return matches[0] if matches else None
+
+
+class NameResolver:
+    def __init__(self, path=ALIASES_FILE, min_count=MIN_COUNT, cutoff=CUTOFF):
+        """
+        :param path: The CSV of the alias table, None keeps it in memory only.
+        :param min_count: Names with at most this many bursts are matched to a
+                          frequent name.
+        :param cutoff: The minimal difflib ratio of a fuzzy match.
+        """
+        self.path = path
+        self.min_count = min_count
+        self.cutoff = cutoff
+        if path is not None and os.path.exists(path):
+            self.table = pd.read_csv(path, dtype=object, keep_default_na=False)
+            self.table["canonical"] = self.table["canonical"].replace("", None)
+        else:
+            self.table = pd.DataFrame(columns=COLUMNS, dtype=object)
+        self.changed = False
+
+    def aliases(self):
+        """
+        The alias table as a dict from alias to canonical name (None if unknown).
+        """
+        return dict(zip(self.table["alias"], self.table["canonical"]))
+
+    def _match(self, names, counts):
+        """
+        Resolves names that are not in the table.
+        :param counts: The number of bursts of every name.
+        Returns: The canonical name and method of every name
+        """
+        # Empty names (e.g. of a trailing comma) are never a station
+        is_frequent = (counts > self.min_count) & (clean_keys(names) != "").to_numpy()
+        known = self.table["canonical"].dropna()
+        candidates = pd.unique(np.concatenate([known.to_numpy(), names[is_frequent]]))
+        by_key = dict(zip(clean_keys(candidates), candidates))
+        sorted_candidates = tuple(sorted(candidates))
+
+        canonical = np.full(len(names), None, dtype=object)
+        method = np.full(len(names), "none", dtype=object)
+        canonical[is_frequent] = names[is_frequent]
+        method[is_frequent] = "self"
+        for i in np.flatnonzero(~is_frequent):
+            match = by_key.get(clean_keys([names[i]])[0])
+            if match is not None:
+                canonical[i], method[i] = match, "clean"
+                continue
+            match = closest_name(names[i], sorted_candidates, self.cutoff)
+            if match is not None:
+                canonical[i], method[i] = match, "fuzzy"
+        return canonical, method
+
+    def resolve(self, instruments, verbose=True):
+        """
+        The canonical name of every instrument. New names are added to the table,
+        unresolved and fuzzy entries are resolved again (see the module
+        docstring).
+        :param instruments: The instrument column of the burst list (exploded, see
+                            explode_instruments_long_clean_instruments).
+        :param verbose: Print the names that were matched.
+        :return: A Series like instruments, missing where no name was found
+        """
+        instruments = pd.Series(instruments)
+        categorical = pd.Categorical(instruments)
+        names = categorical.categories.to_numpy(dtype=object)
+        counts = np.bincount(
+            categorical.codes[categorical.codes >= 0], minlength=len(names)
+        )
+        methods = pd.Series(names, dtype=object).map(
+            dict(zip(self.table["alias"], self.table["method"]))
+        )
+        retry = methods.isin(RETRY_ALWAYS) | (
+            methods.isin(RETRY_FREQUENT) & (counts > self.min_count)
+        )
+        todo = (methods.isna() | retry).to_numpy()
+        if todo.any():
+            canonical, method = self._match(names[todo], counts[todo])
+            added = pd.DataFrame(
+                {"alias": names[todo], "canonical": canonical, "method": method}
+            )
+            kept = self.table[~self.table["alias"].isin(names[retry.to_numpy()])]
+            before = dict(
+                zip(
+                    self.table["alias"],
+                    zip(self.table["canonical"], self.table["method"]),
+                )
+            )
+            changed = added[
+                [
+                    before.get(alias) != (name, how)
+                    for alias, name, how in zip(names[todo], canonical, method)
+                ]
+            ]
+            if verbose:
+                for row in changed[changed["method"] != "self"].itertuples():
+                    print(f"{row.alias} -> {row.canonical} ({row.method})")
+            self.table = pd.concat([kept, added], ignore_index=True)
+            self.changed = self.changed or len(changed) > 0
+        aliases = self.aliases()
+
+        # One lookup per distinct name, then a single take over the codes
+        mapped = np.array([aliases[name] for name in names] + [None], dtype=object)
+        return pd.Series(
+            mapped[categorical.codes], index=instruments.index, name=instruments.name
+        )
+
+    def save(self, path=None):
+        """
+        Writes the alias table (sorted by alias), under a temporary name first.
+        """
+        path = path or self.path
+        table = self.table.sort_values("alias", kind="stable")
+        table.to_csv(path + ".part", index=False)
+        os.replace(path + ".part", path)
+        self.changed = False
+
+
+def resolve_instruments(burst_list, path=ALIASES_FILE, drop=True, **kwargs):
+    """
+    The burst list with canonical instrument names, like the "Fix wrong names"
+    part of burst_list_creation.ipynb. The alias table at path is updated.
+    :param drop: Drop the bursts without a canonical name.
+    :param kwargs: See NameResolver.
+    """
+    resolver = NameResolver(path, **kwargs)
+    burst_list = burst_list.copy()
+    burst_list["instruments"] = resolver.resolve(burst_list["instruments"])
+    if resolver.changed and path is not None:
+        resolver.save()
+    if drop:
+        burst_list = burst_list.dropna(subset=["instruments"])
+    return burst_list.reset_index(drop=True)
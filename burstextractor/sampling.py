@@ -0,0 +1,149 @@
+"""
+Sampling of windows that do not overlap any burst.
+Window starts live on a grid (one minute by default). The grid positions at which
+a window overlaps no burst and lies inside the observations of an instrument are
+computed once as integer ranges, and any number of windows is then drawn from
+them uniformly at once, without a rejection loop.
+"""
+import numpy as np
+import pandas as pd
+
+from burstextractor.intervals import to_int64
+
+
+def merge_ranges(lo, hi):
+    """
+    The union of the inclusive integer ranges [lo, hi].
+    Returns: lo and hi of the sorted, disjoint and not touching ranges
+    """
+    keep = lo <= hi
+    lo, hi = lo[keep], hi[keep]
+    if len(lo) == 0:
+        return lo, hi
+    order = np.argsort(lo, kind="stable")
+    lo, hi = lo[order], hi[order]
+    max_hi = np.maximum.accumulate(hi)
+    new = np.ones(len(lo), dtype=bool)
+    new[1:] = lo[1:] > max_hi[:-1] + 1
+    first = np.flatnonzero(new)
+    last = np.append(first[1:], len(lo)) - 1
+    return lo[first], max_hi[last]
+
+
+def intersect_ranges(a_lo, a_hi, b_lo, b_hi):
+    """
+    The intersection of two sets of sorted, disjoint inclusive ranges.
+    """
+    # The b ranges that end at or after a_lo and start at or before a_hi
+    first = np.searchsorted(b_hi, a_lo, side="left")
+    stop = np.searchsorted(b_lo, a_hi, side="right")
+    counts = np.maximum(stop - first, 0)
+    a = np.repeat(np.arange(len(a_lo)), counts)
+    b = np.repeat(first - np.cumsum(counts) + counts, counts) + np.arange(counts.sum())
+    return np.maximum(a_lo[a], b_lo[b]), np.minimum(a_hi[a], b_hi[b])
+
+
+def subtract_ranges(a_lo, a_hi, b_lo, b_hi):
+    """
+    The ranges a without the sorted, disjoint ranges b.
+    """
+    limits = np.iinfo(np.int64)
+    gaps_lo = np.concatenate([[limits.min], b_hi + 1])
+    gaps_hi = np.concatenate([b_lo - 1, [limits.max]])
+    keep = gaps_lo <= gaps_hi
+    return intersect_ranges(a_lo, a_hi, gaps_lo[keep], gaps_hi[keep])
+
+
+def free_window_starts(
+    busy_starts, busy_ends, available_starts, available_ends, window, step
+):
+    """
+    The grid positions k for which the window [k * step, k * step + window)
+    lies inside one of the available intervals [start, end) and overlaps none of
+    the busy closed intervals [start, end]. All times in int64 nanoseconds.
+    Returns: lo and hi (inclusive) of the sorted, disjoint ranges of k
+    """
+    # -(-x // step) rounds up
+    allowed = merge_ranges(
+        -(-available_starts // step), (available_ends - window) // step
+    )
+    # A busy interval [s, e] excludes the starts in (s - window, e]
+    forbidden = merge_ranges((busy_starts - window) // step + 1, busy_ends // step)
+    return subtract_ranges(*allowed, *forbidden)
+
+
+class NonBurstSampler:
+    """
+    Draws windows that overlap no burst, uniformly over the free time.
+
+    Usage:
+        sampler = NonBurstSampler(burst_intervals, start, end, rng=42)
+        for window_start in sampler.sample(1000):
+            ...
+    """
+
+    def __init__(
+        self,
+        burst_intervals,
+        start,
+        end,
+        window=pd.Timedelta(minutes=15),
+        step=pd.Timedelta(minutes=1),
+        instrument=None,
+        available=None,
+        rng=None,
+    ):
+        """
+        :param burst_intervals: A BurstIntervals of the bursts to avoid.
+        :param start: No window starts before start.
+        :param end: No window ends after end.
+        :param window: The length of a window.
+        :param step: The window starts are multiples of step.
+        :param instrument: Only avoid the bursts of this instrument, all bursts if
+                           None.
+        :param available: Optional (starts, ends) of the intervals with data, windows
+                          lie completely inside one of them.
+        :param rng: A numpy Generator or a seed.
+        """
+        self.window = pd.Timedelta(window).value
+        self.step = pd.Timedelta(step).value
+        self.rng = np.random.default_rng(rng)
+        start, end = to_int64(start), to_int64(end)
+        if available is None:
+            available_starts, available_ends = start, end
+        else:
+            available_starts, available_ends = intersect_ranges(
+                *merge_ranges(to_int64(available[0]), to_int64(available[1]) - 1),
+                start,
+                end - 1,
+            )
+            available_ends = available_ends + 1
+        self.lo, self.hi = free_window_starts(
+            *burst_intervals.merged(instrument),
+            available_starts,
+            available_ends,
+            self.window,
+            self.step,
+        )
+
+    @property
+    def remaining(self):
+        """
+        The number of window starts that have not been drawn yet.
+        """
+        return int((self.hi - self.lo + 1).sum())
+
+    def sample(self, n):
+        """
+        Draws up to n different window starts that were not drawn before.
+        :return: A sorted DatetimeIndex of the window starts.
+        """
+        counts = self.hi - self.lo + 1
+        cumulative = np.cumsum(counts)
+        total = int(cumulative[-1]) if len(counts) else 0
+        picks = np.sort(self.rng.choice(total, size=min(n, total), replace=False))
+        ranges = np.searchsorted(cumulative, picks, side="right")
+        positions = self.lo[ranges] + picks - (cumulative[ranges] - counts[ranges])
+        # Drawn starts are taken out, so later calls never return them again
+        self.lo, self.hi = subtract_ranges(self.lo, self.hi, positions, positions)
+        return pd.DatetimeIndex((positions * self.step).astype("datetime64[ns]"))
@@ -0,0 +1,232 @@
+"""
+Sharded storage of spectrogram windows.
+Instead of one small Parquet file per window, the windows are resampled to a fixed
+shape and appended as uint8 tensors to a few large shard files. Every shard has
+an index table (instrument, datetime, label, shard, offset) next to it.
+
+A shard is written under a temporary name and renamed together with its index
+when it is closed, so readers only ever see complete shards.
+
+Usage:
+    with ShardWriter(folder, "GLASGOW_01_20240513") as writer:
+        writer.append(df, "GLASGOW_01", window_start, label="3")
+    dataset = ShardDataset(folder)
+    image, row = dataset[0]
+"""
+import glob
+import os
+
+import numpy as np
+import pandas as pd
+
+SHAPE = (256, 256)
+SAMPLES_PER_SHARD = 4096
+INDEX_COLUMNS = [
+    "instrument",
+    "datetime",
+    "label",
+    "shard",
+    "offset",
+    "n_frequencies",
+    "n_times",
+]
+
+
+def resample_axis(values, size, axis):
+    """
+    Resamples one axis of values to size entries. Shrinking averages the entries
+    that fall into each output bin, growing interpolates linearly.
+    """
+    n = values.shape[axis]
+    if n == size:
+        return values
+    if n > size:
+        edges = (np.arange(size) * n) // size
+        sums = np.add.reduceat(values, edges, axis=axis)
+        counts = np.diff(np.append(edges, n)).astype(values.dtype)
+        shape = [1] * values.ndim
+        shape[axis] = size
+        return sums / counts.reshape(shape)
+    positions = np.clip((np.arange(size) + 0.5) * n / size - 0.5, 0, n - 1)
+    lower = np.floor(positions).astype(np.int64)
+    upper = np.minimum(lower + 1, n - 1)
+    shape = [1] * values.ndim
+    shape[axis] = size
+    weight = (positions - lower).astype(values.dtype).reshape(shape)
+    return (
+        np.take(values, lower, axis=axis) * (1 - weight)
+        + np.take(values, upper, axis=axis) * weight
+    )
+
+
+def to_fixed_shape(df, shape=SHAPE):
+    """
+    Resamples a window (time index, frequency columns) to an image of the given
+    shape (frequencies, times), like hu_dataset.py shows it (df.values.T).
+    Missing values become 0, the values are clipped to uint8.
+    """
+    values = np.nan_to_num(df.to_numpy(dtype=np.float32).T, nan=0.0)
+    values = resample_axis(values, shape[0], axis=0)
+    values = resample_axis(values, shape[1], axis=1)
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
+
+
+class ShardWriter:
+    """
+    Appends windows to the shards name-00000.bin, name-00001.bin, ... in folder.
+    name must be unique per writer, e.g. the instrument and day of a task.
+    With samples_per_shard=None a shard is only closed by close_shard, e.g. to
+    close it between the days of a task only.
+    """
+
+    def __init__(self, folder, name, shape=SHAPE, samples_per_shard=SAMPLES_PER_SHARD):
+        self.folder = folder
+        self.name = name
+        self.shape = tuple(shape)
+        self.samples_per_shard = samples_per_shard
+        self.file = None
+        self.rows = []
+        self.shards = []
+        os.makedirs(folder, exist_ok=True)
+        # Shards of an earlier writer with the same name are kept
+        existing = glob.glob(os.path.join(folder, f"{glob.escape(name)}-[0-9]*.bin"))
+        self.shard_number = len(existing)
+
+    def shard_path(self):
+        return os.path.join(self.folder, f"{self.name}-{self.shard_number:05d}.bin")
+
+    def append(self, df, instrument, datetime, label=None):
+        """
+        Resamples the window to the fixed shape and appends it.
+        Returns: (shard, offset) of the sample
+        """
+        return self.append_array(
+            to_fixed_shape(df, self.shape),
+            instrument,
+            datetime,
+            label,
+            n_frequencies=df.shape[1],
+            n_times=df.shape[0],
+        )
+
+    def append_array(
+        self, image, instrument, datetime, label=None, n_frequencies=0, n_times=0
+    ):
+        """
+        Appends an image that already has the fixed shape.
+        """
+        if image.shape != self.shape or image.dtype != np.uint8:
+            raise ValueError(f"Expected a uint8 image of shape {self.shape}")
+        if self.file is None:
+            self.file = open(self.shard_path() + ".part", "wb")
+        self.file.write(np.ascontiguousarray(image).tobytes())
+        self.rows.append(
+            {
+                "instrument": instrument,
+                "datetime": pd.Timestamp(datetime),
+                "label": None if label is None else str(label),
+                "shard": os.path.basename(self.shard_path()),
+                "offset": len(self.rows),
+                "n_frequencies": n_frequencies,
+                "n_times": n_times,
+            }
+        )
+        location = (self.rows[-1]["shard"], self.rows[-1]["offset"])
+        if (
+            self.samples_per_shard is not None
+            and len(self.rows) >= self.samples_per_shard
+        ):
+            self.close_shard()
+        return location
+
+    def truncate(self, offset):
+        """
+        Drops the samples of the open shard from offset on, e.g. of a day that
+        failed halfway.
+        """
+        if self.file is None:
+            return
+        del self.rows[offset:]
+        self.file.truncate(offset * int(np.prod(self.shape)))
+        self.file.seek(0, os.SEEK_END)
+
+    def close_shard(self):
+        if self.file is None:
+            return
+        self.file.close()
+        self.file = None
+        path = self.shard_path()
+        if not self.rows:
+            # All of its samples were dropped by truncate
+            os.remove(path + ".part")
+            return
+        index = pd.DataFrame(self.rows, columns=INDEX_COLUMNS)
+        index["datetime"] = index["datetime"].astype("datetime64[ns]")
+        index.attrs["shape"] = list(self.shape)
+        index.to_parquet(path + ".index.parquet.part", index=False)
+        os.replace(path + ".part", path)
+        os.replace(path + ".index.parquet.part", path + ".index.parquet")
+        self.shards.append(path)
+        self.rows = []
+        self.shard_number += 1
+
+    def close(self):
+        """
+        Closes the current shard.
+        Returns: The paths of all shards of this writer
+        """
+        self.close_shard()
+        return self.shards
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def load_shard_index(folder):
+    """
+    The index tables of all complete shards in folder, sorted by instrument and
+    datetime.
+    """
+    paths = sorted(glob.glob(os.path.join(folder, "*.bin.index.parquet")))
+    if not paths:
+        return pd.DataFrame(columns=INDEX_COLUMNS)
+    index = pd.concat([pd.read_parquet(path) for path in paths], ignore_index=True)
+    return index.sort_values(["instrument", "datetime"], kind="stable").reset_index(
+        drop=True
+    )
+
+
+class ShardDataset:
+    """
+    Random access to the samples of all shards in folder. The shards are memory
+    mapped, so reading a sample only reads its bytes.
+    """
+
+    def __init__(self, folder, shape=SHAPE):
+        self.folder = folder
+        self.shape = tuple(shape)
+        self.index = load_shard_index(folder)
+        self._shards = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def shard(self, name):
+        if name not in self._shards:
+            self._shards[name] = np.memmap(
+                os.path.join(self.folder, name), dtype=np.uint8, mode="r"
+            ).reshape(-1, *self.shape)
+        return self._shards[name]
+
+    def image(self, i):
+        """
+        The image of sample i, a (frequencies, times) uint8 array.
+        """
+        row = self.index.iloc[i]
+        return np.asarray(self.shard(row["shard"])[row["offset"]])
+
+    def __getitem__(self, i):
+        return self.image(i), self.index.iloc[i]
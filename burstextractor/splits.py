@@ -0,0 +1,173 @@
+"""
+Grouped, stratified train/validation/test splits.
+Every group (e.g. antenna and label) is split in the same proportions. Instead of
+splitting group by group, all rows get a seeded random key, are ranked within
+their group, and the rank is compared to the per-group thresholds. This is a
+single sort over the whole table.
+
+With block_gap, windows of the same antenna that lie close together in time
+(e.g. the overlapping 15-minute windows around one event, whatever their label)
+form a block, and a block always goes to one split as a whole. A block is
+stratified by the group of most of its rows. The windows of create_data.py
+overlap all day long, so max_block cuts long blocks into pieces; only the
+windows at the cuts can then overlap across splits (see leakage.check_splits).
+
+Usage:
+    train_df, val_df, test_df = stratified_split(
+        df,
+        block_gap=pd.Timedelta(0),
+        window_length=pd.Timedelta(minutes=15),
+        max_block=pd.Timedelta(hours=1),
+    )
+"""
+import numpy as np
+import pandas as pd
+
+SPLITS = np.array(["train", "validation", "test"])
+
+
+def time_blocks(groups, times, gap, window_length=None, max_block=None):
+    """
+    Numbers the blocks of rows of the same group that start at most gap after
+    the end of the previous row.
+    :param groups: int group code of every row.
+    :param times: datetime64 start of every row.
+    :param gap: The largest gap between two rows of a block.
+    :param window_length: The length of every row, None for rows without length.
+    :param max_block: If set, a block is cut into pieces of max_block from its
+                      first row.
+    :return: The block number of every row
+    """
+    times = np.asarray(times, dtype="datetime64[ns]")
+    order = np.lexsort((times, groups))
+    sorted_groups, sorted_times = groups[order], times[order]
+    ends = sorted_times
+    if window_length is not None:
+        ends = sorted_times + np.timedelta64(window_length)
+    new = np.ones(len(order), dtype=bool)
+    new[1:] = (sorted_groups[1:] != sorted_groups[:-1]) | (
+        sorted_times[1:] - ends[:-1] > np.timedelta64(gap)
+    )
+    if max_block is not None:
+        first = sorted_times[new][np.cumsum(new) - 1]
+        pieces = (sorted_times - first) // np.timedelta64(max_block)
+        new[1:] |= pieces[1:] != pieces[:-1]
+    blocks = np.empty(len(order), dtype=np.int64)
+    blocks[order] = np.cumsum(new) - 1
+    return blocks
+
+
+def majority_groups(units, groups):
+    """
+    The group of most of the rows of every unit, the first group on a tie.
+    :param units: The unit (0, 1, ...) of every row.
+    :param groups: The int group code of every row.
+    :return: The group of every unit
+    """
+    if len(units) == 0:
+        return np.zeros(0, dtype=np.int64)
+    n_groups = groups.max() + 1
+    pairs, counts = np.unique(units * n_groups + groups, return_counts=True)
+    pair_units, pair_groups = np.divmod(pairs, n_groups)
+    # Per unit, the most frequent group first, then the smallest code
+    order = np.lexsort((pair_groups, -counts, pair_units))
+    pair_units, pair_groups = pair_units[order], pair_groups[order]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = pair_units[1:] != pair_units[:-1]
+    unit_groups = np.zeros(units.max() + 1, dtype=np.int64)
+    unit_groups[pair_units[first]] = pair_groups[first]
+    return unit_groups
+
+
+def split_sizes(n, test_size, val_size, min_size):
+    """
+    The number of test and validation units of groups with n units. Like
+    train_test_split, the test share is rounded up first and the validation
+    share of the rest is rounded up. Groups smaller than min_size give one unit
+    to test (from 2 units) and one to validation (from 3 units).
+    """
+    n_test = np.ceil(test_size * n).astype(np.int64)
+    n_val = np.ceil(val_size / (1 - test_size) * (n - n_test)).astype(np.int64)
+    small = n < min_size
+    n_test = np.where(small, (n >= 2).astype(np.int64), n_test)
+    n_val = np.where(small, (n >= 3).astype(np.int64), n_val)
+    return n_test, n_val
+
+
+def assign_splits(
+    df,
+    group_columns=("antenna", "label"),
+    test_size=0.1,
+    val_size=0.1,
+    min_size=3,
+    seed=42,
+    time_column="datetime",
+    block_gap=None,
+    block_columns=("antenna",),
+    window_length=None,
+    max_block=None,
+):
+    """
+    Assigns every row to "train", "validation" or "test".
+    :param df: The samples.
+    :param group_columns: Every combination of these columns is split on its own.
+    :param test_size: Share of the test split.
+    :param val_size: Share of the validation split (of all rows).
+    :param min_size: Groups with fewer units are split as described in split_sizes.
+    :param seed: Seed of the random order, the same seed gives the same splits.
+    :param time_column: The time of a row, used with block_gap.
+    :param block_gap: If set, rows of the same block_columns that start at
+                      most block_gap after the end of the previous row form a
+                      block that is assigned as a whole. A block counts for the
+                      group of most of its rows (ties go to the first group),
+                      and the shares count blocks instead of rows.
+    :param block_columns: The rows that can overlap, e.g. the windows of an
+                          antenna, whatever their label.
+    :param window_length: The length of the window of a row, its end is
+                          time_column + window_length. None: the gap is measured
+                          between the starts.
+    :param max_block: If set, blocks are cut into pieces of at most max_block.
+    :return: A Series with the split of every row, with the index of df
+    """
+    groups = df.groupby(list(group_columns), sort=False, dropna=False).ngroup()
+    groups = groups.to_numpy(dtype=np.int64)
+    if block_gap is None:
+        units = np.arange(len(df))
+        unit_groups = groups
+    else:
+        block_groups = df.groupby(list(block_columns), sort=False, dropna=False)
+        block_groups = block_groups.ngroup().to_numpy(dtype=np.int64)
+        units = time_blocks(
+            block_groups,
+            df[time_column].to_numpy(),
+            block_gap,
+            window_length,
+            max_block,
+        )
+        unit_groups = majority_groups(units, groups)
+
+    rng = np.random.default_rng(seed)
+    keys = rng.random(len(unit_groups))
+    order = np.lexsort((keys, unit_groups))
+    counts = np.bincount(unit_groups)
+    group_starts = np.cumsum(counts) - counts
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - group_starts[unit_groups[order]]
+
+    n_test, n_val = split_sizes(counts, test_size, val_size, min_size)
+    unit_split = np.where(
+        rank < n_test[unit_groups],
+        2,
+        np.where(rank < (n_test + n_val)[unit_groups], 1, 0),
+    )
+    return pd.Series(SPLITS[unit_split[units]], index=df.index, name="split")
+
+
+def stratified_split(df, **kwargs):
+    """
+    Splits df into train, validation and test, see assign_splits for the
+    arguments.
+    Returns: train_df, val_df, test_df
+    """
+    split = assign_splits(df, **kwargs)
+    return tuple(df[split == name] for name in SPLITS)
@@ -0,0 +1,163 @@
+"""
+Binary storage of the burst list.
+The burst list is kept as Parquet or as an uncompressed Arrow IPC file (.arrow,
+.feather) with a fixed schema: instruments and string types are dictionary
+encoded, datetimes are timestamps and the type codes of the notebook stay int8.
+The schema metadata carries a version stamp, so a file written by a newer
+version of this module is refused instead of misread. load_burst_table
+memory-maps an Arrow IPC file, so its columns are not copied; load_burst_list
+converts them to a DataFrame, which copies them once (the dictionary columns
+become categoricals).
+
+Excel is only an export for humans (needs openpyxl); .xlsx files can still be
+loaded, with the types coerced as if they had been saved here.
+
+Usage:
+    save_burst_list(burst_list, "burst_list.arrow")
+    burst_list = load_burst_list("burst_list.arrow")
+    python -m burstextractor.storage burst_list.xlsx burst_list.arrow
+"""
+import argparse
+import json
+import os
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
+
+SCHEMA_VERSION = 1
+METADATA_KEY = b"burst_list"
+IPC_EXTENSIONS = (".arrow", ".feather")
+# Repeated strings, stored once per file
+DICTIONARY_COLUMNS = ["instruments", "type"]
+DATETIME_COLUMNS = ["datetime_start", "datetime_end"]
+# Leftover date and time strings of timeutils.parse_time
+STRING_COLUMNS = ["date", "time", "time_start", "time_end", "date_start", "date_end"]
+
+
+def coerce_burst_list(df):
+    """
+    The burst list with the types of the schema, e.g. after read_excel.
+    """
+    df = df.copy()
+    for column in DATETIME_COLUMNS:
+        if column in df.columns:
+            df[column] = pd.to_datetime(df[column]).astype("datetime64[ns]")
+    for column in STRING_COLUMNS:
+        if column in df.columns:
+            df[column] = df[column].astype(object).where(df[column].notna(), None)
+            df[column] = df[column].map(
+                lambda value: value if value is None else str(value)
+            )
+    if "type" in df.columns and pd.api.types.is_numeric_dtype(df["type"]):
+        # The type codes 1 to 6 of burst_list_creation.ipynb, missing ones stay NA
+        df["type"] = df["type"].astype("Int8")
+    return df
+
+
+def to_arrow(df):
+    """
+    The burst list as an Arrow table with the schema and version stamp.
+    """
+    df = coerce_burst_list(df)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for column in DICTIONARY_COLUMNS:
+        if column not in table.column_names:
+            continue
+        i = table.column_names.index(column)
+        values = table.column(i)
+        if pa.types.is_dictionary(values.type):
+            values = values.cast(values.type.value_type)
+        if pa.types.is_string(values.type) or pa.types.is_large_string(values.type):
+            values = values.cast(pa.string()).dictionary_encode()
+            table = table.set_column(i, column, values)
+    stamp = {
+        "schema_version": SCHEMA_VERSION,
+        "columns": {field.name: str(field.type) for field in table.schema},
+    }
+    metadata = {**(table.schema.metadata or {}), METADATA_KEY: json.dumps(stamp)}
+    return table.replace_schema_metadata(metadata)
+
+
+def schema_version(schema):
+    """
+    The version stamp of a schema, None for files not written by save_burst_list.
+    """
+    stamp = (schema.metadata or {}).get(METADATA_KEY)
+    return None if stamp is None else json.loads(stamp)["schema_version"]
+
+
+def save_burst_list(df, path):
+    """
+    Saves the burst list as Parquet, Arrow IPC (.arrow, .feather) or, for humans,
+    Excel (.xlsx), under a temporary name first.
+    """
+    part = path + ".part"
+    if path.endswith(".parquet"):
+        pq.write_table(to_arrow(df), part)
+    elif path.endswith(IPC_EXTENSIONS):
+        # Uncompressed, so it can be memory-mapped
+        feather.write_feather(to_arrow(df), part, compression="uncompressed")
+    elif path.endswith(".xlsx"):
+        df.to_excel(part, index=False, engine="openpyxl")
+    else:
+        raise ValueError(f"Unknown file format: {path}")
+    os.replace(part, path)
+
+
+def load_burst_table(path, columns=None):
+    """
+    The burst list as an Arrow table. Arrow IPC files are memory-mapped.
+    :param columns: Only read these columns.
+    :return: A pyarrow Table
+    """
+    if path.endswith(".parquet"):
+        table = pq.read_table(path, columns=columns, memory_map=True)
+    elif path.endswith(IPC_EXTENSIONS):
+        table = ipc.open_file(pa.memory_map(path, "r")).read_all()
+        if columns is not None:
+            table = table.select(columns)
+    else:
+        raise ValueError(f"Unknown file format: {path}")
+    version = schema_version(table.schema)
+    if version is not None and version > SCHEMA_VERSION:
+        raise ValueError(
+            f"{path} has schema version {version}, this code reads up to "
+            f"{SCHEMA_VERSION}"
+        )
+    return table
+
+
+def load_burst_list(path, columns=None):
+    """
+    Loads a burst list saved by save_burst_list, or an Excel file. The columns
+    are copied into the DataFrame, see load_burst_table for the Arrow table
+    without a copy.
+    :param columns: Only read these columns.
+    :return: A Pandas Dataframe, instruments and string types are categorical,
+             type codes are Int8
+    """
+    if path.endswith(".xlsx"):
+        return coerce_burst_list(pd.read_excel(path, usecols=columns))
+    # Type codes with missing values stay integers
+    return load_burst_table(path, columns).to_pandas(
+        types_mapper={pa.int8(): pd.Int8Dtype()}.get
+    )
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(
+        description="Convert a burst list, e.g. burst_list.xlsx to burst_list.arrow."
+    )
+    parser.add_argument("input", help=".xlsx, .parquet, .arrow or .feather")
+    parser.add_argument("output", help=".parquet, .arrow, .feather or .xlsx")
+    args = parser.parse_args(args)
+    data = load_burst_list(args.input)
+    save_burst_list(data, args.output)
+    print(f"Wrote {len(data)} bursts to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
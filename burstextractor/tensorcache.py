@@ -0,0 +1,101 @@
+"""
+Fixed-shape tensor cache for training.
+Every window (a Parquet file) is resampled once to a fixed shape and stored in a
+single uint8 .npy array of shape (samples, frequencies, times). A sidecar Parquet
+table holds the metadata of every sample in the same order. np.load with
+mmap_mode="r" gives zero-copy slices, so loading a batch is a slice of the array
+instead of reading and decoding one Parquet file per sample.
+
+Usage:
+    build_tensor_cache(df["image"], "hu_dataset_256", metadata=df)
+    images, metadata = load_tensor_cache("hu_dataset_256")
+    batch = images[0:32]
+"""
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from burstextractor.shards import SHAPE, to_fixed_shape
+
+CHUNK_SIZE = 256
+
+
+def cache_paths(cache_path):
+    """
+    The array and the metadata file of a cache.
+    """
+    return cache_path + ".npy", cache_path + ".parquet"
+
+
+def _fill_chunk(array_path, start, paths, shape):
+    """
+    Resamples the files paths into the rows start, start + 1, ... of the array.
+    Returns: The rows that could not be read
+    """
+    array = np.load(array_path, mmap_mode="r+")
+    failed = []
+    for i, path in enumerate(paths):
+        try:
+            array[start + i] = to_fixed_shape(pd.read_parquet(path), shape)
+        except Exception as e:
+            print(f"{path}: {e}")
+            array[start + i] = 0
+            failed.append(start + i)
+    array.flush()
+    return failed
+
+
+def build_tensor_cache(paths, cache_path, shape=SHAPE, metadata=None, max_workers=None):
+    """
+    Builds the cache from Parquet windows.
+    :param paths: The Parquet files, the samples keep this order.
+    :param cache_path: The cache is written to cache_path.npy and cache_path.parquet.
+    :param shape: The (frequencies, times) shape of every sample.
+    :param metadata: Optional Dataframe with one row per path (e.g. label,
+                     antenna, datetime), stored as the sidecar table.
+    :param max_workers: Number of worker processes. None or 1 builds in this
+                        process.
+    :return: The metadata table, with the column "failed" for unreadable files
+             (their sample is all zeros).
+    """
+    paths = list(paths)
+    array_path, metadata_path = cache_paths(cache_path)
+    if metadata is None:
+        metadata = pd.DataFrame({"path": paths})
+    metadata = metadata.reset_index(drop=True).copy()
+    if len(metadata) != len(paths):
+        raise ValueError("metadata needs one row per path")
+
+    # The cache is built under temporary names and renamed when complete
+    part_path = array_path + ".part.npy"
+    array = np.lib.format.open_memmap(
+        part_path, mode="w+", dtype=np.uint8, shape=(len(paths), *shape)
+    )
+    del array
+    starts = range(0, len(paths), CHUNK_SIZE)
+    chunks = [
+        (part_path, start, paths[start : start + CHUNK_SIZE], shape) for start in starts
+    ]
+    if max_workers is None or max_workers <= 1:
+        failed = [_fill_chunk(*chunk) for chunk in chunks]
+    else:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            failed = list(executor.map(_fill_chunk, *zip(*chunks)))
+
+    metadata["failed"] = False
+    metadata.loc[[row for rows in failed for row in rows], "failed"] = True
+    metadata.to_parquet(metadata_path + ".part", index=False)
+    os.replace(part_path, array_path)
+    os.replace(metadata_path + ".part", metadata_path)
+    return metadata
+
+
+def load_tensor_cache(cache_path):
+    """
+    Returns: The memory-mapped (samples, frequencies, times) uint8 array and the
+             metadata table
+    """
+    array_path, metadata_path = cache_paths(cache_path)
+    return np.load(array_path, mmap_mode="r"), pd.read_parquet(metadata_path)
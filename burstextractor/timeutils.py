@@ -24,18 +24,19 @@ def extract_time(data):
     return data
 
 
-
-def fix_typos_in_time(data):
-    replace_dict = {
-        "06:06-06:88": "06:06-06:08",
-        "24:32-14:33": "14:32-14:33",
-        "21:18-212:19": "21:18-21:19",
-        "23:55-23:576": "23:55-23:57",
-        "21:18-212:19": "21:18-21:19",
-    }
+# Known typos in the time column of the Monstein lists and their corrections
+TIME_TYPOS = {
+    "06:06-06:88": "06:06-06:08",
+    "24:32-14:33": "14:32-14:33",
+    "21:18-212:19": "21:18-21:19",
+    "23:55-23:576": "23:55-23:57",
+    "1447-14:47": "14:47-14:47",
+    "22:22-2:26": "22:22-22:26",
+}
 
 
-    data["time"] = data["time"].replace(replace_dict)
+def fix_typos_in_time(data):
+    data["time"] = data["time"].replace(TIME_TYPOS)
     return data
 
 
@@ -66,6 +67,181 @@ def create_datetime(data):
     return data
 
 
+MINUTES_PER_DAY = 24 * 60
+# Longest time field that is looked at, longer fields are cut off
+MAX_TIME_WIDTH = 32
+
+
+def _char_codes(strings, width):
+    """
+    The code points of the strings as an (n, width) array, zero padded.
+    """
+    strings = np.asarray(strings, dtype=f"U{width}")
+    return strings.view(np.uint32).reshape(len(strings), width).astype(np.int64)
+
+
+def crosses_midnight(start, end):
+    """
+    An end before the start means the burst went past midnight, unless the end is
+    only a bit earlier than the start. Such ranges (e.g. "14:58-14:53") are typos
+    and stay on the same day, like in fix_24_hour_time.
+    """
+    return (end < start) & (start - end > MINUTES_PER_DAY // 2)
+
+
+def time_ranges_to_minutes(times):
+    """
+    Parses time ranges like "HH:MM-HH:MM" into minute offsets from midnight without
+    a regex and without a loop over the rows.
+    Like the regex in extract_time, the four numbers may be separated by any single
+    character (e.g. "19:05:19:05"). The first four runs of digits are taken, every
+    separator must be exactly one character long.
+    A "24:00" or a range that crosses midnight ends on the next day.
+    Returns: start and end (int64, -1 if invalid) and the valid mask
+    """
+    times = pd.Series(times, dtype=object)
+    times = times.where(times.notna(), "").to_numpy(dtype=str)
+    n = len(times)
+    if n == 0:
+        return np.empty(0, np.int64), np.empty(0, np.int64), np.empty(0, bool)
+    width = int(min(np.char.str_len(times).max(), MAX_TIME_WIDTH)) + 1
+    codes = _char_codes(times, width)
+
+    digit = (codes >= ord("0")) & (codes <= ord("9"))
+    previous_digit = np.zeros_like(digit)
+    previous_digit[:, 1:] = digit[:, :-1]
+    next_digit = np.zeros_like(digit)
+    next_digit[:, :-1] = digit[:, 1:]
+    run_start = digit & ~previous_digit
+    run_end = digit & ~next_digit
+    # 1 for the cells of the first run of digits, 2 for the second, ...
+    run_id = np.cumsum(run_start, axis=1)
+
+    # The value of a run is complete at its last digit. Digit runs are at most
+    # `width` long, so this loops over the columns and not over the rows.
+    value = np.zeros(codes.shape, dtype=np.int64)
+    acc = np.zeros(n, dtype=np.int64)
+    for column in range(width):
+        acc = np.where(
+            digit[:, column],
+            np.minimum(acc * 10 + codes[:, column] - ord("0"), 10**6),
+            0,
+        )
+        value[:, column] = acc
+
+    positions = np.arange(width)
+    numbers, starts, ends = [], [], []
+    for k in range(1, 5):
+        is_start = run_start & (run_id == k)
+        is_end = run_end & (run_id == k)
+        numbers.append(np.where(is_end, value, 0).max(axis=1))
+        starts.append(np.where(is_start, positions, -1).max(axis=1))
+        ends.append(np.where(is_end, positions, -1).max(axis=1))
+
+    valid = run_id[:, -1] >= 4
+    for k in range(3):
+        valid &= starts[k + 1] - ends[k] == 2
+    h0, m0, h1, m1 = numbers
+    start, end = h0 * 60 + m0, h1 * 60 + m1
+    valid &= (m0 <= 59) & (m1 <= 59)
+    valid &= (start <= MINUTES_PER_DAY) & (end <= MINUTES_PER_DAY)
+    end = np.where(crosses_midnight(start, end), end + MINUTES_PER_DAY, end)
+    start = np.where(valid, start, -1)
+    end = np.where(valid, end, -1)
+    return start, end, valid
+
+
+def yyyymmdd_to_datetime64(dates):
+    """
+    Converts integers like 20240531 to datetime64[D].
+    Returns: The dates and a mask of the dates that exist in the calendar
+    """
+    dates = np.asarray(dates, dtype=np.int64)
+    year, month, day = dates // 10000, dates // 100 % 100, dates % 100
+    months = ((year - 1970) * 12 + (month - 1)).astype("datetime64[M]")
+    days = months.astype("datetime64[D]") + (day - 1)
+    exists = (
+        (month >= 1)
+        & (month <= 12)
+        & (day >= 1)
+        & (days.astype("datetime64[M]") == months)
+    )
+    return days, exists
+
+
+def _format_fields(fields, separators):
+    """
+    Formats columns of non-negative integers as zero padded strings without a loop
+    over the rows, e.g. fields=[(hours, 2), (minutes, 2)], separators=[":"].
+    """
+    columns = []
+    for i, (values, digits) in enumerate(fields):
+        if i > 0 and separators[i - 1]:
+            columns.append(np.full(len(values), ord(separators[i - 1])))
+        for power in range(digits - 1, -1, -1):
+            columns.append(values // 10**power % 10 + ord("0"))
+    codes = np.stack(columns, axis=1).astype(np.uint32)
+    return codes.view(f"U{codes.shape[1]}").ravel()
+
+
+def parse_time(data):
+    """
+    Vectorized replacement for extract_time, fix_24_hour_time and create_datetime
+    (run fix_typos_in_time first). Produces the same columns: time, time_start,
+    time_end, date_start, date_end, datetime_start and datetime_end.
+    A "24:00" or a range that crosses midnight ends on the next day, also at the
+    end of a month. Rows whose date or time cannot be parsed get NaN/NaT in the
+    time and datetime columns (date_start and date_end keep the date, like in
+    fix_24_hour_time) and False in the additional column time_valid.
+    Unlike extract_time, hours and minutes are always two digits ("0:13" becomes
+    "00:13") and the datetimes are datetime64[ns].
+    """
+    start, end, valid = time_ranges_to_minutes(data["time"])
+    day = pd.to_numeric(data["date"], errors="coerce").fillna(0).to_numpy()
+    date, exists = yyyymmdd_to_datetime64(day.astype(np.int64))
+    valid &= exists
+
+    start_minutes = date.astype("datetime64[m]") + np.where(valid, start, 0)
+    end_minutes = date.astype("datetime64[m]") + np.where(valid, end, 0)
+    start_day = start_minutes.astype("datetime64[D]")
+    end_day = end_minutes.astype("datetime64[D]")
+    time_of_start = (start_minutes - start_day).astype(np.int64)
+    time_of_end = (end_minutes - end_day).astype(np.int64)
+
+    def as_yyyymmdd(days):
+        year = days.astype("datetime64[Y]").astype(np.int64) + 1970
+        month = days.astype("datetime64[M]").astype(np.int64) % 12 + 1
+        day = (days - days.astype("datetime64[M]")).astype(np.int64) + 1
+        return _format_fields([(year, 4), (month, 2), (day, 2)], ["", ""])
+
+    hours_minutes = [
+        (time_of_start // 60, 2),
+        (time_of_start % 60, 2),
+        (time_of_end // 60, 2),
+        (time_of_end % 60, 2),
+    ]
+    columns = {
+        "time": _format_fields(hours_minutes, [":", "-", ":"]),
+        "time_start": _format_fields(hours_minutes[:2], [":"]),
+        "time_end": _format_fields(hours_minutes[2:], [":"]),
+        "date_start": as_yyyymmdd(start_day),
+        "date_end": as_yyyymmdd(end_day),
+    }
+    for name, values in columns.items():
+        fallback = data["date"] if name.startswith("date") else None
+        data[name] = pd.Series(values, index=data.index, dtype=str).where(
+            valid, fallback
+        )
+    data["datetime_start"] = pd.Series(
+        np.where(valid, start_minutes, np.datetime64("NaT")), index=data.index
+    ).astype("datetime64[ns]")
+    data["datetime_end"] = pd.Series(
+        np.where(valid, end_minutes, np.datetime64("NaT")), index=data.index
+    ).astype("datetime64[ns]")
+    data["time_valid"] = valid
+    return data
+
+
 def check_valid_date(year, month):
     """
     Check if the argument to the funtion download_burst_list
@@ -1,9 +1,21 @@
 # %%
-from ecallisto_ng.data_download.downloader import get_ecallisto_data
 from datetime import datetime, timedelta
+import glob
 import pandas as pd
 import os
 from tqdm import tqdm
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from burstextractor.checkpoint import Checkpoint, unit_key
+from burstextractor.coverage import load_coverage
+from burstextractor.fetchcache import (
+    FetchCache,
+    configure_fetch_cache,
+    get_ecallisto_data,
+    get_fetch_cache,
+    init_worker,
+)
+from burstextractor.shards import SAMPLES_PER_SHARD, ShardWriter
 
 # Define the folder where Parquet files will be saved
 FOLDER = "/mnt/nas05/data01/vincenzo/ecallisto/2014"
@@ -26,54 +38,321 @@ INSTRUMENT_FILTER = [
 START_DATE = datetime(2014, 1, 1)
 END_DATE = datetime(2014, 12, 31)
 
+# Number of worker processes, 1 runs everything in this process. Each worker
+# decodes its files itself (see fetchcache.init_worker).
+MAX_WORKERS = 8
+# "parquet": one file per window, "shards": windows resampled into large shards
+STORAGE = "parquet"
+SHARD_FOLDER = "shards"
+# Decoded archive data of earlier runs, see burstextractor.fetchcache. None: off
+FETCH_CACHE = ".fetch_cache"
+FETCH_CACHE_BYTES = 20 * 2**30
+# Decoded files of the day kept in memory with load_per_day and no fetch cache
+DAY_CACHE_BYTES = 256 * 2**20
+
+
+def write_parquet_atomic(df, path):
+    """
+    Writes the Parquet file under a temporary name first and renames it, so a
+    reader (or a crash) never sees a half-written file. The temporary name is
+    unique per process, so two workers writing the same file do not collide.
+    """
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part_path = f"{path}.{os.getpid()}.part"
+    df.to_parquet(part_path)
+    os.replace(part_path, path)
+
+
+def day_windows(date, coverage, instrument):
+    """
+    The starts of the 15-minute windows of a day, every 14 minutes from 15 minutes
+    before midnight to 15 minutes after the next midnight, that have at least 10
+    minutes of data.
+    """
+    # Define start and end of the day
+    day_start = date - timedelta(minutes=15)
+    day_end = day_start + timedelta(hours=24, minutes=30)
+    # Create overlapping windows
+    window_starts = pd.date_range(
+        day_start, day_end, freq=timedelta(minutes=14), inclusive="left"
+    )
+    # Only load the windows with at least 10 minutes of data
+    covered = coverage.covered_duration(
+        window_starts, window_starts + timedelta(minutes=15), instrument
+    )
+    return window_starts[covered > timedelta(minutes=10)]
+
+
+def load_windows(instrument, window_starts, load_per_day):
+    """
+    Loads the windows of one instrument with one get_ecallisto_data call per
+    window. With load_per_day, the windows of the day share the decoded files
+    (in the configured fetch cache, or in a FetchCache in memory for the day),
+    so every file is decoded once instead of once per window.
+
+    Yields:
+    - (window_start, dict of name: pandas.DataFrame)
+    """
+    load = get_ecallisto_data
+    if load_per_day and get_fetch_cache() is None:
+        load = FetchCache(None, hot_bytes=DAY_CACHE_BYTES).get_ecallisto_data
+    for window_start in window_starts:
+        yield window_start, load(
+            window_start,
+            window_start + timedelta(minutes=15),
+            instrument_name=instrument,
+            download_from_local=True,
+        )
+
+
+def long_windows(dfs):
+    """
+    The frames of a window that are at least 10 minutes long.
+    """
+    for name, df in dfs.items():
+        if df is None or df.empty:
+            continue  # No data for this instrument on this day
+        # Make sure that the window is at least 10 minutes long.
+        if df.index.max() - df.index.min() <= timedelta(minutes=10):
+            continue
+        yield name, df
+
+
+def create_day_parquets(instrument, window_starts, folder, load_per_day=True):
+    """
+    Loads the windows of one instrument and day and saves the ones that are at
+    least 10 minutes long as one Parquet file per window. Every window is
+    recorded in the checkpoint of folder once its files are written.
+    Returns: The number of written windows
+    """
+    checkpoint = Checkpoint(folder, load=False)
+    written = 0
+    for window_start, dfs in load_windows(instrument, window_starts, load_per_day):
+        paths = []
+        for name, df in long_windows(dfs):
+            # Define the path to save the Parquet file
+            filename = f"{window_start.strftime('%Y-%m-%d_%H-%M-%S')}.parquet"
+            path = os.path.join(folder, name, filename)
+            # Save the window data to Parquet
+            write_parquet_atomic(df, path)
+            paths.append(path)
+        checkpoint.record(unit_key(instrument, window_start), paths)
+        written += len(paths)
+    return written
+
 
-def create_overlapping_parquets(start_datetime, end_datetime, instrument_list, folder):
+def shard_batches(tasks, max_workers=1, samples_per_shard=SAMPLES_PER_SHARD):
+    """
+    Splits the instrument days into batches of about samples_per_shard windows,
+    but at least max_workers batches, so every batch fills a shard.
+    :param tasks: A dict of (instrument, date): window starts.
+    Returns: A list of lists of ((instrument, date), window starts)
+    """
+    total = sum(len(window_starts) for window_starts in tasks.values())
+    size = min(samples_per_shard, -(-total // max(max_workers, 1)))
+    batches, batch, windows = [], [], 0
+    for task in tasks.items():
+        batch.append(task)
+        windows += len(task[1])
+        if windows >= size:
+            batches.append(batch)
+            batch, windows = [], 0
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def create_shard_batch(batch, folder, load_per_day=True):
+    """
+    Loads the windows of a batch of instrument days and appends the ones that
+    are at least 10 minutes long to the shards of one ShardWriter in
+    folder/shards (see burstextractor.shards), resampled to a fixed shape. A
+    shard is closed between days once it holds SAMPLES_PER_SHARD samples, and
+    its windows are recorded in the checkpoint of folder when it is complete.
+    The samples of a day that fails are dropped from the shard.
+    Returns: The number of written windows and the exception of every
+             (instrument, date) that failed
+    """
+    checkpoint = Checkpoint(folder, load=False)
+    (instrument, _), window_starts = batch[0]
+    writer = ShardWriter(
+        os.path.join(folder, SHARD_FOLDER),
+        f"{instrument}_{window_starts[0].strftime('%Y-%m-%d_%H-%M-%S')}",
+        samples_per_shard=None,
+    )
+    # The windows of the open shard, recorded when it is closed
+    pending = []
+    written, failed = 0, {}
+    for (instrument, date), window_starts in batch:
+        offset = len(writer.rows)
+        records = []
+        try:
+            for window_start, dfs in load_windows(
+                instrument, window_starts, load_per_day
+            ):
+                paths = []
+                for name, df in long_windows(dfs):
+                    shard, _ = writer.append(df, name, window_start)
+                    paths.append(os.path.join(writer.folder, shard))
+                records.append((unit_key(instrument, window_start), paths))
+        except Exception as e:
+            writer.truncate(offset)
+            failed[(instrument, date)] = e
+            continue
+        pending += records
+        written += sum(len(paths) for _, paths in records)
+        if len(writer.rows) >= SAMPLES_PER_SHARD:
+            writer.close_shard()
+            for key, paths in pending:
+                checkpoint.record(key, paths)
+            pending = []
+    writer.close()
+    for key, paths in pending:
+        checkpoint.record(key, paths)
+    return written, failed
+
+
+def run_batch(batch, folder, load_per_day=True, storage="parquet"):
+    """
+    Runs a batch of instrument days, see create_day_parquets and
+    create_shard_batch.
+    Returns: The number of written windows and the exception of every
+             (instrument, date) that failed
+    """
+    if storage == "shards":
+        return create_shard_batch(batch, folder, load_per_day)
+    written, failed = 0, {}
+    for (instrument, date), window_starts in batch:
+        try:
+            written += create_day_parquets(
+                instrument, window_starts, folder, load_per_day
+            )
+        except Exception as e:
+            failed[(instrument, date)] = e
+    return written, failed
+
+
+def remove_part_files(folder):
+    """
+    Removes the temporary files of windows and shards that an interrupted run
+    left in folder. Only call it when no other run writes to folder.
+    """
+    for path in glob.glob(os.path.join(glob.escape(folder), "*", "*.part")):
+        os.remove(path)
+
+
+def create_overlapping_parquets(
+    start_datetime,
+    end_datetime,
+    instrument_list,
+    folder,
+    max_workers=1,
+    load_per_day=True,
+    storage="parquet",
+):
     """
     Create overlapping Parquet files of 15-minute windows overlapping by 1 minute
     for each instrument in the instrument_list between start_datetime and end_datetime.
+    The work is split into one task per instrument and day (with shards, into
+    batches of days that fill a shard). With max_workers > 1 the tasks run in a
+    process pool; the windows are the same as in the serial run.
+    With load_per_day, every file of an instrument and day is decoded once and
+    shared by the overlapping windows.
+    Finished windows are recorded in folder/.manifest, a restarted run (or a run
+    for another date range into the same folder) skips them.
 
     Parameters:
     - start_datetime: datetime.datetime
     - end_datetime: datetime.datetime
     - instrument_list: list of str
     - folder: str
+    - max_workers: int, number of worker processes (1: run in this process)
+    - load_per_day: bool, decode each file of an instrument and day once
+    - storage: str, "parquet" (one file per window) or "shards"
+
+    Returns:
+    - int: the number of written windows
+    - dict: the exception of every (instrument, date) task that failed
     """
     # Ensure the folder exists
     os.makedirs(folder, exist_ok=True)
 
+    # The time covered by the local archive, from its file names
+    coverage = load_coverage(
+        start=start_datetime - timedelta(days=1), end=end_datetime + timedelta(days=1)
+    )
+
     # Generate list of dates between start_datetime and end_datetime
     date_list = pd.date_range(start_datetime, end_datetime, inclusive="both")
+    # Windows finished by an earlier run are skipped
+    checkpoint = Checkpoint(folder)
+    tasks = {}
+    for instrument in instrument_list:
+        for date in date_list:
+            window_starts = day_windows(date, coverage, instrument)
+            window_starts = window_starts[
+                [
+                    not checkpoint.done(unit_key(instrument, window_start))
+                    for window_start in window_starts
+                ]
+            ]
+            if len(window_starts):
+                tasks[(instrument, date)] = window_starts
+
+    # Temporary files of an interrupted run
+    remove_part_files(folder)
+    # One job per instrument day, or per batch of days that fills a shard
+    if storage == "shards":
+        batches = shard_batches(tasks, max_workers)
+    else:
+        batches = [[task] for task in tasks.items()]
+
+    written, failed = 0, {}
+    if max_workers <= 1:
+        pbar = tqdm(total=len(tasks), desc="[Instrument days]")
+        for batch in batches:
+            batch_written, batch_failed = run_batch(
+                batch, folder, load_per_day, storage
+            )
+            written += batch_written
+            failed.update(batch_failed)
+            pbar.update(len(batch))
+    else:
+        with ProcessPoolExecutor(
+            max_workers=max_workers, initializer=init_worker
+        ) as executor:
+            futures = {
+                executor.submit(run_batch, batch, folder, load_per_day, storage): batch
+                for batch in batches
+            }
+            # Created after the workers are forked, like its monitor thread
+            pbar = tqdm(total=len(tasks), desc="[Instrument days]")
+            for future in as_completed(futures):
+                batch = futures[future]
+                if future.exception() is not None:
+                    failed.update({task: future.exception() for task, _ in batch})
+                else:
+                    batch_written, batch_failed = future.result()
+                    written += batch_written
+                    failed.update(batch_failed)
+                pbar.update(len(batch))
+    pbar.close()
+    checkpoint.compact()
+
+    for (instrument, date), e in sorted(failed.items()):
+        print(f"{instrument} {date.date()}: {e}")
+    return written, failed
+
 
-    for instrument in tqdm(instrument_list, desc="[Instruments]", position=1):
-        for date in tqdm(date_list, desc="[Dates]", leave=False, position=2):
-            # Define start and end of the day
-            day_start = date - timedelta(minutes=15)
-            day_end = day_start + timedelta(hours=24, minutes=30)
-            # Create overlapping windows
-            window_start = day_start
-
-            while window_start < day_end:
-                dfs = get_ecallisto_data(
-                    window_start,
-                    window_start + timedelta(minutes=15),
-                    instrument_name=instrument,
-                    download_from_local=True,
-                )
-                for instrument, df in dfs.items():
-                    if df is None or df.empty:
-                        continue  # No data for this instrument on this day
-                    # Make sure that the window is at least 10 minutes long.
-                    if df.index.max() - df.index.min() > timedelta(minutes=10):
-                        # Define the path to save the Parquet file
-                        filename = (
-                            f"{window_start.strftime('%Y-%m-%d_%H-%M-%S')}.parquet"
-                        )
-                        path = os.path.join(folder, instrument, filename)
-                        os.makedirs(os.path.dirname(path), exist_ok=True)
-                        # Save the window data to Parquet
-                        df.to_parquet(path)
-                window_start += timedelta(minutes=14)
-
-
-# Call the function with the defined parameters
-create_overlapping_parquets(START_DATE, END_DATE, INSTRUMENT_FILTER, FOLDER)
+if __name__ == "__main__":
+    # The worker processes inherit the cache
+    configure_fetch_cache(FETCH_CACHE, max_bytes=FETCH_CACHE_BYTES)
+    # Call the function with the defined parameters
+    create_overlapping_parquets(
+        START_DATE,
+        END_DATE,
+        INSTRUMENT_FILTER,
+        FOLDER,
+        max_workers=MAX_WORKERS,
+        storage=STORAGE,
+    )
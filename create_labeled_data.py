@@ -1,17 +1,28 @@
 # %%
-from ecallisto_ng.data_download.downloader import get_ecallisto_data
-from ecallisto_ng.burst_list.utils import load_burst_list
 from datetime import timedelta, datetime
-from PIL import Image
-import random
-import os
-from tqdm import tqdm
-import pandas as pd
 
+from burstextractor.coverage import load_coverage
+from burstextractor.fetchcache import configure_fetch_cache
+from burstextractor.labeledpool import generate_labeled_data
+from burstextractor.storage import load_burst_list
+
+# Convert the list of burst_list_creation.ipynb once with
+# python -m burstextractor.storage burst_list.xlsx burst_list.arrow
+BURST_LIST = "burst_list.arrow"
 FOLDER = "/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october"
-RESOLUTION = (256, 256)
 BURST_NON_BURST_RATIO = 10  # 10: There are 10x more non bust than burst images.
 START_DATE = datetime(2024, 5, 13)
+SEED = 42  # Seed of the jitter and the non burst sampling
+MAX_WORKERS = 8  # Instruments generated in parallel
+# timedelta(minutes=4): overlapping bursts of a station starting within 4 minutes
+# get one window, labeled with the type of the longest burst (all types are in the
+# Parquet metadata). This changes the labels and sample counts. None: one window
+# per burst
+MAX_SPAN = None
+# Decoded archive data shared by overlapping windows and reruns, see
+# burstextractor.fetchcache. None turns it off.
+FETCH_CACHE = ".fetch_cache"
+FETCH_CACHE_BYTES = 20 * 2**30
 INSTRUMENT_FILTER = [
     "MEXICO-FCFM-UANL_01",
     "USA-ARIZONA-ERAU_01",
@@ -51,179 +62,23 @@ INSTRUMENT_FILTER = [
 ]
 
 
-def random_duration(min_start, min_end):
-    """
-    Generate a random duration between a specified range in minutes.
-
-    Parameters:
-    min_start (int): The start of the range in minutes.
-    min_end (int): The end of the range in minutes.
-
-    Returns:
-    datetime.timedelta: A timedelta object representing the duration.
-    """
-    # Generate a random duration in minutes (including fractions) within the specified range
-    total_minutes = random.randint(min_start, min_end)
-
-    return timedelta(minutes=total_minutes)
-
-
-def save_image(df, path):
-    """
-    Save an image to a file.
-
-    Parameters:
-    df (pandas.DataFrame): The dataframe containing the image data.
-    path (str): The path to save the image to.
-    """
-    # Get the image data from the dataframe
-    image_data = df.values
-
-    # Convert the image data to a PIL Image
-    image = Image.fromarray(image_data)
-
-    # Save the image to the specified path
-    image.save(path)
-
-
-def return_random_datetime_between(start_datetime, end_datetime):
-    """
-    Generate a random datetime between two specified datetimes.
-
-    Parameters:
-    start_datetime (datetime.datetime): The start of the range.
-    end_datetime (datetime.datetime): The end of the range.
-
-    Returns:
-    datetime.datetime: A random datetime between the two specified datetimes.
-    """
-    # Calculate the total number of seconds between the two datetimes
-    total_seconds = (end_datetime - start_datetime).total_seconds()
-
-    # Generate a random number of seconds within the specified range
-    random_seconds = random.randint(0, total_seconds)
-
-    # Return the start datetime plus the random number of seconds
-    # Rounded to minutes
-    return (start_datetime + timedelta(seconds=random_seconds)).replace(
-        second=0, microsecond=0
-    )
-
-
-burst_list = load_burst_list("burst_list.xlsx")
-date_filtered_burst_list = burst_list[burst_list["datetime_start"] >= START_DATE]
-
-for instrument in tqdm(
-    INSTRUMENT_FILTER,
-    desc="[Instruments]",
-    position=1,
-):
-    filtered_burst_list = date_filtered_burst_list[
-        date_filtered_burst_list["instruments"].isin([instrument.split("_")[0]]).copy()
-    ]  #
-
-    # # Some Filtering for specific instruments
-    burst_generated = 0
-
-    for i, row in tqdm(
-        filtered_burst_list.iterrows(),
-        total=filtered_burst_list.shape[0],
-        desc=f"[Data]",
-        position=2,
-    ):
-        datetime_start = row["datetime_start"] - random_duration(0, 11)
-        end_time = datetime_start + timedelta(minutes=15)
-        dfs = get_ecallisto_data(
-            datetime_start,
-            end_time,
-            instrument_name=instrument,
-            download_from_local=True,
-        )
-        for _, df in dfs.items():
-            df: pd.DataFrame
-            if not df.attrs["FULLNAME"] == instrument:
-                continue
-            try:
-                assert (df.index.max() - df.index.min()) > pd.Timedelta(
-                    10, unit="minutes"
-                ), "Too short."
-                ## Path to save the image to
-                # It's FOLDER / instrument / burst type / datetime_start.png
-                path = os.path.join(
-                    FOLDER,
-                    df.attrs["FULLNAME"],
-                    str(row["type"]),
-                    row["datetime_start"].strftime("%Y-%m-%d_%H-%M-%S") + ".parquet",
-                )
-                os.makedirs(os.path.dirname(path), exist_ok=True)
-                df.to_parquet(path)
-                burst_generated += 1
-            except Exception as e:
-                print(e)
-                print(row["datetime_start"])
-                print(row["datetime_end"])
-                print(row["instruments"])
-                print(instrument)
-    # ## Non Bursts
-    # Machen wir ähnlich, aber halt andersrum.
-    non_burst_generated = 0
-
-    min_datetime, max_datetime = (
-        date_filtered_burst_list["datetime_start"].min(),
-        date_filtered_burst_list["datetime_start"].max(),
+if __name__ == "__main__":
+    burst_list = load_burst_list(BURST_LIST)
+    # The time covered by the local archive, from its file names
+    coverage = load_coverage(start=START_DATE, end=burst_list["datetime_end"].max())
+    # The worker processes inherit the cache, the summary has its hits and misses
+    configure_fetch_cache(FETCH_CACHE, max_bytes=FETCH_CACHE_BYTES)
+    # One job per instrument, windows finished by an earlier run are skipped.
+    # The result does not depend on MAX_WORKERS, see burstextractor.labeledpool.
+    summary = generate_labeled_data(
+        burst_list,
+        INSTRUMENT_FILTER,
+        FOLDER,
+        START_DATE,
+        ratio=BURST_NON_BURST_RATIO,
+        coverage=coverage,
+        seed=SEED,
+        max_workers=MAX_WORKERS,
+        max_span=MAX_SPAN,
     )
-    print("Start Datetime:", min_datetime)
-    print("End Datetime:", max_datetime)
-
-    # Initialize tqdm with a large total and manually update
-    desired_total_count = burst_generated * BURST_NON_BURST_RATIO
-    pbar = tqdm(total=desired_total_count, desc=f"[Non Burst data]")
-    # Read in the unfiltered burst list.
-    # This contains ALL the stations, even if they had wierd typos and bursts of other instruments.
-    while non_burst_generated < desired_total_count:
-        start_datetime = return_random_datetime_between(min_datetime, max_datetime)
-        end_datetime = start_datetime + timedelta(minutes=15)
-        # Now we need to check that the start_datetime is not in a burst
-        non_burst_in_burst_df = date_filtered_burst_list[
-            (
-                (date_filtered_burst_list.datetime_start <= start_datetime)
-                & (start_datetime <= date_filtered_burst_list.datetime_end)
-            )
-            | (
-                (date_filtered_burst_list.datetime_start <= end_datetime)
-                & (end_datetime <= date_filtered_burst_list.datetime_end)
-            )
-        ]
-        if not non_burst_in_burst_df.empty:
-            print("Datetime is in a burst, trying again...")
-            continue
-
-        dfs = get_ecallisto_data(
-            start_datetime,
-            end_datetime,
-            instrument_name=instrument,
-            download_from_local=True,
-        )
-        for _, df in dfs.items():
-            if not df.attrs["FULLNAME"] == instrument:
-                continue
-            try:
-                assert (df.index.max() - df.index.min()) > pd.Timedelta(
-                    10, unit="minutes"
-                ), "Too short."
-                path = os.path.join(
-                    FOLDER,
-                    df.attrs["FULLNAME"],
-                    "0",
-                    start_datetime.strftime("%Y-%m-%d_%H-%M-%S") + ".parquet",
-                )
-                os.makedirs(os.path.dirname(path), exist_ok=True)
-                df.to_parquet(path)
-                pbar.update(1)  # Increment the progress bar by one
-                non_burst_generated += 1
-            except Exception as e:
-                print(e)
-                print(row["datetime_start"])
-                print(row["datetime_end"])
-                print(row["instruments"])
-                print(instrument)
+    print(summary.to_string(index=False))
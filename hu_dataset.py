@@ -1,79 +1,36 @@
 # %%
 import pandas as pd
-import glob
-from sklearn.model_selection import train_test_split
-from datasets import Dataset
 
 # %%
-images = glob.glob(
-    "/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october/*/*/*.parquet"
-)
+# One row per image with antenna, label, datetime and the Parquet footer stats.
+# Only new directories are listed again, see burstextractor.datasetindex.
+from burstextractor.datasetindex import load_dataset_index
 
-# %%
-images[0]
+df = load_dataset_index(
+    "/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october"
+)
+df = df[["image", "label", "antenna", "datetime"]]
 
 # %%
-df = pd.DataFrame()
+df["image"].iloc[0]
 
 # %%
 df
 
-# %%
-df["image"] = images
-df["label"] = df["image"].str.split("/", expand=True)[8].astype(str)
-df["antenna"] = df["image"].str.split("/", expand=True)[7].astype(str)
-df["datetime"] = df["image"].str.split("/", expand=True)[9].str.replace(".parquet", "")
-df["datetime"] = pd.to_datetime(df["datetime"], format="%Y-%m-%d_%H-%M-%S")
-
 
 # %%
-def custom_stratified_split(df, test_size=0.1, val_size=0.1, min_size=3):
-    # Custom split function for a group
-    def split_group(group_df):
-        if len(group_df) < min_size:
-            # For very small groups, include in training or distribute as best as possible
-            if len(group_df) == 1:
-                return group_df, pd.DataFrame(), pd.DataFrame()
-            elif len(group_df) == 2:
-                train = group_df.sample(n=1)
-                return train, pd.DataFrame(), group_df.drop(train.index)
-            else:
-                train, test_val = train_test_split(
-                    group_df, test_size=2, random_state=42
-                )
-                val, test = train_test_split(test_val, test_size=1, random_state=42)
-                return train, val, test
-        else:
-            # Standard split for groups large enough
-            train_val, test = train_test_split(
-                group_df, test_size=test_size, random_state=42
-            )
-            train, val = train_test_split(
-                train_val, test_size=val_size / (1 - test_size), random_state=42
-            )
-            return train, val, test
-
-    grouped = df.groupby(["antenna", "label"])
-    train_list: list[pd.DataFrame] = []
-    val_list: list[pd.DataFrame] = []
-    test_list: list[pd.DataFrame] = []
-
-    for _, group in grouped:
-        train, val, test = split_group(group)
-        train_list.append(train)
-        val_list.append(val)
-        test_list.append(test)
-
-    # Concatenate all the splits back into DataFrames
-    train_df = pd.concat(train_list)
-    val_df = pd.concat(val_list)
-    test_df = pd.concat(test_list)
-
-    return train_df, val_df, test_df
-
-
-# Splitting the DataFrame
-train_df, val_df, test_df = custom_stratified_split(df)
+# Every (antenna, label) group is split 80/10/10 in one vectorized pass. Overlapping
+# 15-minute windows of an antenna go to the same split, also if their labels differ,
+# in blocks of at most an hour.
+from burstextractor.splits import stratified_split
+
+train_df, val_df, test_df = stratified_split(
+    df,
+    seed=42,
+    block_gap=pd.Timedelta(0),
+    window_length=pd.Timedelta(minutes=15),
+    max_block=pd.Timedelta(hours=1),
+)
 
 
 # %%
@@ -84,19 +41,42 @@ min_max_datetime
 
 
 # %%
-# Custom function to assert no overlapping file_names between splits
-def assert_no_overlap(train_df, val_df, test_df):
-    train_files = set(train_df["image"])
-    val_files = set(val_df["image"])
-    test_files = set(test_df["image"])
+# Windows of the same antenna whose 15 minutes overlap share data even if they are
+# different files. Find them across the splits and drop them from the lower split.
+from burstextractor.leakage import check_splits
 
-    assert train_files.isdisjoint(val_files), "Train and Validation sets overlap."
-    assert train_files.isdisjoint(test_files), "Train and Test sets overlap."
-    assert val_files.isdisjoint(test_files), "Validation and Test sets overlap."
+train_df, val_df, test_df, leaks = check_splits(
+    train_df, val_df, test_df, resolve="drop"
+)
 
+# %%
+# Resample every image once to RESOLUTION and store them in one memory-mapped
+# uint8 array. Training reads slices of it instead of decoding a Parquet per sample.
+import os
+from burstextractor.tensorcache import build_tensor_cache, load_tensor_cache
 
-# Perform the assertion check
-assert_no_overlap(train_df, val_df, test_df)
+RESOLUTION = (256, 256)  # Same as burstextractor.shards.SHAPE
+CACHE_PATH = (
+    "/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october/tensor_cache_256"
+)
+# The samples of a split are stored next to each other, so a split is a slice
+cache_df = pd.concat(
+    [
+        train_df.assign(split="train"),
+        val_df.assign(split="validation"),
+        test_df.assign(split="test"),
+    ],
+    ignore_index=True,
+)
+build_tensor_cache(
+    cache_df["image"],
+    CACHE_PATH,
+    shape=RESOLUTION,
+    metadata=cache_df,
+    max_workers=os.cpu_count(),
+)
+tensors, tensor_metadata = load_tensor_cache(CACHE_PATH)
+train_tensors = tensors[: len(train_df)]  # No copy
 
 # %%
 val_df
@@ -149,61 +129,40 @@ plt.tight_layout()
 plt.show()
 
 # %%
-from datasets import load_dataset
+# Decode, normalize and encode the windows as PNG in a process pool and write them
+# straight to Parquet shards in the Hugging Face layout, see burstextractor.export.
+from burstextractor.export import export_dataset
 
-train = load_dataset(
-    "csv",
-    data_files="/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october/train_metadata.csv",
-)
-valid = load_dataset(
-    "csv",
-    data_files="/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october/val_metadata.csv",
+EXPORT_FOLDER = (
+    "/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october/hf_export"
 )
-test = load_dataset(
-    "csv",
-    data_files="/mnt/nas05/data01/vincenzo/ecallisto/hu_dataset_live_mai_october/test_metadata.csv",
+exported = export_dataset(
+    {"train": train_df, "validation": val_df, "test": test_df},
+    EXPORT_FOLDER,
+    max_workers=os.cpu_count(),
 )
 
 # %%
-import pandas as pd
-from PIL import Image as PILImage
-import io
+# The shards are uploaded as they are, without decoding them again
+from huggingface_hub import HfApi
 
-
-def load_image_from_parquet(example):
-    parquet_path = example["image"]  # Path to the Parquet file
-    # Read the Parquet file
-    df = pd.read_parquet(parquet_path)
-    # Convert bytes to PIL Image
-    image = PILImage.fromarray(df.values.T)
-    # Update the example with the image
-    example["image"] = image
-    return example
-
-
-# %%
-# Apply the function to convert the 'image' column
-train = train.map(load_image_from_parquet)
-valid = valid.map(load_image_from_parquet)
-test = test.map(load_image_from_parquet)
-
-# %%
-from datasets import Image
-
-train = train.cast_column("image", Image())
-valid = valid.cast_column("image", Image())
-test = test.cast_column("image", Image())
-
-# %%
-from datasets import DatasetDict
-
-dd = DatasetDict(
-    {"train": train["train"], "validation": valid["train"], "test": test["train"]}
+api = HfApi()
+api.create_repo(
+    "i4ds/ecallisto_radio_sunburst-mai-october",
+    repo_type="dataset",
+    private=False,
+    exist_ok=True,
+)
+api.upload_folder(
+    folder_path=EXPORT_FOLDER,
+    repo_id="i4ds/ecallisto_radio_sunburst-mai-october",
+    repo_type="dataset",
 )
-
 
 # %%
-dd.push_to_hub("i4ds/ecallisto_radio_sunburst-mai-october", private=False)
+from datasets import load_dataset
+
+dd = load_dataset(EXPORT_FOLDER)
 
 # %%
 # Display the image
@@ -1,28 +1,21 @@
 # %%
 import pandas as pd
-import glob
-from sklearn.model_selection import train_test_split
-from datasets import Dataset
 
 # %%
 BASE_PATH = "/mnt/nas05/data01/vincenzo/ecallisto/2014/"
-images = glob.glob("{}*/*.parquet".format(BASE_PATH))
+# One row per image with antenna, datetime and the Parquet footer stats.
+# Only new directories are listed again, see burstextractor.datasetindex.
+from burstextractor.datasetindex import load_dataset_index
 
-# %%
-images[0]
+df = load_dataset_index(BASE_PATH)
+df = df[["image", "antenna", "datetime"]]
 
 # %%
-df = pd.DataFrame()
+df["image"].iloc[0]
 
 # %%
 df
 
-# %%
-df["image"] = images
-df["antenna"] = df["image"].str.split("/", expand=True)[7].astype(str)
-df["datetime"] = df["image"].str.split("/", expand=True)[8].str.replace(".parquet", "")
-df["datetime"] = pd.to_datetime(df["datetime"], format="%Y-%m-%d_%H-%M-%S")
-
 # %%
 # Group by 'antenna' and get min, max datetime
 min_max_datetime = df.groupby("antenna")["datetime"].agg(["min", "max"]).reset_index()
@@ -57,41 +50,34 @@ plt.savefig(f"eda.png")
 plt.show()
 
 # %%
-from datasets import load_dataset
+# Decode, normalize and encode the windows as PNG in a process pool and write them
+# straight to Parquet shards in the Hugging Face layout, see burstextractor.export.
+from burstextractor.export import export_dataset
 
-train = load_dataset(
-    "csv",
-    data_files=f"{BASE_PATH}/train_metadata.csv",
-)
+EXPORT_FOLDER = f"{BASE_PATH}/hf_export"
+exported = export_dataset({"train": df}, EXPORT_FOLDER)
 
 # %%
-import pandas as pd
-from PIL import Image as PILImage
-import io
-
-
-def load_image_from_parquet(example):
-    parquet_path = example["image"]  # Path to the Parquet file
-    # Read the Parquet file
-    df = pd.read_parquet(parquet_path)
-    # Convert bytes to PIL Image
-    image = PILImage.fromarray(df.values.T)
-    # Update the example with the image
-    example["image"] = image
-    return example
-
+# The shards are uploaded as they are, without decoding them again
+from huggingface_hub import HfApi
+
+api = HfApi()
+api.create_repo(
+    "i4ds/ecallisto_radio_sunburst-2014",
+    repo_type="dataset",
+    private=False,
+    exist_ok=True,
+)
+api.upload_folder(
+    folder_path=EXPORT_FOLDER,
+    repo_id="i4ds/ecallisto_radio_sunburst-2014",
+    repo_type="dataset",
+)
 
 # %%
-# Apply the function to convert the 'image' column
-train = train.map(load_image_from_parquet)
-# %%
-from datasets import Image
-
-train = train.cast_column("image", Image())
-
+from datasets import load_dataset
 
-# %%
-train.push_to_hub("i4ds/ecallisto_radio_sunburst-2014", private=False)
+train = load_dataset(EXPORT_FOLDER)
 
 # %%
 # Display the image
@@ -0,0 +1,84 @@
+import multiprocessing
+import os
+import zlib
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+DAY = pd.Timestamp("2024-05-13")
+# 15 minute files from 09:00 to 13:00, with a gap at 10:30
+TIMES = [
+    t
+    for t in pd.date_range("09:00", "12:45", freq="15min")
+    if t.hour * 60 + t.minute != 630
+]
+FILES = [
+    f"{station}_{DAY:%Y%m%d}_{t:%H%M%S}_{focus}.fit.gz"
+    for station, focus in [("GLASGOW", "01"), ("GLASGOW", "02"), ("BIR", "01")]
+    for t in TIMES
+]
+
+
+def decode(path, verbose=False):
+    """
+    Stands in for ecallisto_ng's fetch_fits_to_pandas: a file of one sample per
+    second and 8 frequencies. The values and the OBS_FILE key differ per file,
+    GLASGOW_02 changes its frequencies and PWM_VAL at noon.
+    """
+    name = os.path.basename(path)
+    station, day, time, focus = name[: -len(".fit.gz")].split("_")
+    start = datetime.strptime(day + time, "%Y%m%d%H%M%S")
+    frequencies = np.linspace(45.0, 80.0, 8)
+    if station == "GLASGOW" and focus == "02" and start.hour >= 12:
+        frequencies = frequencies + 100
+    rng = np.random.default_rng(zlib.crc32(name.encode()))
+    df = pd.DataFrame(
+        rng.integers(0, 255, (900, 8), dtype=np.uint8),
+        index=pd.date_range(start, periods=900, freq="1s"),
+        columns=frequencies,
+    )
+    df.attrs.update(
+        INSTRUME=station,
+        OBS_FILE=name,
+        PWM_VAL=100 if start.hour < 12 else 120,
+        ANTENNAID=focus[-2:],
+    )
+    return df
+
+
+@pytest.fixture
+def archive(tmp_path, monkeypatch):
+    """
+    A local archive of empty files, decoded by decode. get_ecallisto_data of
+    ecallisto_ng reads it sequentially with its own file selection and header
+    merging, and fails in worker processes that would start a pool of their own.
+    Returns: The base path of the archive
+    """
+    downloader = pytest.importorskip(
+        "ecallisto_ng.data_download.downloader", exc_type=ImportError
+    )
+    from ecallisto_ng.data_download import utils
+
+    base = str(tmp_path / "archive")
+    folder = os.path.join(base, DAY.strftime("%Y/%m/%d"))
+    os.makedirs(folder)
+    for name in FILES:
+        open(os.path.join(folder, name), "w").close()
+
+    def get_ecallisto_data(
+        start, end, instrument_name=None, download_from_local=True, **kwargs
+    ):
+        # ecallisto_ng starts a pool of its own in a worker that is no daemon
+        process = multiprocessing.current_process()
+        assert multiprocessing.parent_process() is None or process.daemon
+        paths = downloader.get_local_file_paths(start, end, instrument_name, base)
+        frames = [downloader.fetch_fits_to_pandas(path, False) for path in paths]
+        dfs = utils.concat_dfs_by_instrument(frames)
+        return utils.filter_dataframes(dfs, start, end)
+
+    monkeypatch.setattr(downloader, "LOCAL_PATH", base)
+    monkeypatch.setattr(downloader, "fetch_fits_to_pandas", decode)
+    monkeypatch.setattr(downloader, "get_ecallisto_data", get_ecallisto_data)
+    return base
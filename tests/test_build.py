@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from burstextractor import build
+
+LINES = [
+    "20240501\t10:00-10:05\tIII\tGLASGOW, [BIR]",
+    "20240501\t11:00-11:02\tCTM\tGLASGOW",
+    "20240502\t23:58-24:00\tII\tBIR",
+    "20240503\t1O:00-10:05\tIII\tBIR",
+]
+
+
+def write_month(folder, lines, name="e-CALLISTO_2024_05.txt"):
+    folder.mkdir(parents=True, exist_ok=True)
+    path = folder / name
+    path.write_text("\n".join(lines) + "\n", encoding="iso-8859-1")
+    return str(path)
+
+
+@pytest.fixture
+def processed(monkeypatch):
+    """
+    The files that process_month is called with.
+    """
+    calls = []
+    process_month = build.process_month
+
+    def counting(filename):
+        calls.append(filename)
+        return process_month(filename)
+
+    monkeypatch.setattr(build, "process_month", counting)
+    return calls
+
+
+def test_process_month_uses_the_codes_of_the_notebook(tmp_path):
+    data = build.process_month(write_month(tmp_path, LINES))
+    assert data["instruments"].tolist() == ["GLASGOW", "BIR", "BIR"]
+    assert data["type"].dtype == "int8"
+    assert data["type"].tolist() == [3, 3, 2]
+    assert data["datetime_end"].astype(str).tolist()[-1] == "2024-05-03 00:00:00"
+
+
+def test_only_changed_months_are_processed(tmp_path, processed):
+    cache = str(tmp_path / "cache")
+    may = write_month(tmp_path / "lists", LINES)
+    june = write_month(tmp_path / "lists", LINES[:1], "e-CALLISTO_2024_06.txt")
+    first = build.build_burst_list([may, june], cache_folder=cache)
+    assert processed == [may, june]
+    assert len(first) == 5
+
+    processed.clear()
+    assert build.build_burst_list([may, june], cache_folder=cache).equals(first)
+    assert processed == []
+
+    write_month(tmp_path / "lists", LINES[:2], "e-CALLISTO_2024_06.txt")
+    assert len(build.build_burst_list([may, june], cache_folder=cache)) == 5
+    assert processed == [june]
+    # The partition of the old June file is removed
+    assert len([name for name in os.listdir(cache) if "_06.txt" in name]) == 1
+
+
+def test_same_month_in_two_folders(tmp_path, processed):
+    cache = str(tmp_path / "cache")
+    first = write_month(tmp_path / "a", LINES[:1])
+    second = write_month(tmp_path / "b", LINES[2:3])
+    data = build.build_burst_list([first, second], cache_folder=cache)
+    assert data["instruments"].tolist() == ["GLASGOW", "BIR", "BIR"]
+
+    processed.clear()
+    build.build_burst_list([first, second], cache_folder=cache)
+    assert processed == []
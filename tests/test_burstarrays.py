@@ -0,0 +1,87 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor import burstparser
+from burstextractor.burstarrays import BurstList
+
+LINES = [
+    "#Date\t\tTime\t\tType\tStations",
+    "20210102\t10:00-10:05\tIII\tAustralia-ASSA, [HUMAIN], (TRIEST)",
+    "20210103\t??:??-??:??\tIII\tMRT1",
+    "20210104\t23:58-00:03\tII\tGLASGOW",
+    "20210105\t12:00-12:01\tCTM\tBIR,",
+    "20210106\t12:00-12:10\tIII\tGLASGOW, BIR",
+]
+
+
+def bursts(tmp_path):
+    path = tmp_path / "e-CALLISTO_2021_01.txt"
+    path.write_text("\n".join(LINES) + "\n", encoding=burstparser.ENCODING)
+    return BurstList.from_parsed(burstparser.parse_burst_lists([str(path)]))
+
+
+def assert_same(a, b):
+    for name in ["start", "end", "type", "instrument_offsets"]:
+        np.testing.assert_array_equal(getattr(a, name), getattr(b, name))
+    np.testing.assert_array_equal(
+        a.instrument_names[a.instrument_codes], b.instrument_names[b.instrument_codes]
+    )
+
+
+def test_from_parsed(tmp_path):
+    burst_list = bursts(tmp_path)
+    assert len(burst_list) == 4
+    assert burst_list.counts().tolist() == [3, 1, 1, 2]
+    assert burst_list.type.tolist() == [3, 2, 0, 3]
+    df = burst_list.to_pandas(explode=False)
+    assert df["instruments"].tolist() == [
+        "Australia-ASSA,HUMAIN,TRIEST",
+        "GLASGOW",
+        "BIR",
+        "GLASGOW,BIR",
+    ]
+    assert df["type"].isna().tolist() == [False, False, True, False]
+    assert df["type"].dropna().tolist() == ["III", "II", "III"]
+    assert df.loc[1, "datetime_end"] == pd.Timestamp("2021-01-05 00:03")
+
+
+def test_select(tmp_path):
+    burst_list = bursts(tmp_path)
+    df = burst_list.to_pandas()
+    selected = burst_list.select(
+        instrument=["GLASGOW", "HUMAIN"], types=["III"], start="2021-01-03"
+    )
+    assert selected.to_pandas()["instruments"].tolist() == ["GLASGOW", "BIR"]
+    expected = df[
+        (df["type"] == "III") & (df["datetime_end"] >= pd.Timestamp("2021-01-03"))
+    ]
+    assert expected["instruments"].tolist() == ["GLASGOW", "BIR"]
+    assert len(burst_list.select(end="2021-01-04 23:58")) == 1
+    assert len(burst_list.select(end="2021-01-04 23:59")) == 2
+
+
+def test_exploded_rows_are_grouped_into_events(tmp_path):
+    burst_list = bursts(tmp_path)
+    exploded = burst_list.to_pandas()
+    assert len(exploded) == 7
+    assert_same(BurstList.from_pandas(exploded), burst_list)
+    assert_same(BurstList.from_pandas(burst_list.to_pandas(explode=False)), burst_list)
+
+
+def test_from_pandas_type_codes_and_missing_times():
+    df = pd.DataFrame(
+        {
+            "instruments": ["GLASGOW", "BIR", "BIR", "GLASGOW"],
+            "type": pd.array([3, 3, None, 2], dtype="Int8"),
+            "datetime_start": pd.to_datetime(
+                ["2024-05-13 10:00", "2024-05-13 10:00", "2024-05-13 11:00", None]
+            ),
+            "datetime_end": pd.to_datetime(
+                ["2024-05-13 10:05", "2024-05-13 10:05", "2024-05-13 11:01", None]
+            ),
+        }
+    )
+    burst_list = BurstList.from_pandas(df)
+    assert burst_list.counts().tolist() == [2, 1]
+    assert burst_list.type.tolist() == [3, 0]
+    assert burst_list.to_pandas()["instruments"].tolist() == ["GLASGOW", "BIR", "BIR"]
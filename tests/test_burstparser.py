@@ -0,0 +1,83 @@
+import glob
+import os
+
+import numpy as np
+
+from burstextractor import burstparser
+
+LINES = [
+    "# Product: e-CALLISTO_2021_01.txt",
+    "#Date\t\tTime\t\tType\tStations",
+    "20210101\t##:##-##:##",
+    "20210102\t10:00-10:05\tIII\tAustralia-ASSA, [HUMAIN], (TRIEST)",
+    "20210103\t??:??-??:??\tIII\tMRT1",
+    "20210104\t23:58-00:03\tII\tGLASGOW\tcomment\textra",
+    "20210105\t12:00-12:01\tCTM\tBIR,",
+    "20210135\t12:00-12:01\tIII\tBIR",
+]
+
+
+def write_list(tmp_path, lines=LINES, name="e-CALLISTO_2021_01.txt"):
+    path = tmp_path / name
+    path.write_text("\n".join(lines) + "\n", encoding=burstparser.ENCODING)
+    return str(path)
+
+
+def test_keep_line():
+    kept = [line for line in LINES if burstparser.keep_line(line)]
+    assert [line[:8] for line in kept] == [
+        "20210102",
+        "20210104",
+        "20210105",
+        "20210135",
+    ]
+
+
+def test_surplus_fields_are_cut_off(tmp_path):
+    data = burstparser.read_burst_frame([write_list(tmp_path)])
+    assert data.columns.tolist() == burstparser.COLUMNS
+    assert data.loc[1].tolist() == ["20210104", "23:58-00:03", "II", "GLASGOW"]
+
+
+def test_parse_burst_list(tmp_path):
+    columns = burstparser.parse_burst_list(write_list(tmp_path))
+    assert columns["valid"].tolist() == [True, True, True, False]
+    assert columns["date"][:3].astype(str).tolist() == [
+        "2021-01-02",
+        "2021-01-04",
+        "2021-01-05",
+    ]
+    assert np.isnat(columns["date"][3])
+    # Past midnight ends on the next day
+    assert columns["start"].tolist() == [600, 1438, 720, -1]
+    assert columns["end"].tolist() == [605, 1443, 721, -1]
+    assert columns["type"].tolist() == [3, 2, 0, 3]
+    assert columns["type_name"].tolist() == ["III", "II", "CTM", "III"]
+    offsets, names = columns["instrument_offsets"], columns["instruments"]
+    assert offsets.tolist() == [0, 3, 4, 6, 7]
+    assert names.tolist() == [
+        "Australia-ASSA",
+        "HUMAIN",
+        "TRIEST",
+        "GLASGOW",
+        "BIR",
+        "",
+        "BIR",
+    ]
+
+
+def test_empty_file(tmp_path):
+    columns = burstparser.parse_burst_list(write_list(tmp_path, LINES[:3]))
+    assert len(columns["date"]) == 0
+    assert columns["instrument_offsets"].tolist() == [0]
+
+
+def test_parallel_is_the_same_as_serial():
+    folder = os.path.join(os.path.dirname(__file__), "..", "ecallisto_files")
+    filenames = sorted(glob.glob(os.path.join(folder, "e-CALLISTO_*.txt")))[:6]
+    assert filenames
+    serial = burstparser.parse_burst_lists(filenames)
+    parallel = burstparser.parse_burst_lists(filenames, max_workers=3)
+    assert serial.keys() == parallel.keys()
+    for key, values in serial.items():
+        np.testing.assert_array_equal(values, parallel[key])
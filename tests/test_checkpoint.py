@@ -0,0 +1,50 @@
+import os
+
+from burstextractor.checkpoint import Checkpoint, unit_key
+
+
+def write_file(folder, name, content=b"data"):
+    path = os.path.join(folder, name)
+    with open(path, "wb") as f:
+        f.write(content)
+    return path
+
+
+def test_resume_counts_written_units(tmp_path):
+    folder = str(tmp_path)
+    checkpoint = Checkpoint(folder)
+    checkpoint.record(
+        unit_key("GLASGOW_01", "III", "2024-05-13 10:00:00"),
+        [write_file(folder, "a.parquet")],
+    )
+    checkpoint.record(unit_key("GLASGOW_01", "III", "2024-05-13 11:00:00"), [])
+    checkpoint.record(
+        unit_key("GLASGOW_01", "0", "2024-05-13 12:00:00"),
+        [
+            write_file(folder, "b.parquet"),
+            write_file(folder, "c.parquet"),
+        ],
+    )
+
+    resumed = Checkpoint(folder)
+    assert resumed.count("GLASGOW_01/") == 3
+    assert resumed.count("GLASGOW_01/", written=True) == 2
+    assert resumed.count("GLASGOW_01/III/", written=True) == 1
+    assert resumed.outputs(unit_key("GLASGOW_01", "0", "2024-05-13 12:00:00")) == [
+        "b.parquet",
+        "c.parquet",
+    ]
+
+
+def test_resume_after_compact(tmp_path):
+    folder = str(tmp_path)
+    checkpoint = Checkpoint(folder)
+    key = unit_key("GLASGOW_01", "III", "2024-05-13 10:00:00")
+    checkpoint.record(key, [write_file(folder, "a.parquet")])
+    assert checkpoint.compact()
+
+    resumed = Checkpoint(folder)
+    assert resumed.done(key, verify=True)
+    assert resumed.count("GLASGOW_01/", written=True) == 1
+    os.remove(os.path.join(folder, "a.parquet"))
+    assert not resumed.done(key, verify=True)
@@ -0,0 +1,42 @@
+import pandas as pd
+
+from burstextractor.corrections import LabelOverlay
+
+
+def write_review(path, rows, column):
+    pd.DataFrame(rows, columns=[column, "antenna", "datetime", "user_label"]).to_csv(
+        path
+    )
+
+
+def test_windows_with_the_same_start_and_different_labels(tmp_path):
+    start = "2024-05-13 10:00:00"
+    write_review(
+        tmp_path / "a_test_only_disagreement_2024-05-30_19-08-01.csv",
+        [
+            [f"/data/GLASGOW_01/2/{start}.parquet", "GLASGOW_01", start, False],
+            [f"/data/GLASGOW_01/3/{start}.parquet", "GLASGOW_01", start, True],
+        ],
+        "file_path",
+    )
+    write_review(
+        tmp_path / "data_test_images_all_2024-04-29_16-48-05.csv",
+        [[f"/images/1/999_BIR_01_{start}.png", "BIR_01", start, False]],
+        "image",
+    )
+    overlay = LabelOverlay(str(tmp_path))
+    assert overlay.add(sorted(map(str, tmp_path.glob("*.csv")))) == 1
+
+    df = pd.DataFrame(
+        {
+            "antenna": ["GLASGOW_01", "GLASGOW_01", "GLASGOW_01", "BIR_01", "BIR_01"],
+            "datetime": pd.to_datetime([start] * 5),
+            "label": ["2", "3", "0", "3", "0"],
+        }
+    )
+    df["burst"] = df["label"] != "0"
+    labeled = overlay.apply(df, label_column="burst")
+    # Type II and III windows keep their own reviews, the binary review only
+    # applies to the burst window of BIR_01
+    assert labeled["burst"].tolist() == [False, True, False, False, False]
+    assert labeled["corrected"].tolist() == [True, False, False, True, False]
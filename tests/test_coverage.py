@@ -0,0 +1,74 @@
+import os
+
+import pandas as pd
+
+from burstextractor import coverage
+
+DAY = pd.Timestamp("2024-05-13")
+
+
+def touch(base, day, *names):
+    folder = os.path.join(base, day.strftime("%Y/%m/%d"))
+    os.makedirs(folder, exist_ok=True)
+    for name in names:
+        open(os.path.join(folder, name), "w").close()
+    # Folders that change within the mtime resolution still count as changed
+    mtime = os.stat(folder).st_mtime + 1
+    os.utime(folder, (mtime, mtime))
+
+
+def test_instrument_pattern():
+    assert coverage.instrument_pattern("GLASGOW_01") == "*GLASGOW*01.fit.gz"
+    assert coverage.instrument_pattern("BIR") == "*BIR*.fit.gz"
+    assert coverage.instrument_pattern(None) == "*.fit.gz"
+
+
+def test_covered_time_of_the_files(tmp_path):
+    base = str(tmp_path / "archive")
+    touch(
+        base,
+        DAY,
+        "GLASGOW_20240513_100000_01.fit.gz",
+        "GLASGOW_20240513_101500_01.fit.gz",
+        "GLASGOW_20240513_110000_01.fit.gz",
+        "GLASGOW_20240513_100000_02.fit.gz",
+        "GLASGOW_20240513_234500_01.fit.gz",
+        "not_a_burst_file.txt",
+    )
+    touch(base, DAY + pd.Timedelta(days=1), "GLASGOW_20240514_000000_01.fit.gz")
+    index = coverage.CoverageIndex()
+    assert index.update(base, DAY, DAY + pd.Timedelta(days=1)) == 2
+    assert index.instruments() == ["GLASGOW_01", "GLASGOW_02"]
+    assert index.instruments("GLASGOW_02") == ["GLASGOW_02"]
+
+    starts, ends = index.available("GLASGOW_01")
+    # 10:00-10:30, 11:00-11:15 and 23:45-00:15 merged across midnight
+    assert pd.to_datetime(starts).strftime("%d %H:%M").tolist() == [
+        "13 10:00",
+        "13 11:00",
+        "13 23:45",
+    ]
+    assert pd.to_datetime(ends).strftime("%d %H:%M").tolist() == [
+        "13 10:30",
+        "13 11:15",
+        "14 00:15",
+    ]
+    t0 = pd.to_datetime(["2024-05-13 10:20", "2024-05-13 12:00"])
+    duration = index.covered_duration(t0, t0 + pd.Timedelta(minutes=15), "GLASGOW_01")
+    assert duration.tolist() == [pd.Timedelta(minutes=10), pd.Timedelta(0)]
+
+
+def test_only_changed_days_are_scanned_again(tmp_path):
+    base = str(tmp_path / "archive")
+    folder = str(tmp_path / "index")
+    touch(base, DAY, "BIR_20240513_100000_01.fit.gz")
+    touch(base, DAY + pd.Timedelta(days=1), "BIR_20240514_100000_01.fit.gz")
+    end = DAY + pd.Timedelta(days=1)
+    coverage.load_coverage(base, DAY, end, folder=folder, verbose=False)
+
+    index = coverage.CoverageIndex.load(folder)
+    assert index.update(base, DAY, end) == 0
+    touch(base, DAY, "BIR_20240513_101500_01.fit.gz")
+    assert index.update(base, DAY, end) == 1
+    starts, ends = index.covered("BIR_01")
+    assert (ends - starts).sum() == pd.Timedelta(minutes=45).value
@@ -0,0 +1,90 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from burstextractor import coverage
+
+create_data = pytest.importorskip("create_data", exc_type=ImportError)
+from burstextractor import fetchcache  # noqa: E402
+
+import conftest  # noqa: E402
+from conftest import DAY  # noqa: E402
+
+
+@pytest.fixture
+def run(archive, tmp_path, monkeypatch):
+    """
+    create_data on the archive of the day, without a fetch cache.
+    Returns: A function of (folder, **kwargs) that returns the written windows
+    """
+    monkeypatch.setattr(
+        create_data,
+        "load_coverage",
+        lambda start, end: coverage.load_coverage(
+            archive, start, end, folder=str(tmp_path / ".coverage"), verbose=False
+        ),
+    )
+    fetchcache.configure_fetch_cache(None)
+
+    def run(folder, **kwargs):
+        folder = str(tmp_path / folder)
+        written, failed = create_data.create_overlapping_parquets(
+            DAY, DAY, ["GLASGOW", "BIR"], folder, **kwargs
+        )
+        assert not failed
+        return written, read_windows(folder)
+
+    return run
+
+
+def read_windows(folder):
+    """
+    The windows of a run as {relative path: frame}.
+    """
+    paths = glob.glob(os.path.join(folder, "*", "*.parquet"))
+    return {
+        os.path.relpath(path, folder): pd.read_parquet(path) for path in sorted(paths)
+    }
+
+
+def assert_same_windows(expected, actual):
+    assert expected.keys() == actual.keys()
+    for path, df in expected.items():
+        pd.testing.assert_frame_equal(df, actual[path])
+        assert df.attrs == actual[path].attrs, path
+
+
+def test_parallel_is_the_same_as_serial(run):
+    written, serial = run("serial")
+    assert written == len(serial) > 0
+    assert {path.split(os.sep)[0] for path in serial} == {
+        "GLASGOW_01",
+        "GLASGOW_02",
+        "BIR_01",
+    }
+    parallel_written, parallel = run("parallel", max_workers=2)
+    assert parallel_written == written
+    assert_same_windows(serial, parallel)
+
+
+def test_per_day_is_the_same_as_per_window(run, monkeypatch):
+    decoded = []
+
+    def decode(path, verbose):
+        decoded.append(os.path.basename(path))
+        return conftest.decode(path, verbose)
+
+    monkeypatch.setattr(fetchcache.downloader, "fetch_fits_to_pandas", decode)
+    _, per_day = run("per_day", load_per_day=True)
+    # Every file is decoded once
+    assert sorted(decoded) == sorted(conftest.FILES)
+    _, per_window = run("per_window", load_per_day=False)
+    assert_same_windows(per_window, per_day)
+
+
+def test_rerun_skips_finished_windows(run):
+    written, _ = run("out")
+    assert written > 0
+    assert run("out", max_workers=2)[0] == 0
@@ -0,0 +1,86 @@
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from burstextractor import datasetindex
+
+
+def write_window(root, relative, start, rows=40, frequencies=6):
+    path = os.path.join(root, relative)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    df = pd.DataFrame(
+        np.zeros((rows, frequencies), dtype=np.float32),
+        index=pd.date_range(start, periods=rows, freq="250ms"),
+        columns=[str(f) for f in range(frequencies)],
+    )
+    df.to_parquet(path)
+    # Changes within the mtime resolution of the folder still count
+    folder = os.path.dirname(path)
+    mtime = os.stat(folder).st_mtime + 1
+    os.utime(folder, (mtime, mtime))
+
+
+def test_labeled_layout(tmp_path):
+    root = str(tmp_path)
+    write_window(root, "GLASGOW_01/3/2024-05-13_10-00-00.parquet", "2024-05-13 10:00")
+    write_window(root, "GLASGOW_01/0/2024-05-13_11-00-00.parquet", "2024-05-13 11:00")
+    write_window(
+        root, "BIR_01/2/2024-05-14_09-30-00.parquet", "2024-05-14 09:30", rows=80
+    )
+    write_window(root, "BIR_01/2/not_a_window.parquet", "2024-05-14")
+    os.makedirs(os.path.join(root, ".hidden/3"))
+
+    df = datasetindex.load_dataset_index(root)
+    assert df["path"].tolist() == [
+        "BIR_01/2/2024-05-14_09-30-00.parquet",
+        "GLASGOW_01/0/2024-05-13_11-00-00.parquet",
+        "GLASGOW_01/3/2024-05-13_10-00-00.parquet",
+    ]
+    assert df["image"].tolist() == [os.path.join(root, p) for p in df["path"]]
+    assert df["antenna"].tolist() == ["BIR_01", "GLASGOW_01", "GLASGOW_01"]
+    assert df["label"].tolist() == ["2", "0", "3"]
+    assert (
+        df["datetime"].tolist()
+        == pd.to_datetime(
+            ["2024-05-14 09:30", "2024-05-13 11:00", "2024-05-13 10:00"]
+        ).tolist()
+    )
+    assert df["n_rows"].tolist() == [80, 40, 40]
+    assert (df["n_frequencies"] == 6).all()
+    assert df["time_start"].tolist() == df["datetime"].tolist()
+    assert df.loc[0, "time_end"] == pd.Timestamp("2024-05-14 09:30:19.750")
+
+
+def test_unlabeled_layout(tmp_path):
+    root = str(tmp_path)
+    write_window(root, "GLASGOW_01/2024-05-13_10-00-00.parquet", "2024-05-13 10:00")
+    df = datasetindex.load_dataset_index(root)
+    assert df["antenna"].tolist() == ["GLASGOW_01"]
+    assert df["label"].isna().all()
+
+
+def test_rescan_lists_changed_directories_only(tmp_path):
+    root = str(tmp_path / "dataset")
+    write_window(root, "GLASGOW_01/3/2024-05-13_10-00-00.parquet", "2024-05-13 10:00")
+    write_window(root, "BIR_01/2/2024-05-14_09-30-00.parquet", "2024-05-14 09:30")
+    datasetindex.load_dataset_index(root)
+    # The index is relative to the root, so it survives a move
+    moved = str(tmp_path / "moved")
+    shutil.move(root, moved)
+
+    index = datasetindex.DatasetIndex.load(moved)
+    assert len(index.files) == 2
+    write_window(
+        moved, "BIR_01/2/2024-05-14_10-30-00.parquet", "2024-05-14 10:30", rows=80
+    )
+    shutil.rmtree(os.path.join(moved, "GLASGOW_01"))
+    assert index.update() == 1
+    assert index.files["path"].tolist() == [
+        "BIR_01/2/2024-05-14_09-30-00.parquet",
+        "BIR_01/2/2024-05-14_10-30-00.parquet",
+    ]
+    assert index.files["n_rows"].tolist() == [40, 80]
+    assert set(index.directories) == {"BIR_01/2"}
+    assert index.update() == 0
@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor.events import coalesce_events, event_ids
+
+DAY = pd.Timestamp("2024-05-13")
+
+
+def burst_list(rows, type_dtype=object):
+    return pd.DataFrame(
+        {
+            "instruments": [station for station, _, _, _ in rows],
+            "type": pd.array([t for _, t, _, _ in rows], dtype=type_dtype),
+            "datetime_start": [
+                DAY + pd.Timedelta(start) if start else pd.NaT
+                for _, _, start, _ in rows
+            ],
+            "datetime_end": [
+                DAY + pd.Timedelta(end) if end else pd.NaT for _, _, _, end in rows
+            ],
+        }
+    )
+
+
+def test_overlapping_entries_become_one_event():
+    events = coalesce_events(
+        burst_list(
+            [
+                ("GLASGOW", "III", "10:58:00", "10:58:00"),
+                ("GLASGOW", "III/R", "10:57:00", "11:00:00"),
+                # Within the gap after the end
+                ("GLASGOW", "III", "11:00:45", "11:02:00"),
+                # Same minutes, another station
+                ("BIR", "II", "10:57:00", "11:10:00"),
+                ("GLASGOW", "II", "12:00:00", "12:05:00"),
+                ("GLASGOW", "III", None, "12:05:00"),
+                (None, "III", "12:00:00", "12:05:00"),
+            ]
+        )
+    )
+    assert events["instruments"].tolist() == ["GLASGOW", "BIR", "GLASGOW"]
+    # The type of the longest entry and the sorted types
+    assert events["type"].tolist() == ["III/R", "II", "II"]
+    assert events["types"].tolist() == ["III,III/R", "II", "II"]
+    assert events["events"].tolist() == [3, 1, 1]
+    assert events["datetime_start"].tolist() == [
+        DAY + pd.Timedelta("10:57:00"),
+        DAY + pd.Timedelta("10:57:00"),
+        DAY + pd.Timedelta("12:00:00"),
+    ]
+    assert events.loc[0, "datetime_end"] == DAY + pd.Timedelta("11:02:00")
+
+
+def test_events_are_cut_after_max_span():
+    # A long II with a III every minute
+    rows = [("GLASGOW", "II", "10:00:00", "10:30:00")] + [
+        ("GLASGOW", "III", f"10:{minute:02d}:00", f"10:{minute:02d}:00")
+        for minute in range(1, 10)
+    ]
+    events = coalesce_events(burst_list(rows))
+    assert events["datetime_start"].dt.strftime("%H:%M").tolist() == ["10:00", "10:05"]
+    assert events["datetime_end"].dt.strftime("%H:%M").tolist() == ["10:30", "10:09"]
+    assert events["type"].tolist() == ["II", "III"]
+    assert events["types"].tolist() == ["II,III", "III"]
+    assert events["events"].tolist() == [5, 5]
+
+
+def test_entries_without_type_are_dropped():
+    rows = [
+        ("GLASGOW", 3, "10:00:00", "10:01:00"),
+        ("GLASGOW", None, "10:00:00", "10:20:00"),
+        ("BIR", None, "11:00:00", "11:01:00"),
+    ]
+    events = coalesce_events(burst_list(rows, type_dtype="Int8"))
+    assert events["type"].tolist() == ["3"]
+    assert events["events"].tolist() == [1]
+    assert events.loc[0, "datetime_end"] == DAY + pd.Timedelta("10:01:00")
+
+
+def test_event_ids_match_a_loop():
+    rng = np.random.default_rng(0)
+    n = 2000
+    stations = np.sort(rng.integers(0, 5, n))
+    starts = np.zeros(n, dtype=np.int64)
+    for station in range(5):
+        mask = stations == station
+        starts[mask] = np.sort(rng.integers(0, 600, mask.sum())) * 60 * 10**9
+    ends = starts + rng.integers(0, 10, n) * 60 * 10**9
+    gap, max_span = pd.Timedelta(minutes=1), pd.Timedelta(minutes=4)
+
+    expected, event = [], -1
+    for k in range(n):
+        if (
+            k == 0
+            or stations[k] != stations[k - 1]
+            or starts[k] - event_start > max_span.value
+            or starts[k] > event_end + gap.value
+        ):
+            event += 1
+            event_start, event_end = starts[k], ends[k]
+        else:
+            event_end = max(event_end, ends[k])
+        expected.append(event)
+    assert event_ids(stations, starts, ends, gap, max_span).tolist() == expected
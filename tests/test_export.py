@@ -0,0 +1,107 @@
+import io
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pyarrow.parquet as pq
+import pytest
+from PIL import Image
+
+from burstextractor import export
+
+
+def write_windows(tmp_path, count):
+    paths = []
+    for i in range(count):
+        values = np.random.default_rng(i).integers(0, 255, (20, 6))
+        df = pd.DataFrame(
+            values.astype(np.float32),
+            index=pd.date_range("2024-05-13", periods=20, freq="250ms"),
+            columns=[str(f) for f in range(6)],
+        )
+        path = tmp_path / f"{i}.parquet"
+        df.to_parquet(path)
+        paths.append(str(path))
+    return paths
+
+
+def split_frame(paths):
+    return pd.DataFrame(
+        {
+            "image": paths,
+            "label": [str(i % 3) for i in range(len(paths))],
+            "datetime": pd.date_range("2024-05-13", periods=len(paths), freq="15min"),
+            # All null in the first chunk, strings later
+            "comment": pd.Series(
+                [None, None] + ["reviewed"] * (len(paths) - 2), dtype=object
+            ),
+        }
+    )
+
+
+def read_split(folder, split):
+    paths = sorted(
+        os.path.join(folder, "data", name)
+        for name in os.listdir(os.path.join(folder, "data"))
+        if name.startswith(f"{split}-")
+    )
+    return paths, pd.concat([pq.read_table(path).to_pandas() for path in paths])
+
+
+@pytest.mark.parametrize("max_workers", [1, 2])
+def test_export_png(tmp_path, max_workers):
+    paths = write_windows(tmp_path, 7)
+    paths.insert(3, str(tmp_path / "missing.parquet"))
+    folder = str(tmp_path / "export")
+    shards, failed = export.export_split(
+        split_frame(paths),
+        folder,
+        "train",
+        rows_per_shard=4,
+        chunk_size=2,
+        max_workers=max_workers,
+        max_in_flight=2,
+    )
+    assert failed == [paths[3]]
+    assert [os.path.basename(path) for path in shards] == [
+        "train-00000-of-00002.parquet",
+        "train-00001-of-00002.parquet",
+    ]
+    written, df = read_split(folder, "train")
+    assert written == shards
+    assert df["label"].tolist() == ["0", "1", "2", "1", "2", "0", "1"]
+    assert df["comment"].isna().tolist() == [True] * 2 + [False] * 5
+    assert (df["comment"].dropna() == "reviewed").all()
+    for path, image in zip(paths[:3] + paths[4:], df["image"]):
+        decoded = np.asarray(Image.open(io.BytesIO(image["bytes"])))
+        np.testing.assert_array_equal(decoded, export.to_uint8(pd.read_parquet(path)))
+    features = json.loads(pq.read_schema(shards[0]).metadata[b"huggingface"])["info"][
+        "features"
+    ]
+    assert features["image"] == {"_type": "Image"}
+    assert features["comment"]["dtype"] in ["string", "large_string"]
+    assert features["datetime"]["dtype"].startswith("timestamp")
+
+
+def test_export_raw_replaces_earlier_shards(tmp_path):
+    paths = write_windows(tmp_path, 5)
+    folder = str(tmp_path / "export")
+    export.export_split(
+        split_frame(paths), folder, "test", rows_per_shard=2, chunk_size=2
+    )
+    assert len(read_split(folder, "test")[0]) == 3
+    shards, _ = export.export_dataset(
+        {"test": split_frame(paths)},
+        folder,
+        shape=(4, 8),
+        image_format="raw",
+        max_workers=1,
+    )["test"]
+    written, df = read_split(folder, "test")
+    assert written == shards and len(shards) == 1
+    assert (df["height"] == 4).all() and (df["width"] == 8).all()
+    image = np.frombuffer(df["image"].iloc[0], dtype=np.uint8).reshape(4, 8)
+    np.testing.assert_array_equal(
+        image, export.to_uint8(pd.read_parquet(paths[0]), (4, 8))
+    )
@@ -0,0 +1,125 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import DAY
+
+# burstextractor.fetchcache loads the archive through ecallisto_ng
+fetchcache = pytest.importorskip("burstextractor.fetchcache", exc_type=ImportError)
+
+
+def frame(seed):
+    values = np.random.default_rng(seed).random((1000, 32)).astype(np.float32)
+    return pd.DataFrame(values)
+
+
+def folder_size(folder):
+    return sum(entry.stat().st_size for entry in os.scandir(folder))
+
+
+def test_processes_share_the_bound(tmp_path):
+    # Two caches on one folder, like two worker processes
+    max_bytes = 40 * 2**20
+    caches = [fetchcache.FetchCache(tmp_path, max_bytes=max_bytes) for _ in range(2)]
+    nbytes = fetchcache.frame_nbytes(frame(0))
+    peak = 0
+    for i in range(600):
+        caches[i % 2].write(f"{i:04d}", frame(i))
+        peak = max(peak, folder_size(tmp_path))
+    slack = len(caches) * (fetchcache.RELIST_SHARE * max_bytes + nbytes)
+    assert peak <= max_bytes + slack
+    assert caches[0].counters["evictions"] + caches[1].counters["evictions"] > 0
+
+
+def test_hot_tier_is_bounded_in_bytes(tmp_path):
+    nbytes = fetchcache.frame_nbytes(frame(0))
+    cache = fetchcache.FetchCache(tmp_path, hot_bytes=3 * nbytes)
+    for i in range(5):
+        cache.write(str(i), frame(i))
+    assert list(cache.hot) == ["2", "3", "4"]
+    assert cache.hot_size == 3 * nbytes
+    cache.read("2")
+    cache.write("5", frame(5))
+    assert list(cache.hot) == ["4", "2", "5"]
+    # A frame larger than the tier is only kept on disk
+    cache.remember("big", pd.DataFrame(np.zeros((4000, 32))))
+    assert "big" not in cache.hot
+
+
+WINDOWS = [
+    (DAY + pd.Timedelta(hours=9, minutes=3), "GLASGOW_01"),
+    # Over the gap at 10:30
+    (DAY + pd.Timedelta(hours=10, minutes=20), "GLASGOW"),
+    # Over the change of the frequencies at noon
+    (DAY + pd.Timedelta(hours=11, minutes=50), "GLASGOW_02"),
+    (DAY + pd.Timedelta(hours=12, minutes=40), "BIR"),
+    (DAY + pd.Timedelta(hours=14), "BIR"),
+]
+
+
+@pytest.mark.parametrize("folder", ["cache", None])
+def test_cached_is_the_same_as_uncached(archive, tmp_path, folder):
+    downloader = fetchcache.downloader
+    if folder is not None:
+        folder = str(tmp_path / folder)
+    cache = fetchcache.FetchCache(folder, base_path=archive)
+    for _ in range(2):
+        for start, instrument in WINDOWS:
+            end = start + pd.Timedelta(minutes=15)
+            expected = downloader.get_ecallisto_data(start, end, instrument, True)
+            dfs = cache.get_ecallisto_data(start, end, instrument)
+            assert dfs.keys() == expected.keys()
+            for name, df in expected.items():
+                pd.testing.assert_frame_equal(dfs[name], df)
+                assert dfs[name].attrs == df.attrs
+    # Every file is decoded once
+    assert cache.counters["misses"] == 12
+    assert cache.counters["memory_hits"] > 0
+    # The cached frames keep the header of their file
+    for df, _ in cache.hot.values():
+        assert "TIME-OBS" not in df.attrs
+
+
+def test_disk_tier_is_shared(archive, tmp_path):
+    start = DAY + pd.Timedelta(hours=9, minutes=3)
+    end = start + pd.Timedelta(minutes=15)
+    first = fetchcache.FetchCache(str(tmp_path / "cache"), base_path=archive)
+    expected = first.get_ecallisto_data(start, end, "GLASGOW_01")
+    second = fetchcache.FetchCache(str(tmp_path / "cache"), base_path=archive)
+    dfs = second.get_ecallisto_data(start, end, "GLASGOW_01")
+    pd.testing.assert_frame_equal(dfs["GLASGOW_01"], expected["GLASGOW_01"])
+    assert second.counters["disk_hits"] == first.counters["misses"] == 3
+    assert second.counters["misses"] == 0
+
+
+def test_changed_file_is_decoded_again(archive):
+    cache = fetchcache.FetchCache(None, base_path=archive)
+    start = DAY + pd.Timedelta(hours=9, minutes=3)
+    end = start + pd.Timedelta(minutes=15)
+    cache.get_ecallisto_data(start, end, "GLASGOW_01")
+    path = os.path.join(
+        archive, DAY.strftime("%Y/%m/%d"), "GLASGOW_20240513_091500_01.fit.gz"
+    )
+    with open(path, "w") as f:
+        f.write("new")
+    # Changes within the mtime resolution of the folder still count
+    folder = os.path.dirname(path)
+    mtime = os.stat(folder).st_mtime + 1
+    os.utime(folder, (mtime, mtime))
+    cache.get_ecallisto_data(start, end, "GLASGOW_01")
+    assert cache.counters["misses"] == 4
+    assert cache.counters["memory_hits"] == 2
+
+
+def test_listings_are_bounded(archive, monkeypatch):
+    monkeypatch.setattr(fetchcache, "MAX_LISTINGS", 2)
+    cache = fetchcache.FetchCache(None, base_path=archive)
+    start = DAY + pd.Timedelta(hours=9, minutes=3)
+    for instrument in ["GLASGOW_01", "GLASGOW_02", "BIR_01"]:
+        cache.get_ecallisto_data(start, start + pd.Timedelta(minutes=15), instrument)
+    assert len(cache.listings) == 2
+    # Only the files of the instrument are listed
+    (_, files), _ = cache.listings.values()
+    assert {name.split("_")[0] for name, _, _ in files} == {"GLASGOW"}
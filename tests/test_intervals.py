@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor.intervals import BurstIntervals
+
+
+def random_intervals(rng, n):
+    starts = rng.integers(0, 1000, n)
+    return starts, starts + rng.integers(0, 50, n)
+
+
+def test_overlaps_like_brute_force():
+    rng = np.random.default_rng(0)
+    starts, ends = random_intervals(rng, 200)
+    instruments = rng.choice(["GLASGOW", "BIR", "ALMATY"], 200)
+    intervals = BurstIntervals(starts, ends, instruments)
+    t0 = rng.integers(-50, 1050, 500)
+    t1 = t0 + rng.integers(1, 30, 500)
+    for instrument in [None, "GLASGOW", "BIR"]:
+        mask = np.ones(200, bool) if instrument is None else instruments == instrument
+        hits = (starts[None, :] < t1[:, None]) & (ends[None, :] >= t0[:, None])
+        hits &= mask[None, :]
+        assert (intervals.overlaps_many(t0, t1, instrument) == hits.any(axis=1)).all()
+        window, row = intervals.overlapping_many(t0, t1, instrument)
+        assert sorted(zip(window, row)) == sorted(zip(*np.nonzero(hits)))
+
+
+def test_bounds_and_unknown_instrument():
+    intervals = BurstIntervals([10], [20], ["GLASGOW"])
+    # Bursts are closed, windows half-open
+    assert intervals.overlaps(20, 25)
+    assert not intervals.overlaps(5, 10)
+    assert intervals.overlaps(5, 11)
+    assert not intervals.overlaps(5, 11, instrument="BIR")
+
+
+def test_from_burst_list_skips_missing_times():
+    burst_list = pd.DataFrame(
+        {
+            "instruments": ["GLASGOW", "BIR", "GLASGOW"],
+            "datetime_start": pd.to_datetime(
+                ["2024-05-13 10:00", None, "2024-05-13 10:03"]
+            ),
+            "datetime_end": pd.to_datetime(
+                ["2024-05-13 10:05", None, "2024-05-13 10:20"]
+            ),
+        }
+    )
+    intervals = BurstIntervals.from_burst_list(burst_list)
+    assert len(intervals) == 2
+    start = pd.Timestamp("2024-05-13 10:04")
+    assert intervals.overlapping(start, start + pd.Timedelta(minutes=15)).tolist() == [
+        0,
+        2,
+    ]
+    starts, ends = intervals.merged("GLASGOW")
+    assert pd.to_datetime(starts).tolist() == [pd.Timestamp("2024-05-13 10:00")]
+    assert pd.to_datetime(ends).tolist() == [pd.Timestamp("2024-05-13 10:20")]
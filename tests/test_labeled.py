@@ -0,0 +1,23 @@
+import pandas as pd
+import pytest
+
+from burstextractor.checkpoint import unit_key
+
+# burstextractor.labeled loads the archive through ecallisto_ng
+labeled = pytest.importorskip("burstextractor.labeled", exc_type=ImportError)
+
+
+@pytest.mark.parametrize(
+    "times",
+    [
+        ["2024-05-13 00:00:00", "2024-05-14 00:00:00"],
+        ["2024-05-13 00:00:00", "2024-05-13 10:07:00"],
+    ],
+)
+def test_plan_keys_match_unit_key(times):
+    datetimes = pd.to_datetime(times)
+    plan = labeled.plan_windows("GLASGOW_01", ["0", "III"], datetimes, datetimes)
+    assert plan["key"].tolist() == [
+        unit_key("GLASGOW_01", "0", datetimes[0]),
+        unit_key("GLASGOW_01", "III", datetimes[1]),
+    ]
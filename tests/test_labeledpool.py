@@ -0,0 +1,73 @@
+import glob
+import os
+
+import pandas as pd
+import pytest
+
+from conftest import DAY
+
+# burstextractor.labeledpool loads the archive through ecallisto_ng
+labeledpool = pytest.importorskip("burstextractor.labeledpool", exc_type=ImportError)
+from burstextractor import fetchcache  # noqa: E402
+
+BURSTS = [
+    ("GLASGOW", "3", "09:30", "09:32"),
+    ("GLASGOW", "2", "11:00", "11:10"),
+    # After the last file, too short
+    ("GLASGOW", "3", "13:08", "13:09"),
+    ("BIR", "6", "10:00", "10:05"),
+]
+
+
+def burst_list():
+    return pd.DataFrame(
+        {
+            "instruments": [station for station, _, _, _ in BURSTS],
+            "type": [label for _, label, _, _ in BURSTS],
+            "datetime_start": [DAY + pd.Timedelta(f"{t}:00") for _, _, t, _ in BURSTS],
+            "datetime_end": [DAY + pd.Timedelta(f"{t}:00") for _, _, _, t in BURSTS],
+        }
+    )
+
+
+@pytest.fixture
+def run(archive, tmp_path):
+    fetchcache.configure_fetch_cache(None)
+
+    def run(folder, **kwargs):
+        folder = str(tmp_path / folder)
+        summary = labeledpool.generate_labeled_data(
+            burst_list(), ["GLASGOW_01", "GLASGOW_02", "BIR_01"], folder, **kwargs
+        )
+        paths = glob.glob(os.path.join(folder, "*", "*", "*.parquet"))
+        return summary, {
+            os.path.relpath(path, folder): pd.read_parquet(path)
+            for path in sorted(paths)
+        }
+
+    return run
+
+
+def test_summary_counts_windows_without_data(run, capsys):
+    summary, samples = run("serial", ratio=1)
+    assert summary["error"].isna().all()
+    summary = summary.set_index("instrument")
+    assert summary.loc["GLASGOW_01", "bursts"] == 2
+    assert summary.loc["GLASGOW_01", "empty_units"] >= 1
+    assert summary.loc["BIR_01", "bursts"] == 1
+    assert (summary["non_bursts"] == summary["bursts"]).all()
+    assert len(samples) == summary[["bursts", "non_bursts"]].sum().sum()
+    assert "GLASGOW_01/3/2024-05-13_09-30-00.parquet" in samples
+    assert "Too short" not in capsys.readouterr().out
+
+
+def test_parallel_is_the_same_as_serial(run):
+    serial_summary, serial = run("serial", ratio=2)
+    summary, parallel = run("parallel", ratio=2, max_workers=2)
+    assert summary["error"].isna().all()
+    columns = ["instrument", "units", "empty_units", "bursts", "non_bursts"]
+    pd.testing.assert_frame_equal(summary[columns], serial_summary[columns])
+    assert parallel.keys() == serial.keys()
+    for path, df in serial.items():
+        pd.testing.assert_frame_equal(parallel[path], df)
+        assert parallel[path].attrs == df.attrs
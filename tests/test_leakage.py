@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor import leakage
+
+MINUTE = pd.Timedelta(minutes=1)
+
+
+def random_windows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame(
+        {
+            "antenna": rng.choice(["GLASGOW_01", "BIR_01", "HUMAIN_59"], n),
+            "datetime": pd.Timestamp("2024-05-13")
+            + pd.to_timedelta(rng.integers(0, 24 * 60, n), unit="min"),
+            "split": rng.choice(["train", "validation", "test"], n, p=[0.8, 0.1, 0.1]),
+        },
+        index=rng.permutation(n) + 100,
+    )
+
+
+def brute_force_leaks(df, duration=leakage.WINDOW):
+    pairs = set()
+    rows = list(df.itertuples())
+    for a in rows:
+        for b in rows:
+            if (
+                a.antenna == b.antenna
+                and a.split != b.split
+                and a.datetime < b.datetime + duration
+                and b.datetime < a.datetime + duration
+            ):
+                pairs.add(frozenset([a.Index, b.Index]))
+    return pairs
+
+
+def test_find_leaks_matches_brute_force():
+    df = random_windows(400)
+    leaks = leakage.find_leaks(df)
+    assert {frozenset(pair) for pair in zip(leaks["left"], leaks["right"])} == (
+        brute_force_leaks(df)
+    )
+    assert len(leaks) == len(brute_force_leaks(df))
+    # The window of the higher priority split is on the left
+    ranks = {split: rank for rank, split in enumerate(leakage.PRIORITY)}
+    assert (leaks["left_split"].map(ranks) < leaks["right_split"].map(ranks)).all()
+    left, right = df.loc[leaks["left"]], df.loc[leaks["right"]]
+    overlap = leakage.WINDOW - np.abs(
+        left["datetime"].to_numpy() - right["datetime"].to_numpy()
+    )
+    assert (leaks["overlap"].to_numpy() == overlap).all()
+
+
+def test_windows_are_half_open_and_without_nat():
+    df = pd.DataFrame(
+        {
+            "antenna": ["GLASGOW_01"] * 4,
+            "datetime": pd.to_datetime(
+                ["2024-05-13 10:00", "2024-05-13 10:15", "2024-05-13 10:29", None]
+            ),
+            "split": ["train", "test", "validation", "test"],
+        }
+    )
+    leaks = leakage.find_leaks(df)
+    assert leaks[["left", "right"]].values.tolist() == [[1, 2]]
+    assert leaks["overlap"].tolist() == [MINUTE]
+
+
+def test_resolve():
+    df = random_windows(400, seed=1)
+    leaks = leakage.find_leaks(df)
+    assert len(leaks) > 0
+
+    dropped = leakage.resolve_leaks(df, leaks, how="drop")
+    assert leakage.find_leaks(dropped).empty
+    assert set(df.index) - set(dropped.index) == set(leaks["right"])
+
+    moved = leakage.resolve_leaks(df, leaks, how="move")
+    assert leakage.find_leaks(moved).empty
+    assert moved.index.equals(df.index)
+    # Windows only move to a split of higher priority
+    ranks = {split: rank for rank, split in enumerate(leakage.PRIORITY)}
+    assert (moved["split"].map(ranks) <= df["split"].map(ranks)).all()
+
+
+def test_check_splits():
+    df = random_windows(300, seed=2)
+    train_df, val_df, test_df = (
+        df[df["split"] == name].drop(columns="split")
+        for name in ["train", "validation", "test"]
+    )
+    *splits, leaks = leakage.check_splits(
+        train_df, val_df, test_df, resolve="drop", verbose=False
+    )
+    assert len(leaks) > 0
+    assert len(splits[2]) == len(test_df)
+    combined = pd.concat(
+        [
+            split.assign(split=name)
+            for split, name in zip(splits, ["train", "validation", "test"])
+        ]
+    )
+    assert leakage.find_leaks(combined).empty
+    summary = leakage.leak_summary(df, leaks)
+    assert summary["pairs"].sum() == len(leaks)
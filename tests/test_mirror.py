@@ -0,0 +1,133 @@
+import datetime
+import functools
+import http.server
+import json
+import os
+import threading
+
+import pytest
+
+from burstextractor import mirror
+
+TODAY = datetime.date(2024, 6, 15)
+
+
+class Handler(http.server.SimpleHTTPRequestHandler):
+    def log_message(self, format, *args):
+        self.server.requests.append((self.path, args[1]))
+
+
+@pytest.fixture
+def server(tmp_path):
+    """
+    Serves tmp_path/server over HTTP like the burst list server.
+    Yields: The base url and the served folder
+    """
+    root = tmp_path / "server"
+    (root / "2024").mkdir(parents=True)
+    handler = functools.partial(Handler, directory=str(root))
+    httpd = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield httpd, f"http://127.0.0.1:{httpd.server_port}", root
+    finally:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+def write_month(root, month, text):
+    path = root / "2024" / f"e-CALLISTO_2024_{month:02d}.txt"
+    path.write_text(text)
+    return path
+
+
+def test_mirror_downloads_once_and_revalidates_open_month(server, tmp_path):
+    httpd, base_url, root = server
+    write_month(root, 5, "closed month\n")
+    june = write_month(root, 6, "open month\n")
+    folder = str(tmp_path / "mirror")
+
+    paths = mirror.mirror_burst_lists(
+        [2024], [5, 6], folder=folder, base_url=base_url, max_workers=2, today=TODAY
+    )
+    assert [os.path.basename(path) for path in paths] == [
+        "e-CALLISTO_2024_05.txt",
+        "e-CALLISTO_2024_06.txt",
+    ]
+    assert open(paths[0]).read() == "closed month\n"
+    with open(os.path.join(folder, mirror.MANIFEST)) as f:
+        manifest = json.load(f)
+    assert manifest["e-CALLISTO_2024_05.txt"]["closed"]
+    assert not manifest["e-CALLISTO_2024_06.txt"]["closed"]
+    assert len(httpd.requests) == 2
+
+    # The closed month is not requested again, the open one is not modified
+    httpd.requests.clear()
+    mirror.mirror_burst_lists(
+        [2024], [5, 6], folder=folder, base_url=base_url, today=TODAY
+    )
+    assert httpd.requests == [("/2024/e-CALLISTO_2024_06.txt", "304")]
+
+    # A changed open month is downloaded again
+    june.write_text("open month, one more burst\n")
+    mtime = os.path.getmtime(june) + 10
+    os.utime(june, (mtime, mtime))
+    httpd.requests.clear()
+    mirror.mirror_burst_lists(
+        [2024], [5, 6], folder=folder, base_url=base_url, today=TODAY
+    )
+    assert httpd.requests == [("/2024/e-CALLISTO_2024_06.txt", "200")]
+    assert open(paths[1]).read() == "open month, one more burst\n"
+    assert not any(name.endswith(mirror.PART_SUFFIX) for name in os.listdir(folder))
+
+
+def test_mirror_reports_missing_months(server, tmp_path):
+    httpd, base_url, root = server
+    write_month(root, 5, "closed month\n")
+    folder = str(tmp_path / "mirror")
+
+    with pytest.raises(RuntimeError, match="e-CALLISTO_2024_04.txt"):
+        mirror.mirror_burst_lists(
+            [2024], [4, 5], folder=folder, base_url=base_url, today=TODAY
+        )
+    # The month that could be downloaded is kept for the next run
+    with open(os.path.join(folder, mirror.MANIFEST)) as f:
+        assert list(json.load(f)) == ["e-CALLISTO_2024_05.txt"]
+
+
+def test_damaged_closed_month_is_downloaded_again(server, tmp_path):
+    httpd, base_url, root = server
+    write_month(root, 5, "closed month\n")
+    folder = str(tmp_path / "mirror")
+    (path,) = mirror.mirror_burst_lists(
+        [2024], [5], folder=folder, base_url=base_url, today=TODAY
+    )
+    with open(path, "w") as f:
+        f.write("closed mon")
+
+    # Not a conditional request, the server would answer 304
+    httpd.requests.clear()
+    mirror.mirror_burst_lists(
+        [2024], [5], folder=folder, base_url=base_url, today=TODAY
+    )
+    assert httpd.requests == [("/2024/e-CALLISTO_2024_05.txt", "200")]
+    assert open(path).read() == "closed month\n"
+
+
+def test_adopted_files_get_the_encoding_of_the_server(tmp_path):
+    folder = tmp_path / "mirror"
+    folder.mkdir()
+    # As download_burst_list wrote them before the mirror
+    legacy = folder / "e-CALLISTO_2024_04.txt"
+    legacy.write_text("20240401\t22:12-22:2§\tIII\tBIR\n", encoding="utf-8")
+    mirror.mirror_burst_lists(
+        [2024], [4], folder=str(folder), base_url="http://127.0.0.1:9", today=TODAY
+    )
+    assert legacy.read_bytes() == "20240401\t22:12-22:2§\tIII\tBIR\n".encode(
+        "iso-8859-1"
+    )
+    with open(folder / mirror.MANIFEST) as f:
+        entry = json.load(f)["e-CALLISTO_2024_04.txt"]
+    assert entry["sha256"] == mirror.file_sha256(str(legacy))
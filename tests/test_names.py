@@ -0,0 +1,48 @@
+import pandas as pd
+
+from burstextractor.names import NameResolver
+
+
+def instruments(counts):
+    return pd.Series([name for name, n in counts.items() for _ in range(n)])
+
+
+def test_rare_names_are_resolved_again_once_frequent(tmp_path):
+    path = str(tmp_path / "aliases.csv")
+    resolver = NameResolver(path)
+    first = resolver.resolve(
+        instruments({"GLASGOW": 20, "GLASGOWW": 2, "NEWSTN": 2}), verbose=False
+    )
+    assert first.isna().sum() == 2  # NEWSTN
+    assert (first == "GLASGOW").sum() == 22
+    resolver.save()
+
+    resolver = NameResolver(path)
+    second = resolver.resolve(
+        instruments({"GLASGOW": 20, "GLASGOWW": 20, "NEWSTN": 20}), verbose=False
+    )
+    assert second.value_counts().to_dict() == {
+        "GLASGOW": 20,
+        "GLASGOWW": 20,
+        "NEWSTN": 20,
+    }
+    assert resolver.changed
+    methods = dict(zip(resolver.table["alias"], resolver.table["method"]))
+    assert methods == {"GLASGOW": "self", "GLASGOWW": "self", "NEWSTN": "self"}
+
+
+def test_manual_entries_are_kept(tmp_path):
+    path = tmp_path / "aliases.csv"
+    pd.DataFrame(
+        {
+            "alias": ["GLASGOW", "GLASGOWW", "NEWSTN"],
+            "canonical": ["GLASGOW", "GLASGOW", "GLASGOW"],
+            "method": ["self", "manual", "manual"],
+        }
+    ).to_csv(path, index=False)
+    resolver = NameResolver(str(path))
+    resolved = resolver.resolve(
+        instruments({"GLASGOW": 20, "GLASGOWW": 20, "NEWSTN": 1}), verbose=False
+    )
+    assert (resolved == "GLASGOW").all()
+    assert not resolver.changed
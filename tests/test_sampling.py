@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor.intervals import BurstIntervals
+from burstextractor.sampling import NonBurstSampler, merge_ranges, subtract_ranges
+
+START = pd.Timestamp("2024-05-13")
+MINUTE = pd.Timedelta(minutes=1)
+
+
+def bursts(*ranges):
+    """
+    Intervals of the bursts [START + a minutes, START + b minutes].
+    """
+    return BurstIntervals(
+        [START + a * MINUTE for a, _ in ranges], [START + b * MINUTE for _, b in ranges]
+    )
+
+
+def test_merge_and_subtract_ranges():
+    lo, hi = merge_ranges(np.array([5, 0, 3, 10]), np.array([6, 2, 3, 9]))
+    assert lo.tolist() == [0, 5] and hi.tolist() == [3, 6]
+    lo, hi = subtract_ranges(
+        np.array([0]), np.array([10]), np.array([3]), np.array([4])
+    )
+    assert lo.tolist() == [0, 5] and hi.tolist() == [2, 10]
+
+
+def test_windows_avoid_the_bursts():
+    intervals = bursts((30, 40), (100, 101))
+    sampler = NonBurstSampler(
+        intervals, START, START + 180 * MINUTE, window=15 * MINUTE, rng=1
+    )
+    # Starts 0..15, 41..85, 102..165
+    assert sampler.remaining == 16 + 45 + 64
+    starts = sampler.sample(1000)
+    assert len(starts) == 125 and starts.is_unique
+    assert not intervals.overlaps_many(starts, starts + 15 * MINUTE).any()
+    assert sampler.remaining == 0 and len(sampler.sample(5)) == 0
+
+
+def test_sample_is_seeded_and_never_repeats():
+    def draw(seed):
+        sampler = NonBurstSampler(
+            bursts((60, 70)), START, START + 1440 * MINUTE, rng=seed
+        )
+        return sampler.sample(10), sampler.sample(10)
+
+    first, second = draw(7)
+    assert first.equals(draw(7)[0])
+    assert not first.intersection(second).size
+
+
+def test_available_time_only():
+    available = (
+        [START + 100 * MINUTE, START + 200 * MINUTE],
+        [START + 120 * MINUTE, START + 210 * MINUTE],
+    )
+    sampler = NonBurstSampler(
+        bursts(), START, START + 1440 * MINUTE, available=available, rng=0
+    )
+    starts = sampler.sample(100)
+    assert len(starts) == 6
+    assert ((starts >= START + 100 * MINUTE) & (starts <= START + 105 * MINUTE)).all()
@@ -0,0 +1,30 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor.shards import ShardDataset, ShardWriter
+
+
+def image(value):
+    return np.full((4, 4), value, dtype=np.uint8)
+
+
+def test_truncate_drops_samples_of_open_shard(tmp_path):
+    folder = str(tmp_path)
+    start = pd.Timestamp("2024-05-13")
+    writer = ShardWriter(folder, "GLASGOW", shape=(4, 4), samples_per_shard=None)
+    for i in range(3):
+        writer.append_array(image(i), "GLASGOW_01", start + pd.Timedelta(minutes=i))
+    writer.truncate(1)
+    writer.append_array(image(9), "GLASGOW_01", start + pd.Timedelta(minutes=9))
+    writer.close_shard()
+    writer.append_array(image(5), "GLASGOW_01", start + pd.Timedelta(minutes=5))
+    writer.truncate(0)
+    assert len(writer.close()) == 1
+
+    dataset = ShardDataset(folder, shape=(4, 4))
+    assert len(dataset) == 2
+    assert [dataset.image(i)[0, 0] for i in range(len(dataset))] == [0, 9]
+    assert sorted(p.name for p in tmp_path.iterdir()) == [
+        "GLASGOW-00000.bin",
+        "GLASGOW-00000.bin.index.parquet",
+    ]
@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+from burstextractor.leakage import find_leaks
+from burstextractor.splits import assign_splits, majority_groups, time_blocks
+
+
+def test_majority_groups():
+    units = np.array([0, 0, 0, 1, 1, 2])
+    groups = np.array([2, 1, 1, 0, 3, 4])
+    assert majority_groups(units, groups).tolist() == [1, 0, 4]
+
+
+def test_overlapping_windows_with_different_labels_stay_together():
+    rng = np.random.default_rng(0)
+    n = 5000
+    df = pd.DataFrame(
+        {
+            "antenna": rng.choice(["GLASGOW_01", "BIR_01"], n),
+            "label": rng.choice(["0", "2", "3"], n),
+            "datetime": pd.Timestamp("2024-01-01")
+            + pd.to_timedelta(rng.integers(0, 90 * 24 * 60, n), unit="min"),
+        }
+    )
+    split = assign_splits(df, block_gap=pd.Timedelta(minutes=15))
+    assert len(find_leaks(df.assign(split=split))) == 0
+    shares = split.value_counts(normalize=True)
+    assert abs(shares["test"] - 0.1) < 0.03
+    assert abs(shares["validation"] - 0.1) < 0.03
+
+
+def test_time_blocks_measure_the_gap_from_the_end():
+    times = pd.to_datetime(
+        ["10:00", "10:14", "10:28", "11:00", "11:16"], format="%H:%M"
+    )
+    times = times.to_numpy()
+    groups = np.zeros(len(times), dtype=np.int64)
+    window = pd.Timedelta(minutes=15)
+    assert time_blocks(groups, times, pd.Timedelta(0), window).tolist() == [
+        0,
+        0,
+        0,
+        1,
+        2,
+    ]
+    assert time_blocks(
+        groups, times, pd.Timedelta(0), window, pd.Timedelta(minutes=20)
+    ).tolist() == [0, 0, 1, 2, 3]
+
+
+def test_windows_of_create_data_are_stratified():
+    # Windows every 14 minutes over 30 days of continuous observation
+    rng = np.random.default_rng(0)
+    starts = pd.date_range("2024-01-01", "2024-01-31", freq="14min")
+    df = pd.DataFrame(
+        {
+            "antenna": np.repeat(["GLASGOW_01", "BIR_01"], len(starts)),
+            "label": rng.choice(["0", "3"], 2 * len(starts), p=[0.8, 0.2]),
+            "datetime": np.tile(starts, 2),
+        }
+    )
+    kwargs = dict(
+        block_gap=pd.Timedelta(0),
+        window_length=pd.Timedelta(minutes=15),
+        max_block=pd.Timedelta(hours=1),
+    )
+    split = assign_splits(df, **kwargs)
+    blocks = df.groupby(
+        [df["antenna"], split, (df["datetime"] - starts[0]) // pd.Timedelta(hours=1)]
+    )
+    # Every hour of an antenna is one block
+    assert blocks.ngroups == 2 * len(starts.floor("h").unique())
+    shares = split.value_counts(normalize=True)
+    assert abs(shares["test"] - 0.1) < 0.02
+    assert abs(shares["validation"] - 0.1) < 0.02
+    # Only the windows at the cuts overlap across the splits
+    leaks = find_leaks(df.assign(split=split))
+    assert 0 < len(leaks) < 0.1 * len(df)
@@ -0,0 +1,40 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from burstextractor.storage import load_burst_list, load_burst_table, save_burst_list
+
+
+@pytest.mark.parametrize("extension", [".arrow", ".parquet"])
+def test_numeric_types_with_missing_values(tmp_path, extension):
+    df = pd.DataFrame(
+        {
+            "instruments": ["GLASGOW", "BIR", "GLASGOW"],
+            "type": [3.0, np.nan, 2.0],
+            "datetime_start": pd.to_datetime(["2024-05-13 10:00"] * 3),
+            "datetime_end": pd.to_datetime(["2024-05-13 10:05"] * 3),
+        }
+    )
+    path = str(tmp_path / f"burst_list{extension}")
+    save_burst_list(df, path)
+    assert str(load_burst_table(path).schema.field("type").type) == "int8"
+    loaded = load_burst_list(path)
+    assert loaded["type"].dtype == "Int8"
+    assert loaded["type"].tolist()[::2] == [3, 2]
+    assert loaded["type"].isna().tolist() == [False, True, False]
+    assert loaded["instruments"].dtype == "category"
+
+
+def test_string_types_round_trip(tmp_path):
+    df = pd.DataFrame(
+        {
+            "instruments": ["GLASGOW", "BIR"],
+            "type": ["III", "II"],
+            "datetime_start": pd.to_datetime(["2024-05-13 10:00"] * 2),
+        }
+    )
+    path = str(tmp_path / "burst_list.arrow")
+    save_burst_list(df, path)
+    loaded = load_burst_list(path)
+    assert loaded["type"].astype(str).tolist() == ["III", "II"]
+    assert (loaded["datetime_start"] == df["datetime_start"]).all()
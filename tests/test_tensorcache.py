@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from burstextractor import tensorcache
+from burstextractor.shards import to_fixed_shape
+
+SHAPE = (8, 16)
+
+
+def write_windows(tmp_path, count):
+    paths = []
+    for i in range(count):
+        values = np.random.default_rng(i).integers(0, 255, (60, 12))
+        df = pd.DataFrame(
+            values.astype(np.float32),
+            index=pd.date_range("2024-05-13", periods=60, freq="250ms"),
+            columns=np.linspace(45.0, 80.0, 12),
+        )
+        df.iloc[:5, 0] = np.nan
+        path = tmp_path / f"{i}.parquet"
+        df.to_parquet(path)
+        paths.append(str(path))
+    return paths
+
+
+@pytest.mark.parametrize("max_workers", [None, 2])
+def test_build_and_load(tmp_path, monkeypatch, max_workers):
+    monkeypatch.setattr(tensorcache, "CHUNK_SIZE", 2)
+    paths = write_windows(tmp_path, 5)
+    paths.insert(2, str(tmp_path / "missing.parquet"))
+    metadata = pd.DataFrame({"label": list("abcdef")}, index=range(10, 16))
+    cache_path = str(tmp_path / "cache")
+    result = tensorcache.build_tensor_cache(
+        paths, cache_path, shape=SHAPE, metadata=metadata, max_workers=max_workers
+    )
+    assert result["failed"].tolist() == [False, False, True, False, False, False]
+
+    images, loaded = tensorcache.load_tensor_cache(cache_path)
+    assert isinstance(images, np.memmap) and not images.flags.writeable
+    assert images.shape == (6, *SHAPE) and images.dtype == np.uint8
+    pd.testing.assert_frame_equal(loaded, result)
+    assert loaded["label"].tolist() == list("abcdef")
+    for i, path in enumerate(paths):
+        if i == 2:
+            assert not images[i].any()
+        else:
+            expected = to_fixed_shape(pd.read_parquet(path), SHAPE)
+            np.testing.assert_array_equal(images[i], expected)
+    # Only the finished cache is left
+    assert sorted(p.name for p in tmp_path.glob("cache*")) == [
+        "cache.npy",
+        "cache.parquet",
+    ]
+
+
+def test_metadata_needs_one_row_per_path(tmp_path):
+    paths = write_windows(tmp_path, 2)
+    with pytest.raises(ValueError):
+        tensorcache.build_tensor_cache(
+            paths, str(tmp_path / "cache"), metadata=pd.DataFrame({"a": [1]})
+        )
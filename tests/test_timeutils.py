@@ -0,0 +1,67 @@
+import pandas as pd
+import pytest
+
+from burstextractor import timeutils
+
+
+def parse(dates, times):
+    data = pd.DataFrame({"date": dates, "time": times}, dtype=str)
+    return timeutils.parse_time(timeutils.fix_typos_in_time(data))
+
+
+@pytest.mark.parametrize(
+    "date, time, start, end",
+    [
+        ("20240513", "10:00-10:05", "2024-05-13 10:00", "2024-05-13 10:05"),
+        ("20240513", "19:05:19:07", "2024-05-13 19:05", "2024-05-13 19:07"),
+        ("20240229", "23:50-24:00", "2024-02-29 23:50", "2024-03-01 00:00"),
+        ("20240531", "23:58-00:03", "2024-05-31 23:58", "2024-06-01 00:03"),
+        # An end a bit before the start is a typo and stays on the same day
+        ("20240513", "14:58-14:53", "2024-05-13 14:58", "2024-05-13 14:53"),
+        # Known typos of the lists
+        ("20211117", "1447-14:47", "2021-11-17 14:47", "2021-11-17 14:47"),
+        ("20230711", "22:22-2:26", "2023-07-11 22:22", "2023-07-11 22:26"),
+        ("20210905", "22:12-22:2§", "2021-09-05 22:12", "2021-09-05 22:02"),
+    ],
+)
+def test_parse_time(date, time, start, end):
+    data = parse([date], [time])
+    assert data["time_valid"].tolist() == [True]
+    assert data["datetime_start"].tolist() == [pd.Timestamp(start)]
+    assert data["datetime_end"].tolist() == [pd.Timestamp(end)]
+
+
+def test_hours_and_minutes_have_two_digits():
+    data = parse(["20210521"], ["00:11-0:13"])
+    assert data.loc[0, ["time", "time_start", "time_end"]].tolist() == [
+        "00:11-00:13",
+        "00:11",
+        "00:13",
+    ]
+    assert data.loc[0, ["date_start", "date_end"]].tolist() == ["20210521"] * 2
+
+
+@pytest.mark.parametrize(
+    "date, time", [("20240209", "07:00-hh:mm"), ("20240230", "10:00-10:05")]
+)
+def test_invalid_rows_keep_the_date(date, time):
+    data = parse([date], [time])
+    assert data["time_valid"].tolist() == [False]
+    assert data[["time", "time_start", "time_end"]].isna().all(axis=None)
+    assert data["datetime_start"].isna().all()
+    assert data.loc[0, ["date_start", "date_end"]].tolist() == [date, date]
+
+
+def test_column_types():
+    data = parse(["20240513", "20240513"], ["10:00-10:05", "??"])
+    assert data["time"].dtype == pd.Series(["a"], dtype=str).dtype
+    assert data["datetime_start"].dtype == "datetime64[ns]"
+
+
+def test_time_ranges_to_minutes():
+    start, end, valid = timeutils.time_ranges_to_minutes(
+        ["10:00-10:05", "10:61-10:62", "10:00", None, "25:00-25:01", "1:2-3:4"]
+    )
+    assert valid.tolist() == [True, False, False, False, False, True]
+    assert start.tolist() == [600, -1, -1, -1, -1, 62]
+    assert end.tolist() == [605, -1, -1, -1, -1, 184]